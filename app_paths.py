@@ -0,0 +1,11 @@
+import os
+
+APP_NAME = "MyFileManager"
+
+
+def app_data_path(*parts):
+    """Path inside the per-user data directory ($XDG_DATA_HOME/MyFileManager); parent directories are created."""
+    base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    path = os.path.join(base, APP_NAME, *parts)
+    os.makedirs(os.path.dirname(path) if parts else path, exist_ok=True)
+    return path
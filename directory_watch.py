@@ -0,0 +1,258 @@
+import os
+import time
+import queue
+import logging
+import threading
+from PyQt6.QtCore import QObject, QThread, QTimer, QFileSystemWatcher, pyqtSignal
+
+
+def listing_sort_key(name, is_dir):
+    """Folders first, then files, each by case-insensitive name."""
+    return (not is_dir, name.lower())
+
+
+class DirectorySnapshot:
+    """Sorted listing of one directory as parallel name / is_dir lists, plus the directory mtime."""
+    __slots__ = ('path', 'names', 'is_dir', 'mtime_ns')
+
+    def __init__(self, path, names, is_dir, mtime_ns=0):
+        self.path = path
+        self.names = names
+        self.is_dir = is_dir
+        self.mtime_ns = mtime_ns
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def scan(cls, path, should_stop=None):
+        """List `path`; raises OSError, returns None if `should_stop` fired during the scan."""
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if should_stop and should_stop():
+                    return None
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append((entry.name, is_dir))
+        entries.sort(key=lambda entry: listing_sort_key(*entry))
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime_ns = 0
+        return cls(path, [name for name, _ in entries], [is_dir for _, is_dir in entries], mtime_ns)
+
+    def diff(self, newer):
+        """Names that disappeared and (name, is_dir) that appeared; a file replaced by a folder is both."""
+        old = dict(zip(self.names, self.is_dir))
+        new = dict(zip(newer.names, newer.is_dir))
+        removed = [name for name, is_dir in old.items() if new.get(name, not is_dir) != is_dir]
+        added = [(name, is_dir) for name, is_dir in new.items() if old.get(name, not is_dir) != is_dir]
+        return removed, added
+
+
+class DirectoryScanThread(QThread):
+    """Builds a DirectorySnapshot off the GUI thread."""
+    scanned = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            snapshot = DirectorySnapshot.scan(self.path, lambda: self._cancelled)
+        except PermissionError as e:
+            logging.error(f"No access to {self.path}: {e}")
+            self.failed.emit(f"Нет доступа к {self.path}: {e}")
+            return
+        except OSError as e:
+            logging.error(f"Failed to read {self.path}: {e}")
+            self.failed.emit(f"Не удалось прочитать {self.path}: {e}")
+            return
+        if snapshot is not None and not self._cancelled:
+            self.scanned.emit(snapshot)
+
+
+_finishing_threads = set()
+
+
+def keep_until_finished(thread):
+    """Hold a cancelled scan thread until it ends by itself, however long a dead mount keeps it.
+
+    A QThread destroyed while it runs aborts the process, and a scan stuck in a syscall cannot be
+    interrupted. The thread is neither waited on nor parented to the application (deleting the
+    application would destroy it at exit); this module-level reference keeps it alive instead, and
+    finished releases it.
+    """
+    if thread.isFinished() or thread in _finishing_threads:
+        return
+    _finishing_threads.add(thread)
+    thread.finished.connect(lambda: _finishing_threads.discard(thread))
+    thread.finished.connect(thread.deleteLater)
+
+
+class DirectoryWatcher(QObject):
+    """One QFileSystemWatcher for the whole application, with reference counting and debouncing.
+
+    Several views may watch the same directory; it stays watched until the last one lets go.
+    Bursts of change notifications (an extraction, a build) are coalesced into one
+    directory_changed per directory every DEBOUNCE_MS.
+    """
+    directory_changed = pyqtSignal(str)
+
+    DEBOUNCE_MS = 250
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_changed)
+        self._refcounts = {}
+        self._pending = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self._flush)
+
+    def watch(self, path):
+        count = self._refcounts.get(path, 0)
+        self._refcounts[path] = count + 1
+        if count == 0 and not self._watcher.addPath(path):
+            logging.debug(f"Cannot watch {path}")
+
+    def unwatch(self, path):
+        count = self._refcounts.get(path, 0)
+        if count <= 1:
+            self._refcounts.pop(path, None)
+            self._pending.discard(path)
+            if path in self._watcher.directories():
+                self._watcher.removePath(path)
+        else:
+            self._refcounts[path] = count - 1
+
+    def _on_changed(self, path):
+        if path in self._refcounts:
+            self._pending.add(path)
+            if not self._timer.isActive():
+                self._timer.start()
+
+    def _flush(self):
+        pending, self._pending = self._pending, set()
+        for path in pending:
+            self.directory_changed.emit(path)
+
+
+PATH_AVAILABLE = "available"
+PATH_MISSING = "missing"
+PATH_UNREACHABLE = "unreachable"
+
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "ncpfs", "afs", "ceph", "glusterfs", "9p",
+                       "davfs", "fuse.sshfs", "fuse.rclone", "fuse.davfs2", "fuse.s3fs", "fuse.glusterfs"}
+LOCAL_PROBE_TIMEOUT = 2.0
+NETWORK_PROBE_TIMEOUT = 5.0
+UNREACHABLE_RETRY_SECONDS = 30.0
+
+_unreachable_mounts = {}  # mount point -> monotonic time it last timed out
+_unreachable_lock = threading.Lock()
+
+
+def read_mount_table():
+    """(mount point, fs type) pairs, longest mount point first. Reading /proc never touches the mounts."""
+    mounts = []
+    try:
+        with open("/proc/self/mounts", 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2:
+                    mounts.append((fields[1].replace("\\040", " "), fields[2]))
+    except OSError:
+        pass
+    mounts.sort(key=lambda mount: len(mount[0]), reverse=True)
+    return mounts
+
+
+def mount_of(path, mounts):
+    """Mount point and fs type of `path` by string prefix, without any syscall on the path itself."""
+    path = os.path.abspath(path)
+    for mount_point, fs_type in mounts:
+        if path == mount_point or path.startswith(mount_point.rstrip("/") + "/"):
+            return mount_point, fs_type
+    return "/", ""
+
+
+class PathProbeThread(QThread):
+    """Checks that paths are reachable directories without letting a dead mount block anyone.
+
+    Paths are grouped by mount point and each mount is probed by its own daemon thread with its
+    own deadline (longer for network filesystems), so one hung NFS/SMB share only delays its own
+    paths. A mount that timed out is reported unreachable straight away for UNREACHABLE_RETRY_SECONDS
+    instead of piling up more stuck threads. Emits probed(path, PATH_AVAILABLE / PATH_MISSING /
+    PATH_UNREACHABLE) for every path.
+    """
+    probed = pyqtSignal(str, str)
+
+    def __init__(self, paths, timeout=None):
+        super().__init__()
+        self.paths = list(dict.fromkeys(paths))
+        self.timeout = timeout
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @staticmethod
+    def _probe_mount(paths, results):
+        for path in paths:
+            results.put((path, PATH_AVAILABLE if os.path.isdir(path) else PATH_MISSING))
+
+    def run(self):
+        mounts = read_mount_table()
+        by_mount = {}
+        for path in self.paths:
+            by_mount.setdefault(mount_of(path, mounts), []).append(path)
+
+        results = queue.Queue()
+        deadlines = {}
+        pending = {}
+        now = time.monotonic()
+        for (mount_point, fs_type), paths in by_mount.items():
+            with _unreachable_lock:
+                failed_at = _unreachable_mounts.get(mount_point)
+            if failed_at is not None and now - failed_at < UNREACHABLE_RETRY_SECONDS:
+                for path in paths:
+                    self.probed.emit(path, PATH_UNREACHABLE)
+                continue
+            timeout = self.timeout or (NETWORK_PROBE_TIMEOUT if fs_type in NETWORK_FILESYSTEMS else LOCAL_PROBE_TIMEOUT)
+            deadlines[mount_point] = now + timeout
+            for path in paths:
+                pending[path] = mount_point
+            threading.Thread(target=self._probe_mount, args=(paths, results), daemon=True).start()
+
+        while pending and not self._cancelled:
+            remaining = min(deadlines[mount_point] for mount_point in set(pending.values())) - time.monotonic()
+            if remaining > 0:
+                try:
+                    path, status = results.get(timeout=min(remaining, 0.2))
+                except queue.Empty:
+                    continue
+                mount_point = pending.pop(path, None)
+                if mount_point is not None:
+                    with _unreachable_lock:
+                        _unreachable_mounts.pop(mount_point, None)
+                    self.probed.emit(path, status)
+                continue
+            now = time.monotonic()
+            for mount_point in [m for m in set(pending.values()) if deadlines[m] <= now]:
+                logging.warning(f"Mount {mount_point} did not respond in time, marking its paths unreachable")
+                with _unreachable_lock:
+                    _unreachable_mounts[mount_point] = now
+                for path in [p for p, m in pending.items() if m == mount_point]:
+                    del pending[path]
+                    self.probed.emit(path, PATH_UNREACHABLE)
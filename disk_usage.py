@@ -0,0 +1,189 @@
+import os
+import time
+import array
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from PyQt6.QtCore import QThread, pyqtSignal
+from folder_sizes import WALK_WORKERS, directory_usage, count_linked
+
+
+class UsageTree:
+    """Aggregated directory tree of a disk usage scan, one slot per directory in parallel arrays.
+
+    Node 0 is the scanned root. parent / first_child / next_sibling link the tree, file_bytes and
+    file_count are what a directory holds directly, total and items cover its whole subtree and
+    are streamed up to every ancestor as directories are read, so any node can be shown while the
+    scan runs and drilling down never rescans. Files are not nodes: a directory's own files show
+    as one block. Only the scan thread writes. The GUI reads concurrently from a timer without a
+    lock: each array access is atomic under the GIL, and a child is linked to its parent only
+    after all of its slots exist, so readers that walk children() never index past the arrays.
+    Totals may be a directory behind while the scan runs.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.names = [root]
+        self.parent = array.array('l', [-1])
+        self.first_child = array.array('l', [-1])
+        self.next_sibling = array.array('l', [-1])
+        self.file_bytes = array.array('q', [0])
+        self.file_count = array.array('q', [0])
+        self.total = array.array('q', [0])
+        self.items = array.array('q', [0])
+        self.complete = bytearray(1)  # the directory itself has been read
+
+    def __len__(self):
+        return len(self.names)
+
+    def add_child(self, node, name):
+        child = len(self.names)
+        for column in (self.file_bytes, self.file_count, self.total, self.items):
+            column.append(0)
+        self.complete.append(0)
+        self.first_child.append(-1)
+        self.next_sibling.append(self.first_child[node])
+        self.parent.append(node)
+        self.names.append(name)
+        # Linked last: a reader that reaches the child through first_child finds every slot filled
+        self.first_child[node] = child
+        return child
+
+    def add_usage(self, node, file_bytes, file_count, subdir_count):
+        self.file_bytes[node] = file_bytes
+        self.file_count[node] = file_count
+        self.complete[node] = 1
+        items = file_count + subdir_count
+        while node >= 0:
+            self.total[node] += file_bytes
+            self.items[node] += items
+            node = self.parent[node]
+
+    def children(self, node):
+        child = self.first_child[node]
+        result = []
+        while child >= 0:
+            result.append(child)
+            child = self.next_sibling[child]
+        return result
+
+    def path(self, node):
+        parts = []
+        while node > 0:
+            parts.append(self.names[node])
+            node = self.parent[node]
+        return os.path.join(self.root, *reversed(parts))
+
+
+def squarify(values, x, y, width, height):
+    """Squarified treemap layout (Bruls, Huizing, van Wijk): one (x, y, w, h) per value.
+
+    `values` must be positive and sorted in descending order. Rows of rectangles are laid along
+    the shorter side of the remaining area and grown while that keeps their worst aspect ratio
+    from getting worse.
+    """
+    total = sum(values)
+    if total <= 0 or width <= 0 or height <= 0:
+        return [(x, y, 0, 0)] * len(values)
+    scale = width * height / total
+    areas = [value * scale for value in values]
+    rects = []
+    i = 0
+    while i < len(areas):
+        side = min(width, height)
+        row = [areas[i]]
+        row_sum = areas[i]
+        i += 1
+        while i < len(areas):
+            grown_sum = row_sum + areas[i]
+            if _worst_ratio(row_sum, row[0], row[-1], side) < _worst_ratio(grown_sum, row[0], areas[i], side):
+                break
+            row.append(areas[i])
+            row_sum = grown_sum
+            i += 1
+        if width >= height:
+            strip = row_sum / height
+            offset = y
+            for area in row:
+                rects.append((x, offset, strip, area / strip))
+                offset += area / strip
+            x += strip
+            width -= strip
+        else:
+            strip = row_sum / width
+            offset = x
+            for area in row:
+                rects.append((offset, y, area / strip, strip))
+                offset += area / strip
+            y += strip
+            height -= strip
+    return rects
+
+
+def _worst_ratio(row_sum, largest, smallest, side):
+    """Worst aspect ratio of a row with the given sum and extreme areas laid along `side`."""
+    if row_sum <= 0 or smallest <= 0:
+        return float('inf')
+    side_squared = side * side
+    sum_squared = row_sum * row_sum
+    return max(side_squared * largest / sum_squared, sum_squared / (side_squared * smallest))
+
+
+class DiskUsageScanThread(QThread):
+    """Fills a UsageTree for `root` in the background, like `du -x` (see FolderSizeThread).
+
+    Directories are read by a pool of WALK_WORKERS threads through the shared FolderSizeCache,
+    so a folder measured earlier (or a repeated scan) costs one lstat per unchanged directory.
+    This thread alone writes the tree and emits progress at most every PROGRESS_INTERVAL seconds.
+    """
+    progress = pyqtSignal(int, object)  # directories read, bytes so far
+    failed = pyqtSignal(str)
+
+    PROGRESS_INTERVAL = 0.25
+
+    def __init__(self, root, cache):
+        super().__init__()
+        self.tree = UsageTree(root)
+        self.cache = cache
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        root = self.tree.root
+        try:
+            root_dev = os.lstat(root).st_dev
+        except OSError as e:
+            logging.error(f"Cannot scan disk usage of {root}: {e}")
+            self.failed.emit(f"Не удалось прочитать {root}: {e}")
+            return
+        self.cache.load()
+        tree = self.tree
+        seen_links = set()
+        directories = 0
+        last_progress = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=WALK_WORKERS)
+        try:
+            pending = {pool.submit(directory_usage, root, root_dev, self.cache): 0}
+            while pending and not self._cancelled:
+                done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = pending.pop(future)
+                    usage = future.result()
+                    if usage is None:
+                        continue
+                    directories += 1
+                    path = tree.path(node)
+                    for name in usage.subdirs:
+                        child = tree.add_child(node, name)
+                        pending[pool.submit(directory_usage, os.path.join(path, name), root_dev, self.cache)] = child
+                    tree.add_usage(node, usage.file_bytes + count_linked(usage, seen_links), usage.file_count, len(usage.subdirs))
+                now = time.monotonic()
+                if now - last_progress >= self.PROGRESS_INTERVAL:
+                    last_progress = now
+                    self.progress.emit(directories, tree.total[0])
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if not self._cancelled:
+            self.progress.emit(directories, tree.total[0])
+            logging.info(f"Disk usage of {root}: {tree.total[0]} bytes in {directories} directories")
@@ -0,0 +1,246 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTreeView, QPushButton, QLabel,
+                             QAbstractItemView, QHeaderView, QSplitter, QWidget, QToolTip)
+from PyQt6.QtCore import Qt, QTimer, QRectF, QSortFilterProxyModel, pyqtSignal
+from PyQt6.QtGui import QStandardItemModel, QStandardItem, QIcon, QPainter, QColor, QPen
+from disk_usage import DiskUsageScanThread, squarify
+from trash_view import format_size
+import zlib
+
+FILES_BLOCK = -1  # собственные файлы папки: один блок, в него не зайти
+TREEMAP_MAX_BLOCKS = 300  # остальное мельче пикселя и рисуется одним блоком вместе с файлами
+
+
+class TreemapWidget(QWidget):
+    """Карта занятого места одной папки: прямоугольники подпапок, площадь пропорциональна размеру."""
+    node_activated = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tree = None
+        self.node = 0
+        self.blocks = []  # (QRectF, узел или FILES_BLOCK, подпись)
+        self.setMouseTracking(True)
+        self.setMinimumSize(300, 200)
+
+    def set_node(self, tree, node):
+        self.tree = tree
+        self.node = node
+        self.relayout()
+
+    def relayout(self):
+        """Пересчитываем раскладку по текущим (растущим во время сканирования) размерам."""
+        self.blocks = []
+        if self.tree is None:
+            self.update()
+            return
+        tree = self.tree
+        children = sorted((child for child in tree.children(self.node) if tree.total[child] > 0),
+                          key=lambda child: tree.total[child], reverse=True)
+        rest = sum(tree.total[child] for child in children[TREEMAP_MAX_BLOCKS:]) + tree.file_bytes[self.node]
+        entries = [(tree.total[child], child, tree.names[child]) for child in children[:TREEMAP_MAX_BLOCKS]]
+        if rest > 0:
+            entries.append((rest, FILES_BLOCK, "Файлы"))
+            entries.sort(key=lambda entry: entry[0], reverse=True)
+        rects = squarify([size for size, _, _ in entries], 0, 0, self.width(), self.height())
+        for (size, node, name), (x, y, w, h) in zip(entries, rects):
+            self.blocks.append((QRectF(x, y, w, h), node, f"{name}\n{format_size(size)}"))
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.relayout()
+
+    def block_at(self, position):
+        for rect, node, label in self.blocks:
+            if rect.contains(position):
+                return rect, node, label
+        return None
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#2E2E2E"))
+        painter.setPen(QPen(QColor("#2E2E2E"), 1))
+        for rect, node, label in self.blocks:
+            if node == FILES_BLOCK:
+                color = QColor("#5A5A5A")
+            else:
+                # Цвет зависит от имени, чтобы папка не меняла цвет при обновлении раскладки
+                color = QColor.fromHsv(zlib.crc32(self.tree.names[node].encode('utf-8', 'surrogateescape')) % 360, 110, 170)
+            painter.setBrush(color)
+            painter.drawRect(rect)
+            if rect.width() > 60 and rect.height() > 32:
+                painter.setPen(QColor("#FFFFFF"))
+                painter.drawText(rect.adjusted(4, 2, -4, -2), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, label)
+                painter.setPen(QPen(QColor("#2E2E2E"), 1))
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        block = self.block_at(event.position())
+        if block:
+            QToolTip.showText(event.globalPosition().toPoint(), block[2], self)
+        super().mouseMoveEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        block = self.block_at(event.position())
+        if block and block[1] != FILES_BLOCK:
+            self.node_activated.emit(block[1])
+        super().mouseDoubleClickEvent(event)
+
+
+class DiskUsageDialog(QDialog):
+    """Анализ занятого места: папка сканируется в фоне, карта и список по размеру уточняются
+    по мере поступления данных. Переход по папкам берёт данные из уже собранного дерева."""
+
+    REFRESH_MS = 300
+
+    def __init__(self, file_manager, path, parent=None):
+        super().__init__(parent or file_manager)
+        self.file_manager = file_manager
+        self.path = path
+        self.node = 0
+        self.rows = {}  # узел -> строка списка
+        self.setWindowTitle(f"Занятое место: {path}")
+        self.resize(900, 560)
+
+        self.layout = QVBoxLayout(self)
+        top_layout = QHBoxLayout()
+        self.up_button = QPushButton("Вверх")
+        self.up_button.setIcon(QIcon.fromTheme("go-up"))
+        self.up_button.clicked.connect(self.go_up)
+        self.path_label = QLabel()
+        top_layout.addWidget(self.up_button)
+        top_layout.addWidget(self.path_label, 1)
+        self.layout.addLayout(top_layout)
+
+        self.treemap = TreemapWidget()
+        self.treemap.node_activated.connect(self.set_node)
+
+        self.model = QStandardItemModel(0, 4, self)
+        self.model.setHorizontalHeaderLabels(["Имя", "Размер", "Доля", "Объектов"])
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setSortRole(Qt.ItemDataRole.UserRole + 1)
+        self.proxy_model.setDynamicSortFilter(True)
+        self.view = QTreeView()
+        self.view.setRootIsDecorated(False)
+        self.view.setModel(self.proxy_model)
+        self.view.setSortingEnabled(True)
+        self.view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.view.sortByColumn(1, Qt.SortOrder.DescendingOrder)
+        self.view.doubleClicked.connect(self.on_row_activated)
+
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        splitter.addWidget(self.treemap)
+        splitter.addWidget(self.view)
+        splitter.setSizes([540, 360])
+        self.layout.addWidget(splitter, 1)
+
+        bottom_layout = QHBoxLayout()
+        self.status_label = QLabel("Сканирование...")
+        bottom_layout.addWidget(self.status_label)
+        bottom_layout.addStretch()
+        self.open_button = QPushButton("Открыть в файловом менеджере")
+        self.open_button.clicked.connect(self.open_in_file_manager)
+        self.rescan_button = QPushButton("Пересканировать")
+        self.rescan_button.clicked.connect(self.start_scan)
+        self.close_button = QPushButton("Закрыть")
+        self.close_button.clicked.connect(self.close)
+        bottom_layout.addWidget(self.open_button)
+        bottom_layout.addWidget(self.rescan_button)
+        bottom_layout.addWidget(self.close_button)
+        self.layout.addLayout(bottom_layout)
+
+        # Пока идёт сканирование, карта и список перерисовываются по таймеру, а не на каждую папку
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.scan_thread = None
+        self.start_scan()
+
+    def start_scan(self):
+        self.stop_scan()
+        # Кэш общий с подсчётом размеров папок: уже обойдённые папки не читаются повторно
+        self.scan_thread = DiskUsageScanThread(self.path, self.file_manager.folder_size_cache)
+        self.scan_thread.progress.connect(self.on_progress)
+        self.scan_thread.failed.connect(self.status_label.setText)
+        self.scan_thread.finished.connect(self.on_scan_finished)
+        self.set_node(0)
+        self.status_label.setText("Сканирование...")
+        self.rescan_button.setEnabled(False)
+        self.scan_thread.start()
+        self.refresh_timer.start()
+
+    def stop_scan(self):
+        if self.scan_thread:
+            self.scan_thread.progress.disconnect()
+            self.scan_thread.finished.disconnect()
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
+            self.scan_thread = None
+
+    def on_progress(self, directories, total):
+        self.status_label.setText(f"Сканирование... папок: {directories}, занято: {format_size(total)}")
+
+    def on_scan_finished(self):
+        self.refresh_timer.stop()
+        self.rescan_button.setEnabled(True)
+        tree = self.scan_thread.tree
+        self.status_label.setText(f"Готово: {format_size(tree.total[0])}, объектов: {tree.items[0]}, папок: {len(tree)}")
+        self.refresh()
+
+    def set_node(self, node):
+        self.node = node
+        self.rows = {}
+        self.model.removeRows(0, self.model.rowCount())
+        self.path_label.setText(self.scan_thread.tree.path(node))
+        self.up_button.setEnabled(node != 0)
+        self.treemap.set_node(self.scan_thread.tree, node)
+        self.refresh()
+
+    def refresh(self):
+        """Обновляем строки текущей папки на месте: новые подпапки добавляются, размеры растут."""
+        tree = self.scan_thread.tree
+        node = self.node
+        parent_total = tree.total[node] or 1
+        for child in tree.children(node) + [FILES_BLOCK]:
+            if child == FILES_BLOCK:
+                size, items = tree.file_bytes[node], tree.file_count[node]
+            else:
+                size, items = tree.total[child], tree.items[child]
+            row = self.rows.get(child)
+            if row is None:
+                name_item = QStandardItem("[файлы в этой папке]" if child == FILES_BLOCK else tree.names[child])
+                name_item.setIcon(QIcon.fromTheme("text-x-generic" if child == FILES_BLOCK else "folder"))
+                name_item.setData(child, Qt.ItemDataRole.UserRole)
+                name_item.setData(name_item.text().lower(), Qt.ItemDataRole.UserRole + 1)
+                row = self.rows[child] = [name_item, QStandardItem(), QStandardItem(), QStandardItem()]
+                self.model.appendRow(row)
+            row[1].setText(format_size(size))
+            row[1].setData(size, Qt.ItemDataRole.UserRole + 1)
+            row[2].setText(f"{100 * size / parent_total:.1f} %")
+            row[2].setData(size, Qt.ItemDataRole.UserRole + 1)
+            row[3].setText(str(items))
+            row[3].setData(items, Qt.ItemDataRole.UserRole + 1)
+        self.treemap.relayout()
+
+    def on_row_activated(self, index):
+        node = self.proxy_model.mapToSource(index).siblingAtColumn(0).data(Qt.ItemDataRole.UserRole)
+        if node != FILES_BLOCK:
+            self.set_node(node)
+
+    def go_up(self):
+        if self.node != 0:
+            self.set_node(self.scan_thread.tree.parent[self.node])
+
+    def open_in_file_manager(self):
+        file_view = self.file_manager.current_file_view()
+        if file_view:
+            self.file_manager.navigate_to(file_view, self.scan_thread.tree.path(self.node))
+
+    def done(self, result):
+        # Сюда приходят и Esc (reject), и закрытие окна: QDialog.closeEvent тоже вызывает reject()
+        self.refresh_timer.stop()
+        self.stop_scan()
+        super().done(result)
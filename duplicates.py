@@ -0,0 +1,207 @@
+import os
+import time
+import struct
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QThread, pyqtSignal
+
+PARTITIONS = 64  # stage 1 spills to this many files; one is grouped in memory at a time
+PARTIAL_BYTES = 4096  # read from the head and from the tail for the partial hash
+HASH_CHUNK = 1024 * 1024
+HASH_WORKERS = 4  # hashlib releases the GIL on large updates, so threads hash in parallel
+
+
+class DuplicateGroup:
+    """Files with identical content. `files` are (path, (dev, inode)) pairs; paths sharing an
+    inode are hard links to one copy and free nothing when removed."""
+    __slots__ = ('size', 'files')
+
+    def __init__(self, size, files):
+        self.size = size
+        self.files = files
+
+    def copies(self):
+        return len({inode for _, inode in self.files})
+
+    def reclaimable(self):
+        return self.size * (self.copies() - 1)
+
+
+def _hash_file(path, size, partial, should_stop):
+    """blake2b of the first and last PARTIAL_BYTES (partial) or of the whole file; None if
+    unreadable or if should_stop() turns true between chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            if partial:
+                digest.update(f.read(PARTIAL_BYTES))
+                if size > 2 * PARTIAL_BYTES:
+                    f.seek(size - PARTIAL_BYTES)
+                    digest.update(f.read(PARTIAL_BYTES))
+                elif size > PARTIAL_BYTES:
+                    digest.update(f.read())
+            else:
+                while chunk := f.read(HASH_CHUNK):
+                    if should_stop():
+                        return None
+                    digest.update(chunk)
+    except OSError as e:
+        logging.warning(f"Cannot read {path} for duplicate search: {e}")
+        return None
+    return digest.digest()
+
+
+class DuplicateScanThread(QThread):
+    """Finds files with identical content under `paths` as a staged pipeline.
+
+    1. One stat pass over the trees writes (size, dev, inode, path) of every non-empty regular
+       file to PARTITIONS spill files chosen by size, so equal sizes always share a partition.
+    2. Each partition in turn is grouped by size in memory; sizes held by a single inode are
+       dropped. Memory is bounded by the largest partition, not by the number of files.
+    3. Candidates are grouped by a hash of their first and last PARTIAL_BYTES; files no larger
+       than both parts are already fully compared.
+    4. Only the remaining collisions are fully hashed, on a pool of HASH_WORKERS threads.
+    Hard links are recognised by (dev, inode) and each inode is read once. Symlinks are skipped.
+    Groups are emitted as soon as their partition is done.
+    """
+    status = pyqtSignal(str, int)  # stage description, percent
+    group_found = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    _RECORD = struct.Struct("<QQQI")
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = self._outermost(paths)
+        self._cancelled = False
+        self.files_seen = 0
+        self.groups_found = 0
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    @staticmethod
+    def _outermost(paths):
+        """Drop paths inside other given folders, so no file is listed twice."""
+        roots = sorted({os.path.abspath(path) for path in paths})
+        result = []
+        for path in roots:
+            if not any(path.startswith(root.rstrip(os.sep) + os.sep) for root in result):
+                result.append(path)
+        return result
+
+    def run(self):
+        with tempfile.TemporaryDirectory(prefix="fm-duplicates-") as spool_dir:
+            spill = [open(os.path.join(spool_dir, f"{i}.bin"), 'wb') for i in range(PARTITIONS)]
+            try:
+                self._stat_pass(spill)
+            finally:
+                for f in spill:
+                    f.close()
+            if self._cancelled:
+                return
+            with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+                for i in range(PARTITIONS):
+                    if self._cancelled:
+                        return
+                    self.status.emit(f"Сравнение содержимого: файлов {self.files_seen}, групп найдено {self.groups_found}",
+                                     int(100 * i / PARTITIONS))
+                    self._process_partition(os.path.join(spool_dir, f"{i}.bin"), pool)
+        if not self._cancelled:
+            self.status.emit(f"Готово: файлов {self.files_seen}, групп дубликатов {self.groups_found}", 100)
+            logging.info(f"Duplicate search in {self.paths}: {self.groups_found} groups among {self.files_seen} files")
+
+    def _stat_pass(self, spill):
+        record = self._RECORD
+        visited_dirs = set()
+        stack = []
+        last_status = time.monotonic()
+        for path in self.paths:
+            try:
+                st = os.lstat(path)
+            except OSError as e:
+                self.failed.emit(f"Не удалось прочитать {path}: {e}")
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                stack.append(path)
+            elif os.path.isfile(path) and not os.path.islink(path) and st.st_size:
+                self._spill(spill, record, st.st_size, st.st_dev, st.st_ino, path)
+        while stack and not self._cancelled:
+            directory = stack.pop()
+            try:
+                dir_stat = os.stat(directory)
+                # Bind mounts can show one directory twice
+                key = (dir_stat.st_dev, dir_stat.st_ino)
+                if key in visited_dirs:
+                    continue
+                visited_dirs.add(key)
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                st = entry.stat(follow_symlinks=False)
+                                if st.st_size:
+                                    self._spill(spill, record, st.st_size, st.st_dev, st.st_ino, entry.path)
+                        except OSError:
+                            continue
+            except OSError as e:
+                logging.warning(f"Skipping {directory} in duplicate search: {e}")
+            now = time.monotonic()
+            if now - last_status >= 0.25:
+                last_status = now
+                self.status.emit(f"Просмотр файлов: {self.files_seen}", 0)
+
+    def _spill(self, spill, record, size, dev, ino, path):
+        encoded = path.encode('utf-8', 'surrogateescape')
+        f = spill[(size * 2654435761) % PARTITIONS]
+        f.write(record.pack(size, dev, ino, len(encoded)))
+        f.write(encoded)
+        self.files_seen += 1
+
+    def _read_partition(self, spill_path):
+        """size -> {(dev, inode): [paths]} of one partition."""
+        by_size = {}
+        record = self._RECORD
+        with open(spill_path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            size, dev, ino, path_len = record.unpack_from(data, offset)
+            offset += record.size
+            path = data[offset:offset + path_len].decode('utf-8', 'surrogateescape')
+            offset += path_len
+            by_size.setdefault(size, {}).setdefault((dev, ino), []).append(path)
+        return by_size
+
+    def _process_partition(self, spill_path, pool):
+        by_size = self._read_partition(spill_path)
+        os.remove(spill_path)
+        for size, inodes in by_size.items():
+            if self._cancelled:
+                return
+            if len(inodes) < 2:
+                continue  # a unique size, or hard links only
+            groups = self._split(size, inodes, pool, partial=True)
+            if size > 2 * PARTIAL_BYTES:
+                groups = [group for candidates in groups for group in self._split(size, candidates, pool, partial=False)]
+            for candidates in groups:
+                files = [(path, inode) for inode, paths in candidates.items() for path in sorted(paths)]
+                self.groups_found += 1
+                self.group_found.emit(DuplicateGroup(size, files))
+
+    def _split(self, size, inodes, pool, partial):
+        """Subsets of `inodes` (with at least two inodes each) whose files hash alike."""
+        keys = list(inodes)
+        digests = pool.map(lambda key: None if self._cancelled else _hash_file(inodes[key][0], size, partial, self.is_cancelled), keys)
+        by_digest = {}
+        for key, digest in zip(keys, digests):
+            if digest is not None:
+                by_digest.setdefault(digest, {})[key] = inodes[key]
+        return [candidates for candidates in by_digest.values() if len(candidates) > 1]
@@ -0,0 +1,189 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTreeView, QPushButton, QLabel,
+                             QAbstractItemView, QHeaderView, QMessageBox)
+from PyQt6.QtCore import Qt, QTimer, QSortFilterProxyModel
+from PyQt6.QtGui import QStandardItemModel, QStandardItem, QIcon
+from duplicates import DuplicateScanThread
+from trash_view import format_size
+import os
+
+MAX_SHOWN_GROUPS = 50000  # остальные группы учитываются в итогах, но не занимают память в списке
+
+
+class DuplicatesDialog(QDialog):
+    """Поиск одинаковых файлов: группы появляются по мере сравнения, отмеченные копии
+    перемещаются в корзину через общий механизм, поэтому удаление можно отменить."""
+
+    REFRESH_MS = 300
+
+    def __init__(self, file_manager, paths, parent=None):
+        super().__init__(parent or file_manager)
+        self.file_manager = file_manager
+        self.paths = paths
+        self.pending_groups = []
+        self.rows = {}  # путь -> элемент файла в списке
+        self.groups_total = 0
+        self.reclaimable_total = 0
+        self.setWindowTitle(f"Дубликаты: {', '.join(paths) if len(paths) < 4 else f'{len(paths)} элементов'}")
+        self.resize(900, 560)
+
+        self.layout = QVBoxLayout(self)
+        self.model = QStandardItemModel(0, 2, self)
+        self.model.setHorizontalHeaderLabels(["Файл", "Размер"])
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setSortRole(Qt.ItemDataRole.UserRole + 1)
+        self.view = QTreeView()
+        self.view.setModel(self.proxy_model)
+        self.view.setSortingEnabled(True)
+        self.view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.view.sortByColumn(1, Qt.SortOrder.DescendingOrder)
+        self.view.doubleClicked.connect(self.show_in_folder)
+        self.layout.addWidget(self.view, 1)
+
+        bottom_layout = QHBoxLayout()
+        self.status_label = QLabel("Поиск...")
+        bottom_layout.addWidget(self.status_label)
+        bottom_layout.addStretch()
+        self.mark_button = QPushButton("Отметить копии")
+        self.mark_button.setToolTip("Отметить все файлы, кроме первого в каждой группе")
+        self.mark_button.clicked.connect(self.mark_copies)
+        self.unmark_button = QPushButton("Снять отметки")
+        self.unmark_button.clicked.connect(self.unmark_all)
+        self.show_button = QPushButton("Показать в папке")
+        self.show_button.clicked.connect(lambda: self.show_in_folder(self.view.currentIndex()))
+        self.trash_button = QPushButton("В корзину")
+        self.trash_button.setIcon(QIcon.fromTheme("user-trash"))
+        self.trash_button.clicked.connect(self.trash_marked)
+        self.close_button = QPushButton("Закрыть")
+        self.close_button.clicked.connect(self.close)
+        for button in (self.mark_button, self.unmark_button, self.show_button, self.trash_button, self.close_button):
+            bottom_layout.addWidget(button)
+        self.layout.addLayout(bottom_layout)
+
+        # Группы добавляются в список пачками по таймеру, а не по одной на каждый сигнал
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.flush_groups)
+
+        self.scan_thread = DuplicateScanThread(paths)
+        self.scan_thread.status.connect(self.on_status)
+        self.scan_thread.group_found.connect(self.pending_groups.append)
+        self.scan_thread.failed.connect(lambda message: QMessageBox.warning(self, "Ошибка", message))
+        self.scan_thread.finished.connect(self.on_scan_finished)
+        self.scan_thread.start()
+        self.refresh_timer.start()
+
+    def on_status(self, text, percent):
+        self.status_label.setText(f"{text} ({percent} %)" if percent < 100 else text)
+
+    def on_scan_finished(self):
+        self.refresh_timer.stop()
+        self.flush_groups()
+        shown = self.model.rowCount()
+        note = f", в списке первые {shown}" if shown < self.groups_total else ""
+        self.status_label.setText(f"Групп: {self.groups_total}, можно освободить {format_size(self.reclaimable_total)}{note}")
+
+    def flush_groups(self):
+        groups, self.pending_groups = self.pending_groups, []
+        for group in groups:
+            self.groups_total += 1
+            self.reclaimable_total += group.reclaimable()
+            if self.model.rowCount() < MAX_SHOWN_GROUPS:
+                self.add_group(group)
+
+    def add_group(self, group):
+        group_item = QStandardItem()
+        group_item.setIcon(QIcon.fromTheme("edit-copy"))
+        size_item = QStandardItem(format_size(group.size))
+        seen_inodes = set()
+        for path, inode in group.files:
+            file_item = QStandardItem(path)
+            file_item.setCheckable(True)
+            file_item.setData(path, Qt.ItemDataRole.UserRole)
+            file_item.setData(inode, Qt.ItemDataRole.UserRole + 2)
+            if inode in seen_inodes:
+                # Жёсткая ссылка на уже показанный файл: удаление места не освободит
+                file_item.setText(f"{path}  (жёсткая ссылка)")
+            seen_inodes.add(inode)
+            file_item.setData(path.lower(), Qt.ItemDataRole.UserRole + 1)
+            file_size_item = QStandardItem(format_size(group.size))
+            file_size_item.setData(group.size, Qt.ItemDataRole.UserRole + 1)
+            group_item.appendRow([file_item, file_size_item])
+            self.rows[path] = file_item
+        self.model.appendRow([group_item, size_item])
+        self.update_group_text(group_item, group.size)
+
+    def update_group_text(self, group_item, size):
+        """Подпись и ключ сортировки группы: сколько места освободится, если оставить одну копию."""
+        copies = len({item.data(Qt.ItemDataRole.UserRole + 2) for item in self.file_items(group_item)})
+        group_item.setText(f"Копий: {copies} по {format_size(size)}, можно освободить {format_size(size * (copies - 1))}")
+        self.model.setData(group_item.index().siblingAtColumn(1), size * (copies - 1), Qt.ItemDataRole.UserRole + 1)
+
+    def file_items(self, group_item):
+        return [group_item.child(row) for row in range(group_item.rowCount())]
+
+    def mark_copies(self):
+        # Оставляем первый файл группы вместе с его жёсткими ссылками, остальные отмечаем
+        for row in range(self.model.rowCount()):
+            items = self.file_items(self.model.item(row, 0))
+            kept = items[0].data(Qt.ItemDataRole.UserRole + 2)
+            for item in items:
+                kept_item = item.data(Qt.ItemDataRole.UserRole + 2) == kept
+                item.setCheckState(Qt.CheckState.Unchecked if kept_item else Qt.CheckState.Checked)
+
+    def unmark_all(self):
+        for row in range(self.model.rowCount()):
+            for item in self.file_items(self.model.item(row, 0)):
+                item.setCheckState(Qt.CheckState.Unchecked)
+
+    def trash_marked(self):
+        paths = []
+        for row in range(self.model.rowCount()):
+            items = self.file_items(self.model.item(row, 0))
+            marked = [item for item in items if item.checkState() == Qt.CheckState.Checked]
+            if len(marked) == len(items):
+                QMessageBox.warning(self, "Ошибка", f"В группе отмечены все файлы, хотя бы один должен остаться:\n{items[0].data(Qt.ItemDataRole.UserRole)}")
+                return
+            paths.extend(item.data(Qt.ItemDataRole.UserRole) for item in marked)
+        if not paths:
+            QMessageBox.information(self, "Дубликаты", "Отметьте файлы, которые нужно переместить в корзину")
+            return
+        reply = QMessageBox.question(self, "Удаление", f"Переместить отмеченные файлы ({len(paths)}) в корзину?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        self.file_manager.trash_paths(paths, on_trashed=self.on_trashed)
+
+    def on_trashed(self, moved):
+        """Убираем из списка перемещённые файлы и группы, в которых не осталось копий."""
+        for path, _ in moved:
+            item = self.rows.pop(path, None)
+            if item is None:
+                continue
+            group_item = item.parent()
+            group_item.removeRow(item.row())
+            # Оставшиеся жёсткие ссылки на один файл - уже не дубликаты
+            if len({child.data(Qt.ItemDataRole.UserRole + 2) for child in self.file_items(group_item)}) < 2:
+                for remaining in self.file_items(group_item):
+                    self.rows.pop(remaining.data(Qt.ItemDataRole.UserRole), None)
+                self.model.removeRow(group_item.row())
+                continue
+            self.update_group_text(group_item, group_item.child(0, 1).data(Qt.ItemDataRole.UserRole + 1))
+        self.status_label.setText(f"Перемещено в корзину: {len(moved)}")
+
+    def show_in_folder(self, index):
+        path = self.proxy_model.mapToSource(index).siblingAtColumn(0).data(Qt.ItemDataRole.UserRole)
+        file_view = self.file_manager.current_file_view()
+        if path and file_view:
+            self.file_manager.navigate_to(file_view, os.path.dirname(path))
+
+    def done(self, result):
+        # Сюда приходят и Esc (reject), и закрытие окна: QDialog.closeEvent тоже вызывает reject()
+        self.refresh_timer.stop()
+        if self.scan_thread.isRunning():
+            self.scan_thread.status.disconnect()
+            self.scan_thread.finished.disconnect()
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
+        super().done(result)
@@ -0,0 +1,564 @@
+import os
+import sys
+import stat
+import time
+import errno
+import ctypes
+import shutil
+import hashlib
+import logging
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QThread, pyqtSignal
+from transfer_journal import TransferJournal
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class OperationCancelled(Exception):
+    """Raised inside a worker when the user cancels the running job."""
+
+
+IO_PRIORITY_BEST_EFFORT = "best-effort"
+IO_PRIORITY_IDLE = "idle"
+
+# ioprio_set(2) has no libc wrapper, so it is called through syscall(2)
+_IOPRIO_SYSCALLS = {'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'armv7l': 314, 'ppc64le': 273}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_CLASS_BE = 2
+_IOPRIO_CLASS_IDLE = 3
+
+
+def set_thread_io_priority(thread_id, priority_class):
+    """Set the I/O scheduling class of one kernel thread. Returns True if the kernel accepted it."""
+    if not sys.platform.startswith("linux") or not thread_id:
+        return False
+    syscall_nr = _IOPRIO_SYSCALLS.get(platform.machine())
+    if syscall_nr is not None:
+        io_class = _IOPRIO_CLASS_IDLE if priority_class == IO_PRIORITY_IDLE else _IOPRIO_CLASS_BE
+        level = 0 if priority_class == IO_PRIORITY_IDLE else 4
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.syscall(syscall_nr, _IOPRIO_WHO_PROCESS, thread_id, (io_class << _IOPRIO_CLASS_SHIFT) | level) == 0:
+            logging.info(f"Set I/O priority of thread {thread_id} to {priority_class}")
+            return True
+        logging.warning(f"ioprio_set failed for thread {thread_id}: {os.strerror(ctypes.get_errno())}")
+    # Fallback: the CFQ/BFQ best-effort level follows the nice value of the thread
+    try:
+        os.setpriority(os.PRIO_PROCESS, thread_id, 19 if priority_class == IO_PRIORITY_IDLE else 0)
+        return True
+    except OSError as e:
+        logging.warning(f"setpriority failed for thread {thread_id}: {e}")
+        return False
+
+
+class TokenBucket:
+    """Bandwidth limiter for the chunked copy. A rate of 0 means unlimited; the rate can change while running."""
+
+    def __init__(self, rate=0):
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = float(rate)
+        self._last = time.monotonic()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._rate = max(0, int(rate))
+            self._tokens = min(self._tokens, float(self._rate))
+            self._last = time.monotonic()
+
+    def consume(self, nbytes, should_stop=lambda: False):
+        """Block until `nbytes` may pass. Sleeps in short slices so cancellation and rate changes apply quickly."""
+        while True:
+            with self._lock:
+                if self._rate <= 0:
+                    return
+                now = time.monotonic()
+                # Burst is capped at one second worth of traffic
+                self._tokens = min(float(self._rate), self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                # Chunks larger than the bucket are let through once it is full
+                if self._tokens >= min(nbytes, self._rate):
+                    self._tokens -= nbytes
+                    return
+                wait = (min(nbytes, self._rate) - self._tokens) / self._rate
+            if should_stop():
+                return
+            time.sleep(min(wait, 0.1))
+
+
+def hash_prefix(path, length, hasher):
+    """Feed the first `length` bytes of a file into an existing hasher (used when resuming a partial copy)."""
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_file(path, drop_cache=False):
+    """Hash a file in chunks. hashlib releases the GIL, so this scales across a thread pool."""
+    hasher = new_hasher()
+    with open(path, 'rb') as f:
+        if drop_cache and hasattr(os, 'posix_fadvise'):
+            # Force the read to come from the device rather than the pages we have just written
+            os.fsync(f.fileno())
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def tree_size(path):
+    """Total size in bytes of a file or a directory tree (symlinks are not followed)."""
+    if not os.path.isdir(path) or os.path.islink(path):
+        try:
+            return os.lstat(path).st_size
+        except OSError:
+            return 0
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def remove_tree_at(parent_fd, name, should_stop=None):
+    """Delete `name` relative to the directory `parent_fd` and everything below it.
+
+    The tree is walked through directory descriptors (unlinkat/openat), so it is immune to
+    symlink races and never builds long path strings. Returns the number of entries removed;
+    raises OperationCancelled when `should_stop` returns true.
+    """
+    if should_stop and should_stop():
+        raise OperationCancelled()
+    st = os.stat(name, dir_fd=parent_fd, follow_symlinks=False)
+    if not stat.S_ISDIR(st.st_mode):
+        os.unlink(name, dir_fd=parent_fd)
+        return 1
+    removed = 0
+    fd = os.open(name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW, dir_fd=parent_fd)
+    # Explicit stack of (parent fd, name, fd, iterator) instead of recursion: trees can be arbitrarily deep
+    stack = [(parent_fd, name, fd, os.scandir(fd))]
+    try:
+        while stack:
+            dir_parent_fd, dir_name, dir_fd, entries = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                entries.close()
+                os.close(dir_fd)
+                stack.pop()
+                os.rmdir(dir_name, dir_fd=dir_parent_fd)
+                removed += 1
+                continue
+            if should_stop and should_stop():
+                raise OperationCancelled()
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    child_fd = os.open(entry.name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW, dir_fd=dir_fd)
+                    stack.append((dir_fd, entry.name, child_fd, os.scandir(child_fd)))
+                else:
+                    os.unlink(entry.name, dir_fd=dir_fd)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+    finally:
+        for _, _, dir_fd, entries in stack:
+            entries.close()
+            os.close(dir_fd)
+    return removed
+
+
+class BackgroundJob(QThread):
+    """Base class for work that runs off the GUI thread; FileManager.start_background_job shows its progress."""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        logging.info(f"Cancellation requested for {type(self).__name__}")
+
+    def interrupt(self):
+        """Called when the application closes while the job is running."""
+        self.cancel()
+
+
+class UndoThread(BackgroundJob):
+    """Reverts (or with redo=True repeats) an entry taken from UndoManager.pop_undo/pop_redo in the background."""
+
+    def __init__(self, undo_manager, entry, redo=False):
+        super().__init__()
+        self.undo_manager = undo_manager
+        self.entry = entry
+        self.redo = redo
+
+    def run(self):
+        action = "повторить" if self.redo else "отменить"
+        replay = self.undo_manager.reapply if self.redo else self.undo_manager.revert
+        try:
+            failed = replay(self.entry, lambda: self._cancelled, self.progress.emit)
+            if failed and not self._cancelled:
+                self.error.emit(f"Не удалось {action} {failed} из {len(self.entry)} элементов")
+        except OperationCancelled:
+            logging.info("Undo cancelled")
+        except PermissionError as e:
+            self.error.emit(f"Нет прав, чтобы {action} действие: {e}")
+        except OSError as e:
+            self.error.emit(f"Не удалось {action} действие: {e}")
+        self.finished.emit()
+
+
+class FileOperationThread(BackgroundJob):
+    verified = pyqtSignal(list)
+    throughput = pyqtSignal(float)
+    completed = pyqtSignal(list)  # (src, dest) of every top-level item that was finished
+
+    def __init__(self, src_paths, dest_path, operation="copy", verify=False, journal=None,
+                 rate_limit=0, io_priority=IO_PRIORITY_BEST_EFFORT):
+        super().__init__()
+        self.src_paths = src_paths
+        self.dest_path = dest_path
+        self.operation = operation
+        self.verify = verify
+        self.journal = journal
+        self.io_priority = io_priority
+        self._throttle = TokenBucket(rate_limit)
+        self._native_id = None
+        self._rate_window_start = 0.0
+        self._rate_window_bytes = 0
+        self._interrupted = False
+        self._total_bytes = 0
+        self._done_bytes = 0
+        self._last_percent = -1
+        self._index = 0
+        self._item_sizes = None  # top-level item -> bytes, measured once data has to be copied
+        self._byte_base = 0
+        self._hash_pool = None
+        self._pending_checks = []
+        self._report = []
+        self._completed_items = []
+
+    @classmethod
+    def resume(cls, journal):
+        """Continue a job recorded in a transfer journal left by an interrupted session."""
+        return cls(journal.src_paths, journal.dest_path, journal.operation, verify=journal.verify, journal=journal)
+
+    def cancel(self):
+        self._cancelled = True
+        logging.info(f"Cancellation requested for {self.operation}")
+
+    @property
+    def rate_limit(self):
+        return self._throttle.rate
+
+    def set_rate_limit(self, bytes_per_second):
+        """Change the bandwidth limit of the running job (0 - unlimited). Safe to call from the GUI thread."""
+        self._throttle.set_rate(bytes_per_second)
+        logging.info(f"Rate limit for {self.operation} set to {bytes_per_second} B/s")
+
+    def set_io_priority(self, priority_class):
+        """Change the I/O class of the worker thread; applied immediately if the job is running."""
+        self.io_priority = priority_class
+        if self._native_id:
+            set_thread_io_priority(self._native_id, priority_class)
+
+    def interrupt(self):
+        """Stop without discarding the journal, so the job can be resumed on the next launch."""
+        self._interrupted = True
+        self._cancelled = True
+        logging.info(f"Interrupting {self.operation}, progress is kept in the journal")
+
+    def run(self):
+        self._native_id = threading.get_native_id()
+        if self.io_priority != IO_PRIORITY_BEST_EFFORT:
+            set_thread_io_priority(self._native_id, self.io_priority)
+        self._rate_window_start = time.monotonic()
+        total = len(self.src_paths)
+        failure = None
+        try:
+            if self.journal is None:
+                self.journal = TransferJournal.create(self.operation, self.src_paths, self.dest_path, self.verify)
+            else:
+                logging.info(f"Resuming {self.operation} from journal {self.journal.path}")
+            if self.verify:
+                self._hash_pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+            for i, src_path in enumerate(self.src_paths):
+                if self._cancelled:
+                    logging.info(f"{self.operation.capitalize()} cancelled after {i} of {total} items")
+                    break
+                self._index = i
+                if i and self._item_sizes is None:
+                    self._set_percent(i * 100 // total)
+                if src_path in self.journal.done_items:
+                    self._completed_items.append((src_path, self.journal.items[src_path]))
+                    continue
+                if not os.path.exists(src_path):
+                    logging.warning(f"Source path does not exist for {self.operation}: {src_path}")
+                    continue
+                dest = self.journal.items.get(src_path)
+                if dest is None:
+                    base_name = os.path.basename(src_path)
+                    dest = os.path.join(self.dest_path, base_name)
+                    if os.path.exists(dest):
+                        dest = os.path.join(self.dest_path, f"Копия - {base_name}")
+                    self.journal.record_item(src_path, dest)
+                try:
+                    if self.operation == "copy":
+                        self._copy_item(src_path, dest)
+                    elif self.operation == "move":
+                        self._move_item(src_path, dest)
+                    self.journal.record_done(src_path)
+                    self._completed_items.append((src_path, dest))
+                    logging.info(f"Performed {self.operation}: {src_path} -> {dest}")
+                except OperationCancelled:
+                    logging.info(f"{self.operation.capitalize()} cancelled during {src_path}")
+                    break
+                except PermissionError as e:
+                    self.error.emit(f"Нет прав на {self.operation} {src_path}: {e}")
+                    logging.error(f"No permission for {self.operation} {src_path}: {e}")
+                except OSError as e:
+                    self.error.emit(f"Ошибка при {self.operation} {src_path}: {e}")
+                    logging.error(f"Failed {self.operation} {src_path}: {e}")
+            if self.verify:
+                self.verified.emit(self._collect_verification())
+        except Exception as e:
+            # Journal writes (ENOSPC) and setup fail outside the per-item handling
+            failure = e
+            logging.exception(f"{self.operation.capitalize()} to {self.dest_path} aborted")
+        finally:
+            if self._hash_pool:
+                self._hash_pool.shutdown(wait=True)
+                self._hash_pool = None
+            if self.journal:
+                # A user cancel abandons the job; an interrupt or a failure keeps the journal for resuming
+                try:
+                    self.journal.close(complete=not self._interrupted and failure is None)
+                except OSError as e:
+                    logging.error(f"Failed to close transfer journal {self.journal.path}: {e}")
+            if failure is not None:
+                self.error.emit(f"Операция {self.operation} прервана: {failure}")
+            # The progress window closes on finished, so it is emitted whatever happened above
+            self.completed.emit(self._completed_items)
+            self.progress.emit(100)
+            self.finished.emit()
+
+    def _start_byte_progress(self):
+        """Measure the items left once the first one needs its data copied.
+
+        Same-device moves are renames and report progress by item count; walking the trees up
+        front would turn an O(1) rename of a huge tree into two full walks.
+        """
+        if self._item_sizes is not None:
+            return
+        self._item_sizes = {path: tree_size(path) for path in self.src_paths[self._index:]
+                            if path not in self.journal.done_items and os.path.lexists(path)}
+        self._total_bytes = sum(self._item_sizes.values())
+        self._byte_base = max(self._last_percent, 0)
+
+    def _set_percent(self, percent):
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self.progress.emit(percent)
+
+    def _advance(self, nbytes):
+        self._done_bytes += nbytes
+        self._rate_window_bytes += nbytes
+        now = time.monotonic()
+        if now - self._rate_window_start >= 1.0:
+            self.throughput.emit(self._rate_window_bytes / (now - self._rate_window_start))
+            self._rate_window_start = now
+            self._rate_window_bytes = 0
+        if self._total_bytes:
+            self._set_percent(min(100, self._byte_base + int(self._done_bytes * (100 - self._byte_base) / self._total_bytes)))
+
+    def _copy_link(self, src, dest):
+        if os.path.lexists(dest):
+            if src in self.journal.completed:
+                return
+            # Like a file copy, an existing entry of the same name is replaced
+            os.unlink(dest)
+        os.symlink(os.readlink(src), dest)
+        self.journal.record_file(src, 0)
+
+    def _copy_item(self, src, dest):
+        """Copy one top-level item. A copy follows symlinks and copies what they point to, as
+        shutil.copytree/copy2 did; a cross-device move keeps them as links, as shutil.move did."""
+        self._start_byte_progress()
+        follow_links = self.operation == "copy"
+        if os.path.islink(src) and not follow_links:
+            self._copy_link(src, dest)
+        elif os.path.isdir(src):
+            self._copy_tree(src, dest, follow_links)
+        else:
+            self._copy_file(src, dest)
+
+    def _copy_tree(self, src, dest, follow_links):
+        """Merge `src` into `dest`: existing directories are reused and existing files overwritten.
+
+        A failing entry does not stop the rest of the tree; the failures are raised together at
+        the end as shutil.Error, like shutil.copytree does.
+        """
+        errors = []
+        ancestors = {}  # followed directory -> (dev, inode) of it and its parents, to stop at symlink loops
+        copied_dirs = []
+        os.makedirs(dest, exist_ok=True)
+        for root, dirs, files in os.walk(src, followlinks=follow_links):
+            target_root = os.path.normpath(os.path.join(dest, os.path.relpath(root, src)))
+            if follow_links:
+                try:
+                    st = os.stat(root)
+                except OSError as e:
+                    errors.append((root, target_root, str(e)))
+                    dirs[:] = []
+                    continue
+                parents = ancestors.get(os.path.dirname(root), frozenset())
+                if (st.st_dev, st.st_ino) in parents:
+                    dirs[:] = []
+                    continue
+                ancestors[root] = parents | {(st.st_dev, st.st_ino)}
+            copied_dirs.append((root, target_root))
+            for name in dirs:
+                src_dir = os.path.join(root, name)
+                target_dir = os.path.join(target_root, name)
+                try:
+                    if os.path.islink(src_dir) and not follow_links:
+                        self._copy_link(src_dir, target_dir)
+                    else:
+                        os.makedirs(target_dir, exist_ok=True)
+                except OSError as e:
+                    errors.append((src_dir, target_dir, str(e)))
+            for name in files:
+                src_file = os.path.join(root, name)
+                target_file = os.path.join(target_root, name)
+                try:
+                    if os.path.islink(src_file) and not follow_links:
+                        self._copy_link(src_file, target_file)
+                    else:
+                        self._copy_file(src_file, target_file)
+                except OSError as e:
+                    errors.append((src_file, target_file, str(e)))
+        # Children before parents, so setting a directory's times is not undone by writes below it
+        for root, target_root in reversed(copied_dirs):
+            try:
+                shutil.copystat(root, target_root)
+            except OSError as e:
+                errors.append((root, target_root, str(e)))
+        if errors:
+            raise shutil.Error(errors)
+
+    def _copy_file(self, src, dest):
+        """Chunked copy. The source hash is computed from the same buffers we write, so it costs no extra read."""
+        done = self.journal.completed.get(src)
+        if done and os.path.exists(dest) and os.path.getsize(dest) == done[0]:
+            # Finished in an earlier session; only re-check the destination against the recorded hash
+            self._advance(done[0])
+            if self.verify and done[1]:
+                self._pending_checks.append((src, dest, done[1], self._hash_pool.submit(hash_file, dest, True)))
+            return
+        hasher = new_hasher() if self.verify else None
+        offset = self.journal.partial.get(src, 0)
+        if offset and os.path.exists(dest):
+            offset = min(offset, os.path.getsize(dest))
+        else:
+            offset = 0
+        if offset and hasher:
+            hash_prefix(src, offset, hasher)
+        written = offset
+        last_recorded = offset
+        with open(src, 'rb') as fsrc, open(dest, 'r+b' if offset else 'wb') as fdst:
+            if offset:
+                logging.info(f"Resuming {src} at byte {offset}")
+                fsrc.seek(offset)
+                fdst.seek(offset)
+                fdst.truncate()
+                self._advance(offset)
+            while True:
+                if self._cancelled:
+                    if self._interrupted:
+                        fdst.flush()
+                        self.journal.record_partial(src, written)
+                    raise OperationCancelled()
+                chunk = fsrc.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self._throttle.consume(len(chunk), lambda: self._cancelled)
+                fdst.write(chunk)
+                if hasher:
+                    hasher.update(chunk)
+                written += len(chunk)
+                self._advance(len(chunk))
+                if written - last_recorded >= TransferJournal.PARTIAL_EVERY:
+                    fdst.flush()
+                    self.journal.record_partial(src, written)
+                    last_recorded = written
+        shutil.copystat(src, dest)
+        digest = hasher.hexdigest() if hasher else None
+        self.journal.record_file(src, written, digest)
+        if hasher:
+            future = self._hash_pool.submit(hash_file, dest, True)
+            self._pending_checks.append((src, dest, digest, future))
+
+    def _move_item(self, src, dest):
+        try:
+            os.rename(src, dest)
+            if self._item_sizes is not None:
+                # Already measured when an earlier item had to be copied
+                self._advance(self._item_sizes.get(src, 0))
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        # Cross-device move: copy, then drop the source only if the copy is known to be good
+        self._copy_item(src, dest)
+        if self.verify and not all(entry['status'] == 'ok' for entry in self._collect_verification(dest)):
+            # Raised so the item is neither journaled as done nor recorded for undo
+            logging.error(f"Verification failed for {dest}, keeping source {src}")
+            raise OSError(errno.EIO, f"Копия {dest} не прошла проверку, исходный файл сохранён", src)
+        if os.path.isdir(src) and not os.path.islink(src):
+            shutil.rmtree(src)
+        else:
+            os.remove(src)
+
+    def _collect_verification(self, under=None):
+        """Wait for pending destination hashes and build report entries (optionally only those under a path)."""
+        remaining = []
+        for src, dest, expected, future in self._pending_checks:
+            if under and dest != under and not dest.startswith(under + os.sep):
+                remaining.append((src, dest, expected, future))
+                continue
+            try:
+                actual = future.result()
+                status = 'ok' if actual == expected else 'mismatch'
+                detail = expected if status == 'ok' else f"{expected} != {actual}"
+            except OSError as e:
+                status, detail = 'error', str(e)
+            if status != 'ok':
+                logging.error(f"Verification {status} for {src} -> {dest}: {detail}")
+            self._report.append({'src': src, 'dest': dest, 'status': status, 'detail': detail})
+        self._pending_checks = remaining
+        if under:
+            return [entry for entry in self._report if entry['dest'] == under or entry['dest'].startswith(under + os.sep)]
+        return self._report
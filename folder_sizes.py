@@ -0,0 +1,248 @@
+import os
+import array
+import struct
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from PyQt6.QtCore import QThread, pyqtSignal
+from app_paths import app_data_path
+
+WALK_WORKERS = 8  # scandir/lstat spend their time in syscalls, which release the GIL
+
+
+class DirectoryUsage:
+    """What one directory holds directly: size and number of its files, the names of its
+    subdirectories and its hard-linked files as (dev, inode, size), counted once per total."""
+    __slots__ = ('mtime_ns', 'file_bytes', 'file_count', 'subdirs', 'linked')
+
+    def __init__(self, mtime_ns, file_bytes, file_count, subdirs, linked):
+        self.mtime_ns = mtime_ns
+        self.file_bytes = file_bytes  # files with a single link
+        self.file_count = file_count  # all non-directory entries
+        self.subdirs = subdirs
+        self.linked = linked  # array('Q') of dev, inode, size triples
+
+    @classmethod
+    def scan(cls, path, mtime_ns):
+        file_bytes = file_count = 0
+        subdirs = []
+        linked = array.array('Q')
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                file_count += 1
+                if st.st_nlink > 1:
+                    linked.extend((st.st_dev, st.st_ino, st.st_size))
+                else:
+                    file_bytes += st.st_size
+        return cls(mtime_ns, file_bytes, file_count, subdirs, linked)
+
+
+class FolderSizeCache:
+    """DirectoryUsage of every directory walked, keyed by the directory mtime and kept between runs.
+
+    Adding, removing or renaming an entry changes the mtime of its directory, so a directory whose
+    mtime is unchanged is not listed again and a repeated walk costs one lstat per directory.
+    A file rewritten in place keeps its directory mtime; its new size shows once the directory
+    changes. Thread-safe: walker threads read and fill it concurrently.
+
+    Layout (little-endian): header (magic, version, record count), then per directory the path
+    (u32 length + UTF-8), a record header (mtime_ns, file bytes, file count, linked triple count,
+    subdir names blob length), the linked triples as uint64[] and the NUL-separated subdir names.
+    """
+
+    MAGIC = b"FMDU"
+    VERSION = 1
+    MAX_DIRECTORIES = 500000  # beyond this only directories used in this session are kept
+    _HEADER = struct.Struct("<4sHI")
+    _PATH = struct.Struct("<I")
+    _RECORD = struct.Struct("<qQIII")
+
+    def __init__(self, path=None):
+        self.path = path or app_data_path("folder-sizes.cache")
+        self._entries = {}
+        self._used = set()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+
+    def get(self, path, mtime_ns):
+        with self._lock:
+            usage = self._entries.get(path)
+            if usage is None or usage.mtime_ns != mtime_ns:
+                return None
+            self._used.add(path)
+            return usage
+
+    def put(self, path, usage):
+        with self._lock:
+            self._entries[path] = usage
+            self._used.add(path)
+            self._dirty = True
+
+    def load(self):
+        """Read the cache file once; called by the first walk, off the GUI thread."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logging.warning(f"Cannot read folder size cache {self.path}: {e}")
+            return
+        try:
+            entries = self._decode(memoryview(data))
+        except (struct.error, ValueError, UnicodeDecodeError) as e:
+            logging.warning(f"Ignoring damaged folder size cache {self.path}: {e}")
+            return
+        with self._lock:
+            # Directories walked while the file was loading are newer than their cached copies
+            entries.update(self._entries)
+            self._entries = entries
+
+    def _decode(self, data):
+        magic, version, count = self._HEADER.unpack_from(data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            return {}
+        offset = self._HEADER.size
+        entries = {}
+        for _ in range(count):
+            (path_len,) = self._PATH.unpack_from(data, offset)
+            offset += self._PATH.size
+            path = bytes(data[offset:offset + path_len]).decode('utf-8', 'surrogateescape')
+            offset += path_len
+            mtime_ns, file_bytes, file_count, linked_count, names_len = self._RECORD.unpack_from(data, offset)
+            offset += self._RECORD.size
+            linked = array.array('Q')
+            linked.frombytes(data[offset:offset + 24 * linked_count])
+            offset += 24 * linked_count
+            blob = bytes(data[offset:offset + names_len]).decode('utf-8', 'surrogateescape')
+            offset += names_len
+            if len(linked) != 3 * linked_count:
+                raise ValueError(f"truncated record for {path}")
+            entries[path] = DirectoryUsage(mtime_ns, file_bytes, file_count, blob.split('\0') if blob else [], linked)
+        return entries
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = self._entries
+            if len(entries) > self.MAX_DIRECTORIES:
+                entries = {path: entries[path] for path in self._used if path in entries}
+            entries = list(entries.items())
+            self._dirty = False
+        chunks = [self._HEADER.pack(self.MAGIC, self.VERSION, len(entries))]
+        for path, usage in entries:
+            path = path.encode('utf-8', 'surrogateescape')
+            blob = '\0'.join(usage.subdirs).encode('utf-8', 'surrogateescape')
+            chunks.append(self._PATH.pack(len(path)))
+            chunks.append(path)
+            chunks.append(self._RECORD.pack(usage.mtime_ns, usage.file_bytes, usage.file_count, len(usage.linked) // 3, len(blob)))
+            chunks.append(usage.linked.tobytes())
+            chunks.append(blob)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(b''.join(chunks))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Cannot write folder size cache {self.path}: {e}")
+
+
+def directory_usage(path, root_dev, cache):
+    """DirectoryUsage of `path` from the cache or a fresh scan; None for unreadable directories
+    and for another filesystem mounted under the walk's root."""
+    try:
+        st = os.lstat(path)
+        if st.st_dev != root_dev:
+            return None
+        usage = cache.get(path, st.st_mtime_ns)
+        if usage is None:
+            usage = DirectoryUsage.scan(path, st.st_mtime_ns)
+            cache.put(path, usage)
+        return usage
+    except OSError as e:
+        logging.debug(f"Skipping {path} in folder size: {e}")
+        return None
+
+
+def count_linked(usage, seen_links):
+    """Bytes of the directory's hard-linked files not yet counted in `seen_links` (updated)."""
+    total = 0
+    linked = usage.linked
+    for i in range(0, len(linked), 3):
+        key = (linked[i], linked[i + 1])
+        if key not in seen_links:
+            seen_links.add(key)
+            total += linked[i + 2]
+    return total
+
+
+class FolderSizeThread(QThread):
+    """Recursive size and entry count of each folder in `folders`, reported one folder at a time.
+
+    Each folder's tree is walked by a pool of WALK_WORKERS threads, a directory per task. Like
+    `du -x` the walk stays on the folder's filesystem and does not follow symlinks; a file with
+    several hard links inside one folder is counted once. Unreadable directories are skipped.
+    """
+    measured = pyqtSignal(str, object, int)  # folder, total bytes, files and folders inside
+
+    def __init__(self, folders, cache):
+        super().__init__()
+        self.folders = folders
+        self.cache = cache
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        self.cache.load()
+        pool = ThreadPoolExecutor(max_workers=WALK_WORKERS)
+        try:
+            for folder in self.folders:
+                if self._cancelled:
+                    break
+                result = self._measure(pool, folder)
+                if result is not None and not self._cancelled:
+                    self.measured.emit(folder, *result)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _usage(self, path, root_dev):
+        return path, directory_usage(path, root_dev, self.cache)
+
+    def _measure(self, pool, top):
+        try:
+            root_dev = os.lstat(top).st_dev
+        except OSError:
+            return None
+        total = count = 0
+        seen_links = set()
+        pending = {pool.submit(self._usage, top, root_dev)}
+        while pending:
+            if self._cancelled:
+                for future in pending:
+                    future.cancel()
+                return None
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, usage = future.result()
+                if usage is None:
+                    continue
+                total += usage.file_bytes + count_linked(usage, seen_links)
+                count += usage.file_count + len(usage.subdirs)
+                for name in usage.subdirs:
+                    pending.add(pool.submit(self._usage, os.path.join(path, name), root_dev))
+        return total, count
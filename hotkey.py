@@ -4,9 +4,7 @@ from PyQt6.QtGui import QShortcut, QKeySequence
 import os
 import logging
 from treeview import CustomTreeViewWithDrag
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from file_operations import UndoThread
 
 class HotkeyManager:
     def __init__(self, file_manager):
@@ -17,7 +15,7 @@ class HotkeyManager:
         QShortcut(QKeySequence("Alt+Left"), self.file_manager, lambda: self.file_manager.go_back(self.file_manager.current_file_view()))
         QShortcut(QKeySequence("Alt+Right"), self.file_manager, lambda: self.file_manager.go_forward(self.file_manager.current_file_view()))
         QShortcut(QKeySequence("Alt+Up"), self.file_manager, lambda: self.file_manager.go_up(self.file_manager.current_file_view()))
-        QShortcut(QKeySequence("Ctrl+D"), self.file_manager, lambda: self.file_manager.quick_access_clicked(self.file_manager.current_file_view(), self.file_manager.quick_access_panel.quick_access.item(0)))
+        QShortcut(QKeySequence("Ctrl+D"), self.file_manager, lambda: self.file_manager.quick_access_clicked(self.file_manager.current_file_view(), self.file_manager.quick_access_panel.quick_access.quick_access_model.index(0, 0)))
         QShortcut(QKeySequence("Ctrl+H"), self.file_manager, lambda: self.file_manager.navigate_to(self.file_manager.current_file_view(), self.file_manager.QDir.homePath()))
         QShortcut(QKeySequence("Ctrl+R"), self.file_manager, lambda: self.file_manager.refresh_view(self.file_manager.current_file_view()))
         QShortcut(QKeySequence("F5"), self.file_manager, lambda: self.file_manager.refresh_view(self.file_manager.current_file_view()))
@@ -32,6 +30,8 @@ class HotkeyManager:
         QShortcut(QKeySequence("Ctrl+N"), self.file_manager, self.new_folder)
         QShortcut(QKeySequence("Ctrl+Shift+N"), self.file_manager, self.new_file)
         QShortcut(QKeySequence("Ctrl+Z"), self.file_manager, self.undo_action)
+        QShortcut(QKeySequence("Ctrl+Y"), self.file_manager, self.redo_action)
+        QShortcut(QKeySequence("Ctrl+Shift+Z"), self.file_manager, self.redo_action)
 
     def select_all(self, file_view):
         if file_view:
@@ -99,27 +99,15 @@ class HotkeyManager:
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply != QMessageBox.StandardButton.Yes:
             return
+        paths = []
         processed_rows = set()
         for index in selected_indexes:
             if index.column() != 0 or index.row() in processed_rows:
                 continue
             source_index = file_view.model().mapToSource(index)
-            path = file_view.model().sourceModel().item(source_index.row(), 0).data(Qt.ItemDataRole.UserRole)
-            if not os.path.exists(path):
-                logging.warning(f"Path does not exist for deletion: {path}")
-                continue
-            try:
-                if self.file_manager.undo_manager.move_to_trash(path):
-                    self.file_manager.undo_manager.add_action('DELETE', path=path)
-                    logging.info(f"Moved to trash: {path}")
-                else:
-                    logging.error(f"Failed to move {path} to trash")
-                    QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось переместить {path} в корзину")
-            except Exception as e:
-                logging.error(f"Error moving {path} to trash: {e}")
-                QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось переместить {path} в корзину: {e}")
+            paths.append(file_view.model().sourceModel().item(source_index.row(), 0).data(Qt.ItemDataRole.UserRole))
             processed_rows.add(index.row())
-        self.file_manager.refresh_view(file_view)
+        self.file_manager.trash_paths(paths, file_view)
 
     def rename_file(self):
         file_view = self.file_manager.current_file_view()
@@ -200,14 +188,17 @@ class HotkeyManager:
                 QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось создать файл: {e}")
 
     def undo_action(self):
-        try:
-            self.file_manager.undo_manager.undo()
-            file_view = self.file_manager.current_file_view()
-            if file_view:
-                self.file_manager.refresh_view(file_view)
-                logging.info("Performed undo action and refreshed view")
-            else:
-                logging.warning("No file view to refresh after undo")
-        except Exception as e:
-            logging.error(f"Undo failed: {e}")
-            QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось отменить действие: {e}")
+        entry = self.file_manager.undo_manager.pop_undo()
+        if entry is None:
+            return
+        # Undo runs as a background job; errors are reported and the view is refreshed when it ends
+        self.file_manager.start_background_job(UndoThread(self.file_manager.undo_manager, entry), "Отмена операции...")
+        logging.info("Started undo job")
+
+    def redo_action(self):
+        entry = self.file_manager.undo_manager.pop_redo()
+        if entry is None:
+            return
+        self.file_manager.start_background_job(UndoThread(self.file_manager.undo_manager, entry, redo=True),
+                                               "Повтор операции...")
+        logging.info("Started redo job")
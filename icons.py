@@ -0,0 +1,83 @@
+from PyQt6.QtGui import QColor, QIcon, QImage, QPainter, QPixmap, QIconEngine
+from PyQt6.QtCore import Qt
+import os
+import logging
+from collections import OrderedDict
+
+# Общий кэш для всех цветных иконок программы: разобранный SVG хранится по одному на файл,
+# готовые картинки - по (путь, цвет, размер, режим, состояние). Перерисовка кнопок тогда не читает
+# файл и не разбирает XML. Кэш сбрасывается clear_icon_cache() при смене настроек иконок
+_renderers = {}
+_pixmaps = OrderedDict()
+PIXMAP_CACHE_SIZE = 256
+
+
+def clear_icon_cache():
+    _renderers.clear()
+    _pixmaps.clear()
+
+
+def _svg_renderer(svg_path):
+    renderer = _renderers.get(svg_path)
+    if renderer is None:
+        # QtSvg подгружается только при первой отрисовке, а не при запуске программы
+        from PyQt6.QtSvg import QSvgRenderer
+        renderer = _renderers[svg_path] = QSvgRenderer(svg_path)
+    return renderer
+
+
+# Движок иконок: SVG перекрашивается в нужный цвет, результат берётся из общего кэша
+class ColoredSvgIconEngine(QIconEngine):
+    def __init__(self, svg_path, color):
+        super().__init__()
+        self.svg_path = svg_path
+        self.color = QColor(color)
+
+    def clone(self):
+        return ColoredSvgIconEngine(self.svg_path, self.color)
+
+    def pixmap(self, size, mode, state):
+        key = (self.svg_path, self.color.rgba(), size.width(), size.height(), mode, state)
+        pixmap = _pixmaps.get(key)
+        if pixmap is not None:
+            _pixmaps.move_to_end(key)
+            return pixmap
+
+        renderer = _svg_renderer(self.svg_path)
+        if not renderer.isValid():
+            logging.error(f"Invalid SVG file: {self.svg_path}")
+            return QPixmap()  # Возвращаем пустой QPixmap в случае ошибки
+
+        # Создаем пустое изображение
+        image = QImage(size, QImage.Format.Format_ARGB32)
+        image.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(image)
+        renderer.render(painter)
+
+        # Применяем цвет
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
+        painter.fillRect(image.rect(), self.color)
+        painter.end()
+
+        # Преобразуем QImage в QPixmap и запоминаем
+        pixmap = QPixmap.fromImage(image)
+        _pixmaps[key] = pixmap
+        if len(_pixmaps) > PIXMAP_CACHE_SIZE:
+            _pixmaps.popitem(last=False)
+        return pixmap
+
+# Функция для создания иконки с заданным цветом
+def create_colored_icon(icon_path, color):
+    if not os.path.exists(icon_path):
+        logging.error(f"Icon file does not exist: {icon_path}")
+        return QIcon()
+
+    # Проверяем, является ли файл SVG
+    if icon_path.lower().endswith('.svg'):
+        engine = ColoredSvgIconEngine(icon_path, color)
+        icon = QIcon(engine)
+        return icon
+    else:
+        logging.warning(f"Cannot change color of non-SVG icon: {icon_path}. Using original icon.")
+        return QIcon(icon_path)
@@ -0,0 +1,203 @@
+import os
+import array
+import struct
+import logging
+from PyQt6.QtCore import QThread, pyqtSignal
+from app_paths import app_data_path
+
+
+# Four QStandardItems per row with their text, data roles and icon, measured roughly
+MODEL_ROW_BYTES = 1200
+
+
+def entry_type(name, is_dir):
+    """Text of the Type column: 'Folder', the upper-case extension or 'File'."""
+    return "Folder" if is_dir else (os.path.splitext(name)[1][1:].upper() or "File")
+
+
+class ListingSnapshot:
+    """One directory listing as parallel columns, the shape it is shown and cached in.
+
+    mtime_ns is the directory mtime taken before the scan, so a change during the scan
+    still makes the snapshot look stale later. Hidden files are always listed; views hide
+    them in their proxy.
+    """
+    __slots__ = ('path', 'mtime_ns', 'names', 'is_dir', 'sizes', 'mtimes')
+
+    def __init__(self, path, mtime_ns, names, is_dir, sizes, mtimes):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.names = names
+        self.is_dir = is_dir  # bytes, one 0/1 per entry
+        self.sizes = sizes  # array('q')
+        self.mtimes = mtimes  # array('d')
+
+    def __len__(self):
+        return len(self.names)
+
+    def model_bytes(self):
+        """Rough memory taken by the QStandardItemModel built from this listing."""
+        return len(self.names) * MODEL_ROW_BYTES + 2 * sum(map(len, self.names))
+
+    @classmethod
+    def scan(cls, path, should_stop=None):
+        """List `path` with sizes and mtimes; raises OSError, returns None if `should_stop` fired."""
+        mtime_ns = os.stat(path).st_mtime_ns
+        names, is_dir, sizes, mtimes = [], bytearray(), array.array('q'), array.array('d')
+        with os.scandir(path) as it:
+            for entry in it:
+                if should_stop and should_stop():
+                    return None
+                try:
+                    entry_is_dir = entry.is_dir()
+                    st = entry.stat()
+                except PermissionError as e:
+                    logging.warning(f"No access to {entry.path}: {e}")
+                    continue
+                except OSError as e:
+                    logging.error(f"Error processing {entry.path}: {e}")
+                    continue
+                names.append(entry.name)
+                is_dir.append(entry_is_dir)
+                sizes.append(0 if entry_is_dir else st.st_size)
+                mtimes.append(st.st_mtime)
+        return cls(path, mtime_ns, names, bytes(is_dir), sizes, mtimes)
+
+    def entries(self):
+        """Entries as the dicts navigate_to builds rows from."""
+        for name, is_dir, size, mtime in zip(self.names, self.is_dir, self.sizes, self.mtimes):
+            yield {
+                'name': name,
+                'path': os.path.join(self.path, name),
+                'is_dir': bool(is_dir),
+                'size': size,
+                'type': entry_type(name, is_dir),
+                'date': mtime
+            }
+
+    def diff(self, newer):
+        """Names to drop and entries (dicts) to add so that a view of self shows newer."""
+        old = {name: (is_dir, size, mtime) for name, is_dir, size, mtime in zip(self.names, self.is_dir, self.sizes, self.mtimes)}
+        removed = set()
+        added = []
+        for entry, key in zip(newer.entries(), zip(newer.is_dir, newer.sizes, newer.mtimes)):
+            previous = old.pop(entry['name'], None)
+            if previous != key:
+                if previous is not None:
+                    removed.add(entry['name'])
+                added.append(entry)
+        removed.update(old)
+        return removed, added
+
+
+class ListingCache:
+    """Binary file with the last listing of every open tab, painted at startup before any scan.
+
+    Layout (little-endian): header (magic, version, record count), then per listing the path
+    (u32 length + UTF-8), a record header (dir mtime_ns, entry count, names blob length), is_dir as one byte per entry, sizes as int64[], mtimes as float64[] and all
+    names as one NUL-separated blob. Loading is a single read plus array.frombytes per column.
+    """
+
+    MAGIC = b"FMLS"
+    VERSION = 2  # 1 could hold listings without hidden files
+    MAX_ENTRIES = 50000  # bigger listings are not worth the file size; they load cold
+    _HEADER = struct.Struct("<4sHI")
+    _PATH = struct.Struct("<I")
+    _RECORD = struct.Struct("<qII")
+
+    def __init__(self, path=None):
+        self.path = path or app_data_path("listings.cache")
+
+    def load(self):
+        """All cached listings by directory path; a damaged or foreign file gives an empty cache."""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+        except OSError as e:
+            logging.warning(f"Cannot read listing cache {self.path}: {e}")
+            return {}
+        try:
+            return self._decode(memoryview(data))
+        except (struct.error, ValueError, UnicodeDecodeError) as e:
+            logging.warning(f"Ignoring damaged listing cache {self.path}: {e}")
+            return {}
+
+    def _decode(self, data):
+        magic, version, count = self._HEADER.unpack_from(data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            return {}
+        offset = self._HEADER.size
+        snapshots = {}
+        for _ in range(count):
+            (path_len,) = self._PATH.unpack_from(data, offset)
+            offset += self._PATH.size
+            path = bytes(data[offset:offset + path_len]).decode('utf-8', 'surrogateescape')
+            offset += path_len
+            mtime_ns, entries, names_len = self._RECORD.unpack_from(data, offset)
+            offset += self._RECORD.size
+            is_dir = bytes(data[offset:offset + entries])
+            offset += entries
+            sizes = array.array('q')
+            sizes.frombytes(data[offset:offset + 8 * entries])
+            offset += 8 * entries
+            mtimes = array.array('d')
+            mtimes.frombytes(data[offset:offset + 8 * entries])
+            offset += 8 * entries
+            blob = bytes(data[offset:offset + names_len]).decode('utf-8', 'surrogateescape')
+            offset += names_len
+            names = blob.split('\0') if entries else []
+            if len(names) != entries or len(is_dir) != entries:
+                raise ValueError(f"truncated listing for {path}")
+            snapshots[path] = ListingSnapshot(path, mtime_ns, names, is_dir, sizes, mtimes)
+        return snapshots
+
+    def save(self, snapshots):
+        """Replace the cache with the given listings (atomically, so a crash keeps the old file)."""
+        snapshots = [snapshot for snapshot in snapshots if len(snapshot) <= self.MAX_ENTRIES]
+        chunks = [self._HEADER.pack(self.MAGIC, self.VERSION, len(snapshots))]
+        for snapshot in snapshots:
+            path = snapshot.path.encode('utf-8', 'surrogateescape')
+            blob = '\0'.join(snapshot.names).encode('utf-8', 'surrogateescape')
+            chunks.append(self._PATH.pack(len(path)))
+            chunks.append(path)
+            chunks.append(self._RECORD.pack(snapshot.mtime_ns, len(snapshot), len(blob)))
+            chunks.append(bytes(snapshot.is_dir))
+            chunks.append(array.array('q', snapshot.sizes).tobytes())
+            chunks.append(array.array('d', snapshot.mtimes).tobytes())
+            chunks.append(blob)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(b''.join(chunks))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Cannot write listing cache {self.path}: {e}")
+
+
+class ListingRevalidateThread(QThread):
+    """Rescans a directory painted from the cache if its mtime no longer matches the snapshot."""
+    revalidated = pyqtSignal(object, object)  # cached snapshot, fresh snapshot
+    failed = pyqtSignal(str)
+
+    def __init__(self, snapshot):
+        super().__init__()
+        self.snapshot = snapshot
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        path = self.snapshot.path
+        try:
+            if os.stat(path).st_mtime_ns == self.snapshot.mtime_ns:
+                return
+            fresh = ListingSnapshot.scan(path, lambda: self._cancelled)
+        except OSError as e:
+            logging.error(f"Failed to revalidate {path}: {e}")
+            self.failed.emit(f"Не удалось прочитать {path}: {e}")
+            return
+        if fresh is not None and not self._cancelled:
+            self.revalidated.emit(self.snapshot, fresh)
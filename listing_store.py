@@ -0,0 +1,191 @@
+import os
+import logging
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtGui import QStandardItemModel
+from listing_cache import ListingRevalidateThread
+
+HEADER_LABELS = ["Name", "Size", "Type", "Date Modified"]
+
+
+class ListingModel(QStandardItemModel):
+    """Shared model of one directory. name_keys holds the lowercase name of every source row, in
+    row order, so proxies filter by plain list lookups instead of reading items. row_of() finds
+    the row of an exact name through an index built on first use and rebuilt after removals,
+    which shift the rows below."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setHorizontalHeaderLabels(HEADER_LABELS)
+        self.name_keys = []
+        self._names = []
+        self._rows = None  # name -> row, None until needed
+
+    def append_entry(self, items, name):
+        # The key goes first: the proxies filter the new row while it is being inserted
+        self.name_keys.append(name.lower())
+        self._names.append(name)
+        if self._rows is not None:
+            self._rows[name] = len(self._names) - 1
+        self.appendRow(items)
+
+    def remove_entry(self, row):
+        self.removeRow(row)
+        del self.name_keys[row]
+        del self._names[row]
+        self._rows = None
+
+    def rename_entry(self, row, name):
+        if self._rows is not None:
+            self._rows.pop(self._names[row], None)
+            self._rows[name] = row
+        self._names[row] = name
+        self.name_keys[row] = name.lower()
+
+    def row_of(self, name):
+        if self._rows is None:
+            self._rows = {row_name: row for row, row_name in enumerate(self._names)}
+        return self._rows.get(name)
+
+
+class SharedListing:
+    """One directory as the work zones show it: its snapshot, the model built from it and the views on it."""
+    __slots__ = ('snapshot', 'model', 'views')
+
+    def __init__(self, snapshot, model):
+        self.snapshot = snapshot
+        self.model = model
+        self.views = {}  # insertion-ordered set
+
+    def model_bytes(self):
+        return self.snapshot.model_bytes()
+
+
+class ListingStore(QObject):
+    """Listings of the work zones keyed by directory path and shared by every view showing it.
+
+    A directory open in both zones or in several tabs is scanned, built into a QStandardItemModel
+    and held once; each view keeps its own proxy over the shared model, so sort order, selection
+    and column layout stay per view. While any view is attached the directory is watched through
+    the application DirectoryWatcher, and a change runs one background revalidation whose diff is
+    applied to the shared model for all its views. The model is deleted with the last view.
+
+    Attached views always have the current snapshot in `view.listing` (None once detached).
+    The store owns its models (they are its children), so views must not delete them.
+    """
+    created = pyqtSignal(str)  # path whose shared model was just built
+    changed = pyqtSignal(str)  # path whose shared model was updated in place
+
+    def __init__(self, watcher, row_factory, parent=None):
+        super().__init__(parent)
+        self._watcher = watcher
+        self._row_factory = row_factory  # entry dict -> list of QStandardItem
+        self._entries = {}
+        self._view_paths = {}
+        self._threads = {}
+        watcher.directory_changed.connect(self._on_directory_changed)
+
+    def snapshot(self, path):
+        """The live snapshot of `path` if some view shows it."""
+        entry = self._entries.get(path)
+        return entry.snapshot if entry else None
+
+    def attach(self, view, snapshot):
+        """Point `view` at the shared listing of snapshot.path and return the model to show.
+
+        A snapshot newer than the live one (a rescan) is applied to the shared model as a diff.
+        """
+        path = snapshot.path
+        if self._view_paths.get(view) not in (None, path):
+            self.detach(view)
+        entry = self._entries.get(path)
+        if entry is None:
+            model = ListingModel(self)
+            for item_entry in snapshot.entries():
+                model.append_entry(self._row_factory(item_entry), item_entry['name'])
+            entry = self._entries[path] = SharedListing(snapshot, model)
+            self._watcher.watch(path)
+            self.created.emit(path)
+        elif snapshot is not entry.snapshot:
+            self._apply(entry, snapshot)
+        entry.views[view] = None
+        self._view_paths[view] = path
+        view.listing = entry.snapshot
+        return entry.model
+
+    def detach(self, view):
+        """Drop the view's reference; returns the estimated bytes freed (nonzero only for the last view)."""
+        view.listing = None
+        path = self._view_paths.pop(view, None)
+        entry = self._entries.get(path)
+        if entry is None:
+            return 0
+        entry.views.pop(view, None)
+        if entry.views:
+            return 0
+        del self._entries[path]
+        self._watcher.unwatch(path)
+        thread = self._threads.get(path)
+        if thread:
+            thread.cancel()
+        # The view still shows the model until its caller swaps it; deleteLater waits for that
+        entry.model.deleteLater()
+        return entry.model_bytes()
+
+    def model(self, path):
+        entry = self._entries.get(path)
+        return entry.model if entry else None
+
+    def paths(self):
+        return list(self._entries)
+
+    def views_of(self, path):
+        entry = self._entries.get(path)
+        return list(entry.views) if entry else []
+
+    def model_bytes(self):
+        return sum(entry.model_bytes() for entry in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def revalidate(self, path):
+        """Check the directory mtime in the background and apply the changes, if any."""
+        entry = self._entries.get(path)
+        if entry is None or path in self._threads:
+            return
+        thread = ListingRevalidateThread(entry.snapshot)
+        thread.revalidated.connect(self._on_revalidated)
+        thread.finished.connect(lambda: self._threads.pop(path) if self._threads.get(path) is thread else None)
+        self._threads[path] = thread
+        thread.start()
+
+    def _on_directory_changed(self, path):
+        if path in self._entries:
+            self.revalidate(path)
+
+    def _on_revalidated(self, cached, fresh):
+        entry = self._entries.get(cached.path)
+        if entry is None or entry.snapshot is not cached:
+            return  # rescanned meanwhile or no longer shown
+        self._apply(entry, fresh)
+
+    def _apply(self, entry, fresh):
+        removed, added = entry.snapshot.diff(fresh)
+        model = entry.model
+        # Rows of added names go too: a rename typed into the view already shows the new name
+        stale = removed.union(item_entry['name'] for item_entry in added)
+        for row in reversed(range(model.rowCount())):
+            if os.path.basename(model.item(row, 0).data(Qt.ItemDataRole.UserRole)) in stale:
+                model.remove_entry(row)
+        for item_entry in added:
+            model.append_entry(self._row_factory(item_entry), item_entry['name'])
+        entry.snapshot = fresh
+        for view in entry.views:
+            view.listing = fresh
+        logging.info(f"Updated shared listing of {fresh.path} for {len(entry.views)} view(s): -{len(removed)} +{len(added)}")
+        self.changed.emit(fresh.path)
+
+    def shutdown(self):
+        for thread in list(self._threads.values()):
+            thread.cancel()
+            thread.wait()
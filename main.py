@@ -1,21 +1,33 @@
 import sys
 import os
-import shutil
+from startup_profile import profiler  # first, so that --profile-startup sees every import below
 import platform
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                            QSplitter, QAbstractItemView, QProgressDialog, QMenu,
+                            QSplitter, QAbstractItemView, QMenu,
                             QListWidget, QListWidgetItem, QMessageBox, QPushButton)
-from PyQt6.QtCore import Qt, QDir, QTimer, QSettings, QByteArray, QUrl, QAbstractItemModel, QModelIndex, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QDir, QTimer, QSettings, QByteArray, QUrl, QAbstractItemModel, QModelIndex
 from PyQt6.QtGui import QFileSystemModel, QDesktopServices, QIcon, QAction, QStandardItemModel, QStandardItem, QMouseEvent
 from hotkey import HotkeyManager
 from navigation import NavigationBar
 from quick_access import QuickAccessPanel
+from directory_watch import DirectoryWatcher, PathProbeThread, PATH_AVAILABLE, PATH_UNREACHABLE
+from theme import theme, WORK_ZONES
+from view_registry import ViewRegistry
+from listing_cache import ListingCache, ListingSnapshot
+from listing_store import ListingStore, ListingModel
+from folder_sizes import FolderSizeCache, FolderSizeThread
 from treeview import CustomTreeViewWithDrag
 from undo_manager import UndoManager
+from file_operations import FileOperationThread, IO_PRIORITY_BEST_EFFORT
+from progress_dialog import JobProgressDialog
+from trash import TrashThread
+from transfer_journal import TransferJournal
 from datetime import datetime
 import logging
 
-# Configure logging
+profiler.mark("imports done")
+
+# Configure logging for the whole application; the other modules only log
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Resource path for bundled assets
@@ -65,45 +77,6 @@ class SearchModel(QAbstractItemModel):
     def parent(self, index):
         return QModelIndex()
 
-class FileOperationThread(QThread):
-    progress = pyqtSignal(int)
-    finished = pyqtSignal()
-    error = pyqtSignal(str)
-
-    def __init__(self, src_paths, dest_path, operation="copy"):
-        super().__init__()
-        self.src_paths = src_paths
-        self.dest_path = dest_path
-        self.operation = operation
-
-    def run(self):
-        total = len(self.src_paths)
-        for i, src_path in enumerate(self.src_paths):
-            if not os.path.exists(src_path):
-                logging.warning(f"Source path does not exist for {self.operation}: {src_path}")
-                continue
-            base_name = os.path.basename(src_path)
-            dest = os.path.join(self.dest_path, base_name)
-            if os.path.exists(dest):
-                dest = os.path.join(self.dest_path, f"Копия - {base_name}")
-            try:
-                if self.operation == "copy":
-                    if os.path.isdir(src_path):
-                        shutil.copytree(src_path, dest, dirs_exist_ok=True)
-                    else:
-                        shutil.copy2(src_path, dest)
-                elif self.operation == "move":
-                    shutil.move(src_path, dest)
-                self.progress.emit(int((i + 1) / total * 100))
-                logging.info(f"Performed {self.operation}: {src_path} -> {dest}")
-            except PermissionError as e:
-                self.error.emit(f"Нет прав на {self.operation} {src_path}: {e}")
-                logging.error(f"No permission for {self.operation} {src_path}: {e}")
-            except OSError as e:
-                self.error.emit(f"Ошибка при {self.operation} {src_path}: {e}")
-                logging.error(f"Failed {self.operation} {src_path}: {e}")
-        self.finished.emit()
-
 class FileManager(QMainWindow):
     SearchModel = SearchModel
 
@@ -115,6 +88,8 @@ class FileManager(QMainWindow):
         # Initialize settings
         self.settings = QSettings("MyFileManager", "Settings")
         self.load_icon_settings()
+        # One stylesheet for the whole application, rebuilt only when the settings are saved
+        theme.apply()
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -124,21 +99,37 @@ class FileManager(QMainWindow):
         self.main_layout.addWidget(self.splitter)
 
         self.second_zone_active = False
+        self.second_zone_restore_pending = False
         self.active_zone = 1
         self.clipboard = []
         self.clipboard_is_cut = False
         self.QDir = QDir
 
         self.undo_manager = UndoManager()
-
-        self.quick_access_panel = QuickAccessPanel(self)
+        # Which zone and tab every file view belongs to; kept up to date by NavigationBar
+        self.view_registry = ViewRegistry()
+        # One directory watcher shared by the sidebar and the work zones
+        self.directory_watcher = DirectoryWatcher(self)
+        # One listing and one model per directory, however many tabs show it
+        self.listing_store = ListingStore(self.directory_watcher, self.listing_row, self)
+        self.listing_store.changed.connect(self.on_listing_changed)
+        self.listing_store.created.connect(self.measure_folder_sizes)
+        # Folder sizes are computed in the background (if enabled in settings) and cached between runs
+        self.folder_size_cache = FolderSizeCache()
+        self.folder_size_jobs = {}  # directory -> running computation
+        self.folder_size_threads = []  # every running computation, cancelled ones included
+
+        with profiler.span("QuickAccessPanel"):
+            self.quick_access_panel = QuickAccessPanel(self)
         self.splitter.addWidget(self.quick_access_panel.get_widget())
 
         self.zones_widget = QWidget()
+        self.zones_widget.setObjectName(WORK_ZONES)
         self.zones_layout = QHBoxLayout(self.zones_widget)
         self.splitter.addWidget(self.zones_widget)
 
-        self.navigation_bar1 = NavigationBar(self)
+        with profiler.span("NavigationBar"):
+            self.navigation_bar1 = NavigationBar(self)
         self.zones_layout.addWidget(self.navigation_bar1)
 
         self.navigation_bar2 = None
@@ -153,15 +144,21 @@ class FileManager(QMainWindow):
         self.search_performed = False
 
         self.active_threads = []
-
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #2E2E2E;
-            }
-        """)
-
-        self.load_state()
-        self.update_work_zones_style()
+        self.path_probes = []
+        self.pending_tab_views = {}
+        self.prefetch_queue = []
+        self.listing_cache = ListingCache()
+        self.listing_snapshots = {}
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setInterval(500)
+        self.prefetch_timer.timeout.connect(self.prefetch_next_tab)
+
+        with profiler.span("load_state"):
+            self.load_state()
+        profiler.watch_first_paint(self)
+
+        # Offer to resume jobs interrupted in the previous session once the window is up
+        QTimer.singleShot(0, self.offer_resume_transfers)
 
     def load_icon_settings(self):
         app_icon_path = self.settings.value("icon_appicon", "", type=str)
@@ -172,33 +169,22 @@ class FileManager(QMainWindow):
         elif os.path.exists(default_app_icon_path):
             self.setWindowIcon(QIcon(default_app_icon_path))
 
-    def update_work_zones_style(self):
-        settings = QSettings("MyFileManager", "Settings")
-        bg_color = settings.value("work_zones_bg_color", "#2E2E2E", type=str)
-        self.zones_widget.setStyleSheet(f"""
-            QWidget {{
-                background-color: {bg_color};
-            }}
-        """)
-        if self.navigation_bar1:
-            self.navigation_bar1.update_style()
-        if self.navigation_bar2:
-            self.navigation_bar2.update_style()
-
     def toggle_second_zone(self):
+        self.second_zone_restore_pending = False
         if self.second_zone_active:
+            for file_view in self.view_registry.views(self.navigation_bar2):
+                self.release_view(file_view)
             self.navigation_bar2.setParent(None)
             self.zones_layout.removeWidget(self.navigation_bar2)
             self.navigation_bar2.deleteLater()
             self.navigation_bar2 = None
             self.second_zone_active = False
         else:
-            self.navigation_bar2 = NavigationBar(self)
+            self.navigation_bar2 = NavigationBar(self, zone=2)
             self.navigation_bar2.add_new_tab(QDir.homePath())
             self.zones_layout.addWidget(self.navigation_bar2)
             self.second_zone_active = True
         self.save_state()
-        self.update_work_zones_style()
 
     def get_file_view(self, zone):
         return self.navigation_bar1.current_file_view() if zone == 1 else (self.navigation_bar2.current_file_view() if self.second_zone_active else None)
@@ -214,39 +200,94 @@ class FileManager(QMainWindow):
         logging.info(f"Active zone set to {zone}")
 
     def update_active_zone(self, file_view):
-        if file_view in self.navigation_bar1.findChildren(CustomTreeViewWithDrag):
-            self.active_zone = 1
-        elif self.second_zone_active and file_view in self.navigation_bar2.findChildren(CustomTreeViewWithDrag):
-            self.active_zone = 2
+        zone = self.view_registry.zone_of(file_view)
+        if zone:
+            self.active_zone = zone
         logging.info(f"Updated active zone to {self.active_zone}")
 
     def perform_file_operation(self, src_paths, dest_path, operation):
-        thread = FileOperationThread(src_paths, dest_path, operation)
+        verify = self.settings.value("verify_after_copy", False, type=bool)
+        rate_limit = self.settings.value("transfer_rate_limit_mb", 0, type=int) * 1024 * 1024
+        io_priority = self.settings.value("transfer_io_priority", IO_PRIORITY_BEST_EFFORT, type=str)
+        thread = FileOperationThread(src_paths, dest_path, operation, verify=verify,
+                                     rate_limit=rate_limit, io_priority=io_priority)
+        self.start_file_operation_thread(thread)
+
+    def start_background_job(self, thread, title, refresh_view=None, **dialog_options):
+        """Run a BackgroundJob with a non-modal progress window; the views are refreshed when it ends."""
         self.active_threads.append(thread)
-        progress_dialog = QProgressDialog(f"{operation.capitalize()} файлов...", "Отмена", 0, 100, self)
-        progress_dialog.setWindowModality(Qt.WindowModality.NonModal)
+        progress_dialog = JobProgressDialog(title, self, **dialog_options)
         thread.progress.connect(progress_dialog.setValue)
-        thread.finished.connect(progress_dialog.close)
-        thread.finished.connect(lambda: self.refresh_view(self.current_file_view()) if self.current_file_view() else None)
+        progress_dialog.canceled.connect(thread.cancel)
+        thread.finished.connect(progress_dialog.accept)
+        if refresh_view:
+            thread.finished.connect(lambda: self.refresh_view(refresh_view))
+        else:
+            thread.finished.connect(lambda: self.refresh_view(self.current_file_view()) if self.current_file_view() else None)
         thread.finished.connect(lambda: self.active_threads.remove(thread))
         thread.error.connect(lambda msg: QMessageBox.warning(self, "Ошибка", msg))
         thread.start()
         progress_dialog.show()
-
-        # Add undo actions
-        for src_path in src_paths:
-            if not os.path.exists(src_path):
-                logging.warning(f"Source path does not exist for undo logging: {src_path}")
+        return progress_dialog
+
+    def start_file_operation_thread(self, thread):
+        progress_dialog = self.start_background_job(thread, f"{thread.operation.capitalize()} файлов...",
+                                                    rate_limit=thread.rate_limit, io_priority=thread.io_priority)
+        thread.throughput.connect(progress_dialog.set_throughput)
+        progress_dialog.rate_limit_changed.connect(thread.set_rate_limit)
+        progress_dialog.io_priority_changed.connect(thread.set_io_priority)
+        thread.verified.connect(self.show_verification_report)
+        # Undo is recorded from what was actually done, as one transaction for the whole operation
+        thread.completed.connect(lambda pairs: self.undo_manager.add_transaction(thread.operation.upper(), pairs))
+
+    def trash_paths(self, paths, file_view=None, on_trashed=None):
+        """Move paths to the trash in the background and record undo actions for what was moved.
+        on_trashed, if given, receives the (path, trash path) pairs actually moved."""
+        if not paths:
+            return
+        thread = TrashThread(self.undo_manager.trash, paths)
+        thread.trashed.connect(self.on_paths_trashed)
+        if on_trashed:
+            thread.trashed.connect(on_trashed)
+        self.start_background_job(thread, "Перемещение в корзину...", refresh_view=file_view)
+
+    def on_paths_trashed(self, moved):
+        self.undo_manager.add_transaction('DELETE', moved)
+        logging.info(f"Moved {len(moved)} items to trash")
+
+    def offer_resume_transfers(self):
+        journals = TransferJournal.pending()
+        if not journals:
+            return
+        details = "\n".join(f"{journal.operation}: {len(journal.src_paths)} эл. -> {journal.dest_path}" for journal in journals)
+        reply = QMessageBox.question(self, "Прерванные операции",
+                                     f"Найдены незавершённые операции с файлами ({len(journals)}):\n{details}\n\nПродолжить их?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        for journal in journals:
+            if reply != QMessageBox.StandardButton.Yes:
+                journal.discard()
+                logging.info(f"Discarded interrupted {journal.operation} to {journal.dest_path}")
                 continue
-            base_name = os.path.basename(src_path)
-            dest = os.path.join(dest_path, base_name)
-            if os.path.exists(dest):
-                dest = os.path.join(dest_path, f"Копия - {base_name}")
-            if operation == "copy":
-                self.undo_manager.add_action('COPY', dest_path=dest)
-            elif operation == "move":
-                self.undo_manager.add_action('MOVE', src_path=src_path, dest_path=dest)
-            logging.info(f"Added undo action for {operation}: {src_path} -> {dest}")
+            self.start_file_operation_thread(FileOperationThread.resume(journal))
+            logging.info(f"Resumed interrupted {journal.operation} to {journal.dest_path}")
+
+    def show_verification_report(self, report):
+        if not report:
+            return
+        failed = [entry for entry in report if entry['status'] != 'ok']
+        box = QMessageBox(self)
+        box.setWindowTitle("Проверка копирования")
+        if failed:
+            box.setIcon(QMessageBox.Icon.Warning)
+            box.setText(f"Проверено файлов: {len(report)}. Не совпадают или не прочитаны: {len(failed)}.")
+        else:
+            box.setIcon(QMessageBox.Icon.Information)
+            box.setText(f"Проверено файлов: {len(report)}. Все копии идентичны оригиналам.")
+        status_labels = {'ok': "OK", 'mismatch': "НЕ СОВПАДАЕТ", 'error': "ОШИБКА"}
+        box.setDetailedText("\n".join(f"[{status_labels[entry['status']]}] {entry['src']} -> {entry['dest']} ({entry['detail']})"
+                                       for entry in failed + [entry for entry in report if entry['status'] == 'ok']))
+        box.show()
+        logging.info(f"Verification report: {len(report)} files, {len(failed)} failed")
 
     def go_back(self, file_view):
         if file_view and file_view.current_index > 0:
@@ -308,7 +349,7 @@ class FileManager(QMainWindow):
                     logging.error(f"Failed to open file {absolute_path}: {e}")
                     QMessageBox.warning(self, "Ошибка", f"Не удалось открыть файл {absolute_path}: {str(e)}")
 
-    def navigate_to(self, file_view, path):
+    def navigate_to(self, file_view, path, rescan=False):
         if not file_view or not os.path.exists(path):
             logging.error(f"Cannot navigate: file_view={file_view}, path={path} does not exist")
             return
@@ -318,101 +359,257 @@ class FileManager(QMainWindow):
         file_view.history.append(path)
         file_view.current_index = len(file_view.history) - 1
 
-        model = QStandardItemModel()
-        model.setHorizontalHeaderLabels(["Name", "Size", "Type", "Date Modified"])
-
-        dir_entries = []
-        settings = QSettings("MyFileManager", "Settings")
-        hide_hidden_files = settings.value("hide_hidden_files", False, type=bool)
-
-        try:
-            for entry in os.scandir(path):
-                try:
-                    if hide_hidden_files and entry.name.startswith('.'):
-                        continue
-
-                    is_dir = entry.is_dir()
-                    name = entry.name
-                    size = os.path.getsize(entry.path) if not is_dir else 0
-                    mtime = os.path.getmtime(entry.path)
-                    file_type = "Folder" if is_dir else (os.path.splitext(name)[1][1:].upper() or "File")
-                    dir_entries.append({
-                        'name': name,
-                        'path': entry.path,
-                        'is_dir': is_dir,
-                        'size': size,
-                        'type': file_type,
-                        'date': mtime
-                    })
-                    logging.debug(f"Added entry {name}: is_dir={is_dir}, size={size}, type={file_type}, date={mtime}")
-                except PermissionError as e:
-                    logging.warning(f"No access to {entry.path}: {e}")
-                    continue
-                except OSError as e:
-                    logging.error(f"Error processing {entry.path}: {e}")
-                    continue
-        except PermissionError as e:
-            logging.error(f"No access to {path}: {e}")
-            QMessageBox.warning(self, "Ошибка", f"Нет доступа к {path}: {e}")
-            return
-        except OSError as e:
-            logging.error(f"Failed to open {path}: {e}")
-            QMessageBox.warning(self, "Ошибка", f"Не удалось открыть {path}: {e}")
-            return
-
-        for entry in dir_entries:
-            name_item = QStandardItem(entry['name'])
-            name_item.setData(entry['path'], Qt.ItemDataRole.UserRole)
-            name_item.setData(0 if entry['is_dir'] else 1, Qt.ItemDataRole.UserRole + 1)
-            name_item.setData(entry['name'].lower(), Qt.ItemDataRole.UserRole + 2)
-            name_item.setEditable(True)
+        # A directory open in another tab is not reread: its listing is shared and watched for changes.
+        # Hidden files are always listed; the view's proxy model hides them
+        listing = None if rescan else self.listing_store.snapshot(path)
+        if listing is None:
+            try:
+                with profiler.span("first navigate_to scan", once=True):
+                    listing = ListingSnapshot.scan(path)
+            except PermissionError as e:
+                logging.error(f"No access to {path}: {e}")
+                QMessageBox.warning(self, "Ошибка", f"Нет доступа к {path}: {e}")
+                return
+            except OSError as e:
+                logging.error(f"Failed to open {path}: {e}")
+                QMessageBox.warning(self, "Ошибка", f"Не удалось открыть {path}: {e}")
+                return
 
-            size_item = QStandardItem(file_view.format_size(entry['size']) if not entry['is_dir'] else "")
-            size_item.setData(entry['size'], Qt.ItemDataRole.UserRole)
-            size_item.setData(entry['size'] if not entry['is_dir'] else -1, Qt.ItemDataRole.UserRole + 1)
-            size_item.setEditable(False)
+        self.show_listing(file_view, listing)
 
-            type_item = QStandardItem(entry['type'])
-            type_item.setData(entry['type'].lower(), Qt.ItemDataRole.UserRole + 1)
-            type_item.setEditable(False)
+    def listing_row(self, entry):
+        name_item = QStandardItem(entry['name'])
+        name_item.setData(entry['path'], Qt.ItemDataRole.UserRole)
+        name_item.setData(0 if entry['is_dir'] else 1, Qt.ItemDataRole.UserRole + 1)
+        name_item.setData(entry['name'].lower(), Qt.ItemDataRole.UserRole + 2)
+        name_item.setEditable(True)
 
-            date_item = QStandardItem(datetime.fromtimestamp(entry['date']).strftime('%d.%m.%Y %H:%M') if entry['date'] else "")
-            date_item.setData(entry['date'], Qt.ItemDataRole.UserRole)
-            date_item.setData(entry['date'], Qt.ItemDataRole.UserRole + 1)
-            date_item.setEditable(False)
+        size_item = QStandardItem(CustomTreeViewWithDrag.format_size(entry['size']) if not entry['is_dir'] else "")
+        size_item.setData(entry['size'], Qt.ItemDataRole.UserRole)
+        size_item.setData(entry['size'] if not entry['is_dir'] else -1, Qt.ItemDataRole.UserRole + 1)
+        size_item.setEditable(False)
 
-            if entry['is_dir']:
-                name_item.setIcon(QIcon.fromTheme("folder"))
-            else:
-                name_item.setIcon(QIcon.fromTheme("text-x-generic"))
+        type_item = QStandardItem(entry['type'])
+        type_item.setData(entry['type'].lower(), Qt.ItemDataRole.UserRole + 1)
+        type_item.setEditable(False)
 
-            model.appendRow([name_item, size_item, type_item, date_item])
+        date_item = QStandardItem(datetime.fromtimestamp(entry['date']).strftime('%d.%m.%Y %H:%M') if entry['date'] else "")
+        date_item.setData(entry['date'], Qt.ItemDataRole.UserRole)
+        date_item.setData(entry['date'], Qt.ItemDataRole.UserRole + 1)
+        date_item.setEditable(False)
 
-        file_view.setModel(model)
+        if entry['is_dir']:
+            name_item.setIcon(QIcon.fromTheme("folder"))
+        else:
+            name_item.setIcon(QIcon.fromTheme("text-x-generic"))
+
+        return [name_item, size_item, type_item, date_item]
+
+    def show_listing(self, file_view, listing):
+        """Show a listing (fresh or a cached snapshot); the tab history already points at listing.path."""
+        path = listing.path
+        nav_bar = self.view_registry.nav_bar_of(file_view)
+        is_current = file_view is nav_bar.current_file_view()
+        if path != self.view_registry.record(file_view).path and file_view.proxy_model.filter_text():
+            # The quick filter belongs to the folder it was typed in
+            file_view.proxy_model.set_filter_text("")
+            if is_current:
+                nav_bar.search_edit.clear()
+        file_view.setModel(self.listing_store.attach(file_view, listing))
+        profiler.mark("first listing shown", once=True)
         file_view.setColumnHidden(1, False)
         file_view.setColumnHidden(2, False)
         file_view.setColumnHidden(3, False)
 
-        nav_bar = self.navigation_bar1 if file_view in self.navigation_bar1.findChildren(CustomTreeViewWithDrag) else self.navigation_bar2
-        nav_bar.tab_widget.setTabText(nav_bar.tab_widget.currentIndex(), os.path.basename(path) or "Root")
-        nav_bar.update_path_edit(file_view)
-        self.update_active_zone(file_view)
+        self.view_registry.set_path(file_view, path)
+        nav_bar.tab_widget.setTabText(nav_bar.tab_widget.indexOf(file_view.parent()), os.path.basename(path) or "Root")
+        # A background tab (e.g. one restored after its path was probed) does not take over the path bar and zone
+        if is_current:
+            nav_bar.update_path_edit(file_view)
+            self.update_active_zone(file_view)
+            self.view_registry.touch(file_view)
         self.restore_column_state(file_view)
-        file_view.update_style()
 
         column = file_view.header().sortIndicatorSection()
         order = file_view.header().sortIndicatorOrder()
         logging.info(f"Sorting by column {column}, order: {'Ascending' if order == Qt.SortOrder.AscendingOrder else 'Descending'}")
         file_view.proxy_model.setSortOrder(order)
         file_view.proxy_model.sort(column, order)
+        self.update_tab_memory_readout(file_view)
+        self.enforce_listing_budget()
+
+    def on_listing_changed(self, path):
+        """A shared directory listing was updated in place (changes on disk or a reread)."""
+        for file_view in self.listing_store.views_of(path):
+            file_view.proxy_model.sort(file_view.header().sortIndicatorSection(), file_view.header().sortIndicatorOrder())
+            self.update_tab_memory_readout(file_view)
+        self.enforce_listing_budget()
+        # Rows of new and changed folders were recreated without a size
+        self.measure_folder_sizes(path)
+
+    def measure_folder_sizes(self, path):
+        """Start a background size computation for the folder rows of a directory that have no size yet."""
+        if not self.settings.value("folder_sizes", False, type=bool):
+            return
+        model = self.listing_store.model(path)
+        if model is None:
+            return
+        job = self.folder_size_jobs.pop(path, None)
+        if job:
+            job.cancel()  # the new pass skips rows that are already sized
+        folders = [model.item(row, 0).data(Qt.ItemDataRole.UserRole) for row in range(model.rowCount())
+                   if model.item(row, 1).data(Qt.ItemDataRole.UserRole + 1) == -1]
+        if not folders:
+            return
+        thread = FolderSizeThread(folders, self.folder_size_cache)
+        thread.measured.connect(lambda folder, total, count: self.on_folder_measured(path, folder, total, count))
+        thread.finished.connect(lambda: self.folder_size_finished(path, thread))
+        self.folder_size_jobs[path] = thread
+        self.folder_size_threads.append(thread)
+        thread.start()
+        logging.info(f"Measuring {len(folders)} folder(s) in {path}")
+
+    def measure_all_folder_sizes(self):
+        for path in self.listing_store.paths():
+            self.measure_folder_sizes(path)
+
+    def folder_size_finished(self, path, thread):
+        if self.folder_size_jobs.get(path) is thread:
+            del self.folder_size_jobs[path]
+        self.folder_size_threads.remove(thread)
+
+    def open_disk_usage(self, file_view):
+        # The disk usage module is loaded on first use so that it does not slow down startup
+        from disk_usage_view import DiskUsageDialog
+        path = self.current_path(file_view) if file_view else QDir.homePath()
+        self.disk_usage_dialog = DiskUsageDialog(self, path)
+        self.disk_usage_dialog.show()
+        logging.info(f"Opened disk usage view for {path}")
+
+    def open_duplicates(self, paths):
+        # Loaded on first use, like the disk usage view
+        from duplicates_view import DuplicatesDialog
+        self.duplicates_dialog = DuplicatesDialog(self, paths)
+        self.duplicates_dialog.show()
+        logging.info(f"Opened duplicate search for {paths}")
+
+    def stop_folder_size_jobs(self):
+        self.folder_size_jobs.clear()
+        for thread in self.folder_size_threads[:]:
+            thread.cancel()
+            thread.wait()
+
+    def on_folder_measured(self, path, folder, total, count):
+        model = self.listing_store.model(path)
+        if model is None:
+            job = self.folder_size_jobs.pop(path, None)
+            if job:
+                job.cancel()  # no view shows the directory any more
+            return
+        # Rows are found through the model's name index; scanning the rows for every folder would be O(N^2)
+        row = model.row_of(os.path.basename(folder))
+        if row is None or model.item(row, 0).data(Qt.ItemDataRole.UserRole) != folder:
+            return
+        # The row is updated in place; the proxy re-sorts it only when sorting by size
+        size_item = model.item(row, 1)
+        size_item.setText(f"{CustomTreeViewWithDrag.format_size(total)} ({count})")
+        size_item.setToolTip(f"Файлов и папок внутри: {count}")
+        size_item.setData(total, Qt.ItemDataRole.UserRole)
+        size_item.setData(total, Qt.ItemDataRole.UserRole + 1)
+
+    def view_model_bytes(self, file_view):
+        """Estimated memory of a tab's listing model (shared with other tabs on the same directory)."""
+        return file_view.listing.model_bytes() if file_view.listing is not None else 0
+
+    def update_tab_memory_readout(self, file_view):
+        nav_bar = self.view_registry.nav_bar_of(file_view)
+        if not nav_bar:
+            return
+        path = file_view.pending_path or self.current_path(file_view)
+        model_bytes = self.view_model_bytes(file_view)
+        if model_bytes:
+            readout = f"В памяти: ~{model_bytes / (1024 * 1024):.1f} МБ, строк: {len(file_view.listing)}"
+            shared = len(self.listing_store.views_of(path))
+            if shared > 1:
+                readout += f", общий список для {shared} вкладок"
+        else:
+            readout = "Список не загружен"
+        nav_bar.tab_widget.setTabToolTip(nav_bar.tab_widget.indexOf(file_view.parent()), f"{path}\n{readout}")
+
+    def enforce_listing_budget(self):
+        """Keep the models of all tabs within the memory budget by releasing the least recently used ones."""
+        budget = self.settings.value("listing_memory_budget_mb", 64, type=int) * 1024 * 1024
+        if budget <= 0:
+            return
+        total = self.listing_store.model_bytes()
+        if total <= budget:
+            return
+        visible = {nav_bar.current_file_view() for nav_bar in (self.navigation_bar1, self.navigation_bar2) if nav_bar}
+        for file_view in self.view_registry.least_recently_used():
+            if total <= budget:
+                break
+            if file_view.listing is None:
+                continue
+            # A shared listing is freed only together with every tab on that directory
+            views = self.listing_store.views_of(file_view.listing.path)
+            if visible.intersection(views):
+                continue
+            for shared_view in views:
+                total -= self.drop_view_model(shared_view)
+        logging.info(f"Listing models after eviction: ~{total / (1024 * 1024):.1f} MB of {budget / (1024 * 1024):.0f} MB")
+
+    def drop_view_model(self, file_view):
+        """Release the model of an inactive tab. A compact listing snapshot is kept, so the tab repaints
+        instantly when opened and then checks against the disk, as it does after startup."""
+        path = self.current_path(file_view)
+        if file_view.listing is not None and file_view.listing.path == path:
+            self.listing_snapshots[path] = file_view.listing
+        file_view.saved_column_state = file_view.header().saveState()
+        file_view.pending_path = path
+        freed = self.listing_store.detach(file_view)
+        file_view.setModel(None)
+        self.update_tab_memory_readout(file_view)
+        logging.info(f"Released listing model of inactive tab {path}")
+        return freed
+
+    def release_view(self, file_view):
+        """A tab was closed: remove its view from the registry and the queues and release its model."""
+        self.view_registry.unregister(file_view)
+        views = self.pending_tab_views.get(file_view.pending_path)
+        if views and file_view in views:
+            views.remove(file_view)
+        if file_view in self.prefetch_queue:
+            self.prefetch_queue.remove(file_view)
+        self.listing_store.detach(file_view)
+        file_view.setModel(None)
+
+    def save_listing_snapshots(self):
+        snapshots = {}
+        for file_view in self.view_registry.views():
+            if file_view.pending_path:
+                snapshot = file_view.listing or self.listing_snapshots.get(file_view.pending_path)
+            elif file_view.listing and file_view.listing.path == self.current_path(file_view) \
+                    and isinstance(file_view.proxy_model.sourceModel(), QStandardItemModel):
+                snapshot = file_view.listing
+            else:
+                snapshot = None
+            if snapshot:
+                snapshots[snapshot.path] = snapshot
+        self.listing_cache.save(snapshots.values())
 
     def refresh_view(self, file_view):
         if not file_view:
             logging.warning("No file view to refresh")
             return
+        if file_view.pending_path:
+            # Not loaded yet: background tabs wait to be opened, the current one is probed and read off the GUI thread
+            nav_bar = self.view_registry.nav_bar_of(file_view)
+            if nav_bar and file_view is nav_bar.current_file_view():
+                self.probe_tab_paths([file_view])
+            return
         current_path = self.current_path(file_view)
         if os.path.exists(current_path):
-            self.navigate_to(file_view, current_path)
+            self.navigate_to(file_view, current_path, rescan=True)
             logging.info(f"Refreshed view at {current_path}")
 
     def quick_access_clicked(self, file_view, item):
@@ -472,6 +669,9 @@ class FileManager(QMainWindow):
             os.rename(old_path, new_path)
             item.setData(new_path, Qt.ItemDataRole.UserRole)
             item.setData(new_name.lower(), Qt.ItemDataRole.UserRole + 2)
+            model = file_view.proxy_model.sourceModel()
+            if isinstance(model, ListingModel):
+                model.rename_entry(source_index.row(), new_name)
             self.undo_manager.add_action('RENAME', old_path=old_path, new_path=new_path)
             logging.info(f"Successfully renamed: {old_path} -> {new_path}")
         except PermissionError as e:
@@ -542,37 +742,46 @@ class FileManager(QMainWindow):
             return
 
         search_model = self.SearchModel(results)
+        self.listing_store.detach(file_view)
         file_view.setModel(search_model)
         file_view.setRootIndex(QModelIndex())
         file_view.setColumnHidden(2, True)
         file_view.setColumnHidden(3, True)
         file_view.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         file_view.header().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        file_view.update_style()
         logging.info(f"Displayed {len(results)} search results")
 
     def save_state(self):
         settings = QSettings("MyFileManager", "Settings")
         settings.setValue("geometry", self.geometry())
         settings.setValue("splitterSizes", self.splitter.sizes())
-        settings.setValue("secondZoneActive", self.second_zone_active)
+        # While the second zone waits for its deferred restore, its saved tabs are left untouched
+        settings.setValue("secondZoneActive", self.second_zone_active or self.second_zone_restore_pending)
 
         open_tabs1 = []
-        for i in range(self.navigation_bar1.tab_widget.count()):
-            file_view = self.navigation_bar1.tab_widget.widget(i).findChild(CustomTreeViewWithDrag)
+        for i, file_view in enumerate(self.view_registry.views(self.navigation_bar1)):
             path = self.current_path(file_view)
             open_tabs1.append(path)
-            settings.setValue(f"tab1_{i}_columnState", file_view.header().saveState())
+            if file_view.pending_path:
+                # A tab that is not loaded yet keeps the column state read at startup
+                if file_view.saved_column_state is not None:
+                    settings.setValue(f"tab1_{i}_columnState", file_view.saved_column_state)
+            else:
+                settings.setValue(f"tab1_{i}_columnState", file_view.header().saveState())
         settings.setValue("openTabs1", open_tabs1)
         settings.setValue("currentTabIndex1", self.navigation_bar1.tab_widget.currentIndex())
 
         if self.second_zone_active and self.navigation_bar2:
             open_tabs2 = []
-            for i in range(self.navigation_bar2.tab_widget.count()):
-                file_view = self.navigation_bar2.tab_widget.widget(i).findChild(CustomTreeViewWithDrag)
+            for i, file_view in enumerate(self.view_registry.views(self.navigation_bar2)):
                 path = self.current_path(file_view)
                 open_tabs2.append(path)
-                settings.setValue(f"tab2_{i}_columnState", file_view.header().saveState())
+                if file_view.pending_path:
+                    # A tab that is not loaded yet keeps the column state read at startup
+                    if file_view.saved_column_state is not None:
+                        settings.setValue(f"tab2_{i}_columnState", file_view.saved_column_state)
+                else:
+                    settings.setValue(f"tab2_{i}_columnState", file_view.header().saveState())
             settings.setValue("openTabs2", open_tabs2)
             settings.setValue("currentTabIndex2", self.navigation_bar2.tab_widget.currentIndex())
 
@@ -584,10 +793,10 @@ class FileManager(QMainWindow):
             logging.warning("No file view to restore column state")
             return
         settings = QSettings("MyFileManager", "Settings")
-        nav_bar = self.navigation_bar1 if file_view in self.navigation_bar1.findChildren(CustomTreeViewWithDrag) else self.navigation_bar2
+        nav_bar = self.view_registry.nav_bar_of(file_view)
         tab_index = nav_bar.tab_widget.indexOf(file_view.parent())
-        zone_prefix = "tab1" if nav_bar == self.navigation_bar1 else "tab2"
-        column_state = settings.value(f"{zone_prefix}_{tab_index}_columnState")
+        zone_prefix = f"tab{nav_bar.zone}"
+        column_state = file_view.saved_column_state or settings.value(f"{zone_prefix}_{tab_index}_columnState")
 
         if column_state:
             file_view.header().restoreState(column_state)
@@ -598,7 +807,6 @@ class FileManager(QMainWindow):
             header.resizeSection(2, 100)
             header.resizeSection(3, 150)
             header.setSortIndicator(0, Qt.SortOrder.AscendingOrder)
-        file_view.update_style()
         logging.debug("Restored column state for file view")
 
     def load_state(self):
@@ -611,54 +819,136 @@ class FileManager(QMainWindow):
         if splitter_sizes:
             self.splitter.setSizes([int(size) for size in splitter_sizes])
 
+        # Tabs are created from the saved paths right away; their reachability is checked in the background.
+        # The last listings of the tabs are read from one file and shown before the check
+        self.listing_snapshots = self.listing_cache.load()
         open_tabs1 = settings.value("openTabs1", [])
-        if open_tabs1 is None:
-            open_tabs1 = []
-        if open_tabs1:
-            for path in open_tabs1:
-                if os.path.exists(path):
-                    self.navigation_bar1.add_new_tab(path)
-                else:
-                    self.navigation_bar1.add_new_tab(QDir.homePath())
-        else:
-            self.navigation_bar1.add_new_tab(QDir.homePath())
+        self.restore_zone_tabs(self.navigation_bar1, "tab1", open_tabs1 or [], settings)
 
-        self.second_zone_active = settings.value("secondZoneActive", False, type=bool)
-        if self.second_zone_active:
-            self.navigation_bar2 = NavigationBar(self)
+        # The second zone is built right after the window is first painted
+        self.second_zone_restore_pending = settings.value("secondZoneActive", False, type=bool)
+        if self.second_zone_restore_pending:
+            QTimer.singleShot(0, self.restore_second_zone)
+        logging.info("Loaded application state")
+
+    def restore_zone_tabs(self, nav_bar, zone_prefix, paths, settings):
+        pending_views = []
+        for i, path in enumerate(paths):
+            file_view = nav_bar.add_new_tab(path, deferred=True)
+            file_view.saved_column_state = settings.value(f"{zone_prefix}_{i}_columnState")
+            pending_views.append(file_view)
+        if not paths:
+            nav_bar.add_new_tab(QDir.homePath())
+
+        for file_view in self.view_registry.views(nav_bar):
+            if file_view.proxy_model.sourceModel():
+                file_view.proxy_model.sourceModel().dataChanged.connect(self.handle_data_changed)
+
+        # Only the active tab of a zone loads right away, the others when opened
+        # or one at a time when idle if background loading is enabled
+        current_view = nav_bar.current_file_view()
+        if current_view in pending_views:
+            self.probe_tab_paths([current_view])
+        if settings.value("prefetch_tabs", False, type=bool):
+            self.prefetch_queue.extend(file_view for file_view in pending_views if file_view is not current_view)
+            self.prefetch_timer.start()
+
+    def restore_second_zone(self):
+        if not self.second_zone_restore_pending:
+            return  # the zone was already toggled by hand
+        self.second_zone_restore_pending = False
+        with profiler.span("second zone"):
+            settings = QSettings("MyFileManager", "Settings")
+            self.navigation_bar2 = NavigationBar(self, zone=2)
             self.zones_layout.addWidget(self.navigation_bar2)
-            open_tabs2 = settings.value("openTabs2", [])
-            if open_tabs2 is None:
-                open_tabs2 = []
-            if open_tabs2:
-                for path in open_tabs2:
-                    if os.path.exists(path):
-                        self.navigation_bar2.add_new_tab(path)
-                    else:
-                        self.navigation_bar2.add_new_tab(QDir.homePath())
+            self.second_zone_active = True
+            self.restore_zone_tabs(self.navigation_bar2, "tab2", settings.value("openTabs2", []) or [], settings)
+            self.quick_access_panel.load_icons()
+
+    def probe_tab_paths(self, file_views):
+        paths = []
+        for file_view in file_views:
+            # A live shared listing first (the directory is open in another tab), then a cached snapshot
+            snapshot = self.listing_store.snapshot(file_view.pending_path) or self.listing_snapshots.get(file_view.pending_path)
+            if file_view.listing is None and snapshot:
+                self.listing_snapshots.pop(file_view.pending_path, None)
+                self.show_listing(file_view, snapshot)
+            views = self.pending_tab_views.setdefault(file_view.pending_path, [])
+            if file_view in views:
+                continue  # already being probed
+            views.append(file_view)
+            paths.append(file_view.pending_path)
+        if not paths:
+            return
+        probe = PathProbeThread(paths)
+        probe.probed.connect(self.on_tab_path_probed)
+        probe.finished.connect(lambda: self.path_probes.remove(probe))
+        self.path_probes.append(probe)
+        probe.start()
+
+    def on_tab_path_probed(self, path, status):
+        for file_view in self.pending_tab_views.pop(path, []):
+            nav_bar = self.view_registry.nav_bar_of(file_view)
+            tab_index = nav_bar.tab_widget.indexOf(file_view.parent()) if nav_bar else -1
+            if tab_index < 0:
+                continue  # the tab was closed while it was probed
+            if status == PATH_UNREACHABLE:
+                # The path is kept: the volume may come back, and F5 probes it again
+                if file_view.listing is not None:
+                    # A cached snapshot from an unreachable volume is not shown: any action on it would hang
+                    self.listing_store.detach(file_view)
+                    file_view.setModel(QStandardItemModel())
+                nav_bar.tab_widget.setTabText(tab_index, f"{os.path.basename(path) or 'Root'} (недоступно)")
+                logging.warning(f"Tab path {path} is unreachable")
+                continue
+            file_view.pending_path = None
+            if status == PATH_AVAILABLE and file_view.listing is not None and file_view.listing.path == path:
+                self.listing_store.revalidate(path)
             else:
-                self.navigation_bar2.add_new_tab(QDir.homePath())
-
-        for nav_bar in [self.navigation_bar1, self.navigation_bar2]:
-            if nav_bar:
-                for i in range(nav_bar.tab_widget.count()):
-                    file_view = nav_bar.tab_widget.widget(i).findChild(CustomTreeViewWithDrag)
-                    if file_view:
-                        file_view.update_style()
-                        file_view.proxy_model.sourceModel().dataChanged.connect(self.handle_data_changed)
-        logging.info("Loaded application state")
+                # navigate_to adds the path to the history again; the earlier history of a released tab is kept
+                if file_view.history[-1:] == [path]:
+                    file_view.history.pop()
+                file_view.current_index = len(file_view.history) - 1
+                self.navigate_to(file_view, path if status == PATH_AVAILABLE else QDir.homePath())
+                self.restore_column_state(file_view)
+            file_view.saved_column_state = None
+            if file_view.proxy_model.sourceModel():
+                file_view.proxy_model.sourceModel().dataChanged.connect(self.handle_data_changed)
+
+    def prefetch_next_tab(self):
+        """Background loading: one tab at a time, and only after the previous probe has finished."""
+        if self.path_probes:
+            return
+        while self.prefetch_queue:
+            file_view = self.prefetch_queue.pop(0)
+            if file_view.pending_path and self.view_registry.record(file_view):
+                self.probe_tab_paths([file_view])
+                return
+        self.prefetch_timer.stop()
 
     def closeEvent(self, event):
         self.save_state()
+        self.save_listing_snapshots()
+        self.prefetch_timer.stop()
         for thread in self.active_threads[:]:
-            thread.quit()
+            # Running transfers stop at the next chunk and keep their journal for a resume
+            thread.interrupt()
             thread.wait()
+        for probe in self.path_probes[:]:
+            probe.cancel()
+            probe.wait()
+        self.stop_folder_size_jobs()
+        self.folder_size_cache.save()
+        self.listing_store.shutdown()
+        self.undo_manager.close()
+        self.quick_access_panel.shutdown()
         super().closeEvent(event)
         logging.info("Application closed")
 
 if __name__ == "__main__":
     print(f"Current working directory: {os.getcwd()}")
     app = QApplication(sys.argv)
-    window = FileManager()
+    with profiler.span("FileManager()"):
+        window = FileManager()
     window.show()
     sys.exit(app.exec())
@@ -1,15 +1,17 @@
 import os
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QTabWidget,
                              QMessageBox, QAbstractItemView, QPushButton, QHeaderView)
-from PyQt6.QtCore import Qt, QTimer, QDir, QSettings
+from PyQt6.QtCore import Qt, QDir, QSettings
 from PyQt6.QtGui import QIcon
 from treeview import CustomTreeViewWithDrag
-from settings_panel import create_colored_icon  # Импортируем функцию для цветных иконок
+from icons import create_colored_icon  # Функция для цветных иконок
+from theme import NAVIGATION_BAR
 
 class NavigationBar(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, zone=1):
         super().__init__(parent)
         self.parent = parent
+        self.zone = zone
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(0, 0, 0, 0)  # Убираем отступы
 
@@ -37,14 +39,20 @@ class NavigationBar(QWidget):
         self.load_up_icon()  # Загружаем иконку для кнопки "На слой выше"
         self.up_button.clicked.connect(lambda: self.parent.go_up(self.current_file_view()) if self.current_file_view() else None)
 
+        self.disk_usage_button = QPushButton()
+        self.disk_usage_button.setFixedSize(30, 30)
+        self.disk_usage_button.setToolTip("Анализ занятого места")
+        self.load_disk_usage_icon()  # Загружаем иконку для кнопки анализа места
+        self.disk_usage_button.clicked.connect(lambda: self.parent.open_disk_usage(self.current_file_view()))
+
         # Адресная строка
         self.path_edit = QLineEdit()
         self.path_edit.setPlaceholderText("Введите путь...")
         self.path_edit.returnPressed.connect(self.on_path_entered)
 
-        # Строка поиска
+        # Строка поиска: при наборе фильтрует текущую папку, Enter ищет во вложенных папках
         self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("Поиск (Enter для поиска)...")
+        self.search_edit.setPlaceholderText("Фильтр (Enter - поиск в подпапках)...")
         self.search_edit.setFixedWidth(200)  # Фиксированная ширина 200 пикселей
         self.search_edit.returnPressed.connect(self.parent.perform_search)
         self.search_edit.textChanged.connect(self.on_search_text_changed)
@@ -53,6 +61,7 @@ class NavigationBar(QWidget):
         self.top_layout.addWidget(self.back_button)
         self.top_layout.addWidget(self.forward_button)
         self.top_layout.addWidget(self.up_button)
+        self.top_layout.addWidget(self.disk_usage_button)
         self.top_layout.addWidget(self.path_edit, 1)  # Растягиваем адресную строку
         self.top_layout.addWidget(self.search_edit)  # Поиск фиксированной ширины
 
@@ -67,11 +76,8 @@ class NavigationBar(QWidget):
         self.tab_widget.tabBarDoubleClicked.connect(self.duplicate_tab)
         self.layout.addWidget(self.tab_widget, 1)  # Растягиваем вкладки по высоте
 
-        self.search_timer = QTimer(self)
-        self.search_timer.setSingleShot(True)
-        self.search_timer.timeout.connect(self.parent.perform_search)
-
-        self.update_style()
+        # Стиль панели задаёт общая таблица стилей программы (theme.py)
+        self.setObjectName(NAVIGATION_BAR)
 
     def load_back_icon(self):
         back_icon_path = self.settings.value("icon_back", "img/back.svg", type=str)
@@ -103,60 +109,42 @@ class NavigationBar(QWidget):
         else:
             self.up_button.setIcon(QIcon.fromTheme("go-up"))
 
-    def update_style(self):
-        settings = QSettings("MyFileManager", "Settings")
-        bg_color = settings.value("work_zones_bg_color", "#121314", type=str)
-        active_tab_color = settings.value("active_tab_color", "#00d158", type=str)
-        self.setStyleSheet(f"""
-            QWidget {{
-                background: transparent;  /* Avoid setting a background that overrides QTreeView */
-            }}
-            QTabWidget::pane {{
-                background: transparent;
-                border: none;
-            }}
-            QTabBar::tab {{
-                background-color: #3A3A3A;
-                color: #FFFFFF;
-                padding: 6px;
-                margin-right: 4px;
-                border-top-left-radius: 8px;
-                border-top-right-radius: 8px;
-            }}
-            QTabBar::tab:selected {{
-                background-color: {active_tab_color};
-            }}
-            QLineEdit {{
-                background-color: #3A3A3A;
-                color: #FFFFFF;
-                border: 1px solid #4A4A4A;
-                padding: 2px;
-            }}
-            QPushButton {{
-                background-color: #3A3A3A;
-                border: none;
-                padding: 2px;
-            }}
-            QPushButton:hover {{
-                background-color: #4A4A4A;
-            }}
-        """)
+    def load_disk_usage_icon(self):
+        disk_usage_icon_path = self.settings.value("icon_disk_usage", "img/disk_usage.svg", type=str)
+        disk_usage_icon_path = os.path.abspath(disk_usage_icon_path)
+        disk_usage_icon_color = self.settings.value("disk_usage_icon_color", "#FFFFFF", type=str)
+        if os.path.exists(disk_usage_icon_path) and os.access(disk_usage_icon_path, os.R_OK):
+            icon = create_colored_icon(disk_usage_icon_path, disk_usage_icon_color)
+            self.disk_usage_button.setIcon(icon)
+        else:
+            self.disk_usage_button.setIcon(QIcon.fromTheme("drive-harddisk"))
 
     def duplicate_tab(self, index):
-        file_view = self.tab_widget.widget(index).findChild(CustomTreeViewWithDrag)
+        file_view = self.parent.view_registry.view_for_page(self.tab_widget.widget(index))
         if file_view:
             current_path = file_view.history[-1] if file_view.history else QDir.homePath()
             self.add_new_tab(current_path)
 
     def on_tab_changed(self):
-        self.parent.set_active_zone(1 if self is self.parent.navigation_bar1 else 2)
-        self.update_path_edit(self.current_file_view())
+        self.parent.set_active_zone(self.zone)
+        file_view = self.current_file_view()
+        self.update_path_edit(file_view)
+        self.parent.view_registry.touch(file_view)
+        # У каждой вкладки свой быстрый фильтр
+        self.search_edit.blockSignals(True)
+        self.search_edit.setText(file_view.proxy_model.filter_text() if file_view else "")
+        self.search_edit.blockSignals(False)
+        if file_view and file_view.pending_path:
+            # Восстановленная вкладка читает папку только при первом переходе на неё
+            self.parent.probe_tab_paths([file_view])
 
     def on_search_text_changed(self):
-        if self.search_edit.text().strip():
-            self.search_timer.start(3000)
-        else:
-            self.search_timer.stop()
+        text = self.search_edit.text().strip()
+        file_view = self.current_file_view()
+        if file_view:
+            # Быстрый фильтр работает в прокси-модели вида, без обращения к диску
+            file_view.proxy_model.set_filter_text(text)
+        if not text:
             if self.parent.search_performed and self.parent.path_before_search:
                 file_view = self.current_file_view()
                 if file_view and isinstance(file_view.model(), self.parent.SearchModel):
@@ -173,8 +161,11 @@ class NavigationBar(QWidget):
         else:
             QMessageBox.warning(self.parent, "Ошибка", f"Путь не существует или не является директорией: {path}")
 
-    def add_new_tab(self, path):
-        if not os.path.exists(path):
+    def add_new_tab(self, path, deferred=False):
+        # deferred: вкладка из сохранённой сессии, пока только заголовок и путь. Папка читается,
+        # когда вкладку откроют (или при фоновой подгрузке), после проверки пути в
+        # FileManager.probe_tab_paths, иначе мёртвый сетевой том заморозит запуск
+        if not deferred and not os.path.exists(path):
             path = QDir.homePath()
         work_area = QWidget()
         work_layout = QVBoxLayout(work_area)
@@ -185,18 +176,30 @@ class NavigationBar(QWidget):
         file_view.current_index = 0
 
         work_layout.addWidget(file_view)
+        # Регистрируем до addTab: смена текущей вкладки уже ищет вид через реестр
+        self.parent.view_registry.register(file_view, self, work_area, path)
 
         file_view.doubleClicked.connect(lambda index: self.parent.on_double_click(file_view, index))
 
         tab_index = self.tab_widget.addTab(work_area, os.path.basename(path) or "Root")
         self.tab_widget.setCurrentIndex(tab_index)
 
-        self.parent.navigate_to(file_view, path)
-        self.parent.restore_column_state(file_view)
+        if deferred:
+            file_view.pending_path = path
+        else:
+            self.parent.navigate_to(file_view, path)
+            self.parent.restore_column_state(file_view)
         self.update_path_edit(file_view)
+        return file_view
 
     def close_tab(self, index):
+        page = self.tab_widget.widget(index)
+        file_view = self.parent.view_registry.view_for_page(page)
         self.tab_widget.removeTab(index)
+        # removeTab только прячет страницу: удаляем её вместе с видом и моделью
+        if file_view:
+            self.parent.release_view(file_view)
+        page.deleteLater()
         if self.tab_widget.count() == 0:
             self.add_new_tab(QDir.homePath())
         self.update_path_edit(self.current_file_view())
@@ -204,7 +207,7 @@ class NavigationBar(QWidget):
     def current_file_view(self):
         current_widget = self.tab_widget.currentWidget()
         if current_widget:
-            return current_widget.findChild(CustomTreeViewWithDrag)
+            return self.parent.view_registry.view_for_page(current_widget)
         return None
 
     def update_path_edit(self, file_view):
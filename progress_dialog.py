@@ -0,0 +1,69 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QProgressBar,
+                             QPushButton, QSpinBox, QComboBox)
+from PyQt6.QtCore import Qt, pyqtSignal
+from file_operations import IO_PRIORITY_BEST_EFFORT, IO_PRIORITY_IDLE
+
+
+class JobProgressDialog(QDialog):
+    """Non-modal progress window for a background job with live speed limit and I/O priority controls."""
+
+    canceled = pyqtSignal()
+    rate_limit_changed = pyqtSignal(int)
+    io_priority_changed = pyqtSignal(str)
+
+    def __init__(self, title, parent=None, rate_limit=None, io_priority=IO_PRIORITY_BEST_EFFORT):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setWindowModality(Qt.WindowModality.NonModal)
+        self.setMinimumWidth(380)
+
+        self.layout = QVBoxLayout(self)
+        self.label = QLabel(title)
+        self.layout.addWidget(self.label)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.layout.addWidget(self.progress_bar)
+        self.speed_label = QLabel("")
+        self.layout.addWidget(self.speed_label)
+
+        self.rate_limit_spin = QSpinBox()
+        self.io_priority_combo = QComboBox()
+        # Throttling controls are only shown for jobs that support them (file transfers)
+        if rate_limit is not None:
+            form = QFormLayout()
+            # Limit in MB/s, 0 means unlimited
+            self.rate_limit_spin.setRange(0, 10000)
+            self.rate_limit_spin.setSuffix(" МБ/с")
+            self.rate_limit_spin.setSpecialValueText("Без ограничения")
+            self.rate_limit_spin.setValue(rate_limit // (1024 * 1024))
+            self.rate_limit_spin.valueChanged.connect(lambda value: self.rate_limit_changed.emit(value * 1024 * 1024))
+            form.addRow("Лимит скорости:", self.rate_limit_spin)
+
+            self.io_priority_combo.addItem("Обычный", IO_PRIORITY_BEST_EFFORT)
+            self.io_priority_combo.addItem("Фоновый (idle)", IO_PRIORITY_IDLE)
+            self.io_priority_combo.setCurrentIndex(1 if io_priority == IO_PRIORITY_IDLE else 0)
+            self.io_priority_combo.currentIndexChanged.connect(
+                lambda index: self.io_priority_changed.emit(self.io_priority_combo.itemData(index)))
+            form.addRow("Приоритет ввода-вывода:", self.io_priority_combo)
+            self.layout.addLayout(form)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.cancel_button = QPushButton("Отмена")
+        self.cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.cancel_button)
+        self.layout.addLayout(button_layout)
+
+    def setValue(self, value):
+        self.progress_bar.setValue(value)
+
+    def setLabelText(self, text):
+        self.label.setText(text)
+
+    def set_throughput(self, bytes_per_second):
+        self.speed_label.setText(f"Скорость: {bytes_per_second / (1024 * 1024):.1f} МБ/с")
+
+    def reject(self):
+        # Closing the window the same way as QProgressDialog: it cancels the job
+        self.canceled.emit()
+        super().reject()
@@ -1,16 +1,369 @@
-from PyQt6.QtWidgets import (QTreeWidget, QTreeWidgetItem, QMenu, QMessageBox, QInputDialog,
+from PyQt6.QtWidgets import (QTreeView, QMenu, QMessageBox, QInputDialog,
                              QVBoxLayout, QHBoxLayout, QPushButton, QWidget, QStyle, QColorDialog, QAbstractItemView)
-from PyQt6.QtGui import QAction, QIcon, QBrush, QColor
-from PyQt6.QtCore import Qt, QDir, QSettings
-from settings_panel import SettingsPanel, create_colored_icon
+from PyQt6.QtGui import QAction, QIcon, QColor
+from PyQt6.QtCore import Qt, QDir, QSettings, QAbstractItemModel, QModelIndex
+from icons import create_colored_icon
+from trash import TrashEmptyThread
+from theme import QUICK_ACCESS_PANEL, QUICK_ACCESS_LIST
+from directory_watch import DirectoryScanThread, PathProbeThread, PATH_AVAILABLE, listing_sort_key, keep_until_finished
 import os
-import shutil
+import bisect
 import logging
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+PATH_ROLE = Qt.ItemDataRole.UserRole
+FIXED_ROLE = Qt.ItemDataRole.UserRole + 1
+IS_DIR_ROLE = Qt.ItemDataRole.UserRole + 2
 
-class CustomQuickAccessList(QTreeWidget):
+
+class QuickAccessNode:
+    """Узел дерева быстрого доступа. children = None, пока папка не прочитана."""
+    __slots__ = ('name', 'path', 'is_dir', 'parent', 'row', 'children', 'fixed', 'available',
+                 'label', 'loader', 'watched', 'fetch_pending')
+
+    def __init__(self, name, path, is_dir, parent=None, row=0):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = row
+        self.children = None
+        self.fixed = False
+        self.available = True
+        self.label = None
+        self.loader = None
+        self.watched = False
+        self.fetch_pending = False
+
+    def sort_key(self):
+        return listing_sort_key(self.name, self.is_dir)
+
+
+class QuickAccessModel(QAbstractItemModel):
+    """Ленивая модель боковой панели: закреплённые пути верхнего уровня и содержимое развёрнутых папок.
+
+    Папки читаются в фоне при первом разворачивании (fetchMore), развёрнутые папки отслеживаются
+    общим DirectoryWatcher и обновляются по разнице снимков, без перестройки дерева.
+    """
+
+    def __init__(self, watcher, parent=None):
+        super().__init__(parent)
+        self.watcher = watcher
+        self.roots = []
+        self.watched_nodes = {}  # path -> [node, ...] развёрнутых папок
+        self.finishing_loaders = set()  # отменённые потоки живут до своего завершения
+        self.folder_icon = QIcon.fromTheme("folder")
+        self.file_icon = QIcon.fromTheme("text-x-generic")
+        self.unavailable_icon = QIcon.fromTheme("network-offline", QIcon.fromTheme("folder"))
+        self.watcher.directory_changed.connect(self.on_directory_changed)
+
+    # --- QAbstractItemModel ---
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else None
+
+    def children_of(self, node):
+        return self.roots if node is None else (node.children or [])
+
+    def index(self, row, column, parent=QModelIndex()):
+        children = self.children_of(self.node(parent))
+        if column != 0 or row < 0 or row >= len(children):
+            return QModelIndex()
+        return self.createIndex(row, 0, children[row])
+
+    def parent(self, index):
+        node = self.node(index)
+        if node is None or node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.parent.row, 0, node.parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.children_of(self.node(parent)))
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node is None:
+            return bool(self.roots)
+        if not node.is_dir or not node.available:
+            return False
+        # Непрочитанная папка показывает стрелку разворачивания
+        return node.children is None or bool(node.children)
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return node is not None and node.is_dir and node.children is None and node.loader is None
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if node is None:
+            return
+        if node.parent is None and not node.available:
+            # Корень на недоступном томе читается только после успешной проверки
+            node.fetch_pending = True
+            return
+        self.scan(node)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        node = self.node(index)
+        if node is None:
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if node.loader is not None and node.children is None and role == Qt.ItemDataRole.DisplayRole:
+                return f"{node.label or node.name} (загрузка...)"
+            return node.label or node.name
+        if role == Qt.ItemDataRole.DecorationRole:
+            if not node.available:
+                return self.unavailable_icon
+            return self.folder_icon if node.is_dir else self.file_icon
+        if role == Qt.ItemDataRole.ForegroundRole and not node.available:
+            return QColor("#808080")
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return node.path if node.available else f"{node.path} (недоступно)"
+        if role == PATH_ROLE:
+            return node.path
+        if role == FIXED_ROLE:
+            return node.fixed
+        if role == IS_DIR_ROLE:
+            return node.is_dir
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        node = self.node(index)
+        if node is None or role != Qt.ItemDataRole.EditRole:
+            return False
+        node.label = value or None
+        self.dataChanged.emit(index, index)
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsDragEnabled
+
+    def index_for(self, node):
+        return self.createIndex(node.row, 0, node) if node is not None else QModelIndex()
+
+    # --- Закреплённые пути ---
+
+    def add_root(self, path, fixed=False, available=True):
+        row = len(self.roots)
+        node = QuickAccessNode(os.path.basename(path) or "Root", path, True, None, row)
+        node.fixed = fixed
+        node.available = available
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.roots.append(node)
+        self.endInsertRows()
+        return self.index_for(node)
+
+    def root_index(self, path):
+        for node in self.roots:
+            if node.path == path:
+                return self.index_for(node)
+        return QModelIndex()
+
+    def remove_root(self, row):
+        self.release(self.roots[row])
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.roots[row]
+        self.renumber(self.roots, row)
+        self.endRemoveRows()
+
+    def move_root(self, source_row, target_row):
+        if source_row == target_row or not 0 <= source_row < len(self.roots):
+            return
+        target_row = max(0, min(target_row, len(self.roots)))
+        # beginMoveRows ожидает позицию вставки до удаления источника
+        if not self.beginMoveRows(QModelIndex(), source_row, source_row, QModelIndex(),
+                                  target_row + 1 if target_row > source_row else target_row):
+            return
+        node = self.roots.pop(source_row)
+        self.roots.insert(target_row, node)
+        self.renumber(self.roots, 0)
+        self.endMoveRows()
+
+    def clear_roots(self):
+        self.beginResetModel()
+        for node in self.roots:
+            self.release(node)
+        self.roots = []
+        self.endResetModel()
+
+    def set_fixed(self, index, fixed):
+        node = self.node(index)
+        if node:
+            node.fixed = fixed
+            self.dataChanged.emit(index, index)
+
+    def set_available(self, path, available):
+        """Результат проверки пути: недоступный корень сворачивается и помечается серым."""
+        for node in self.roots:
+            if node.path != path or node.available == available:
+                continue
+            if not available and node.children is not None:
+                self.drop_children(node)
+            node.available = available
+            index = self.index_for(node)
+            self.dataChanged.emit(index, index)
+            if available and node.fetch_pending:
+                node.fetch_pending = False
+                self.scan(node)
+
+    # --- Загрузка и отслеживание ---
+
+    @staticmethod
+    def renumber(children, start):
+        for row in range(start, len(children)):
+            children[row].row = row
+
+    def scan(self, node):
+        """Читаем папку в фоне; результат применяется целиком или разницей к уже загруженным детям."""
+        if node.loader is not None:
+            return
+        loader = DirectoryScanThread(node.path)
+        node.loader = loader
+        loader.scanned.connect(lambda snapshot: self.on_scanned(node, loader, snapshot))
+        loader.failed.connect(lambda message: self.on_scan_failed(node, loader, message))
+        loader.finished.connect(lambda: self.on_loader_finished(node, loader))
+        loader.start()
+        if node.children is None:
+            index = self.index_for(node)
+            self.dataChanged.emit(index, index)
+
+    def on_scanned(self, node, loader, snapshot):
+        if node.loader is not loader:
+            return  # Загрузка отменена сворачиванием
+        if node.children is None:
+            children = [QuickAccessNode(name, os.path.join(node.path, name), is_dir, node, row)
+                        for row, (name, is_dir) in enumerate(zip(snapshot.names, snapshot.is_dir))]
+            index = self.index_for(node)
+            # Вставка одним блоком, а не пачками: модель ленивая, вид раскладывает только видимые строки,
+            # а перекраски всего дерева на каждую пачку больше нет (чередование рисует сам вид)
+            if children:
+                self.beginInsertRows(index, 0, len(children) - 1)
+                node.children = children
+                self.endInsertRows()
+            else:
+                node.children = children
+            self.dataChanged.emit(index, index)
+        else:
+            self.apply_listing(node, snapshot)
+
+    def apply_listing(self, node, snapshot):
+        """Обновляем детей по новому снимку: удаляем исчезнувшие строки и вставляем новые на место сортировки."""
+        current = {child.name: child.is_dir for child in node.children}
+        wanted = dict(zip(snapshot.names, snapshot.is_dir))
+        parent_index = self.index_for(node)
+        for row in range(len(node.children) - 1, -1, -1):
+            child = node.children[row]
+            if wanted.get(child.name) != child.is_dir:
+                self.release(child)
+                self.beginRemoveRows(parent_index, row, row)
+                del node.children[row]
+                self.endRemoveRows()
+        self.renumber(node.children, 0)
+        keys = [child.sort_key() for child in node.children]
+        for name, is_dir in zip(snapshot.names, snapshot.is_dir):
+            if current.get(name) == is_dir:
+                continue
+            key = listing_sort_key(name, is_dir)
+            row = bisect.bisect_left(keys, key)
+            self.beginInsertRows(parent_index, row, row)
+            node.children.insert(row, QuickAccessNode(name, os.path.join(node.path, name), is_dir, node, row))
+            keys.insert(row, key)
+            self.renumber(node.children, row)
+            self.endInsertRows()
+
+    def on_scan_failed(self, node, loader, message):
+        if node.loader is not loader:
+            return
+        if node.children is None:
+            node.children = []
+            index = self.index_for(node)
+            self.dataChanged.emit(index, index)
+        logging.warning(message)
+
+    def on_loader_finished(self, node, loader):
+        if node.loader is loader:
+            node.loader = None
+        self.finishing_loaders.discard(loader)
+        loader.deleteLater()
+
+    def expanded(self, index):
+        """Развёрнутая папка отслеживается; если она уже была прочитана, перечитываем её (изменения за время свёрнутости)."""
+        node = self.node(index)
+        if node is None or node.watched:
+            return
+        node.watched = True
+        self.watched_nodes.setdefault(node.path, []).append(node)
+        self.watcher.watch(node.path)
+        if node.children is not None:
+            self.scan(node)
+
+    def collapsed(self, index):
+        node = self.node(index)
+        if node is None:
+            return
+        self.unwatch(node)
+        if node.loader is not None and node.children is None:
+            # Незавершённая загрузка отменяется, при следующем разворачивании папка читается заново
+            self.cancel_loader(node)
+            self.dataChanged.emit(index, index)
+
+    def cancel_loader(self, node):
+        node.loader.cancel()
+        self.finishing_loaders.add(node.loader)
+        node.loader = None
+
+    def unwatch(self, node):
+        if not node.watched:
+            return
+        node.watched = False
+        nodes = self.watched_nodes.get(node.path, [])
+        if node in nodes:
+            nodes.remove(node)
+        if not nodes:
+            self.watched_nodes.pop(node.path, None)
+        self.watcher.unwatch(node.path)
+
+    def release(self, node):
+        """Отпускаем отслеживание и загрузку узла и всех его потомков перед удалением из модели."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self.unwatch(current)
+            if current.loader is not None:
+                self.cancel_loader(current)
+            if current.children:
+                stack.extend(current.children)
+
+    def drop_children(self, node):
+        for child in node.children:
+            self.release(child)
+        if node.children:
+            self.beginRemoveRows(self.index_for(node), 0, len(node.children) - 1)
+            node.children = None
+            self.endRemoveRows()
+        else:
+            node.children = None
+
+    def on_directory_changed(self, path):
+        for node in list(self.watched_nodes.get(path, [])):
+            if node.children is not None:
+                self.scan(node)
+
+    def refresh(self):
+        """Перечитываем развёрнутые папки (Ctrl+R / F5) без перестройки дерева."""
+        for nodes in list(self.watched_nodes.values()):
+            for node in nodes:
+                if node.children is not None:
+                    self.scan(node)
+
+
+class CustomQuickAccessList(QTreeView):
     def __init__(self, file_manager, parent=None):
         super().__init__(parent)
         self.file_manager = file_manager
@@ -19,152 +372,73 @@ class CustomQuickAccessList(QTreeWidget):
         self.setHeaderHidden(True)  # Скрываем заголовок
         self.setDragEnabled(True)
         self.setAcceptDrops(True)
-        self.setDragDropMode(QTreeWidget.DragDropMode.InternalMove)
+        self.setDropIndicatorShown(True)
+        self.setDragDropMode(QAbstractItemView.DragDropMode.DragDrop)
         self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
-        self.setAlternatingRowColors(False)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setUniformRowHeights(True)
+        self.setAlternatingRowColors(True)
         self.setWordWrap(False)  # Отключаем перенос текста
-        self.itemExpanded.connect(self.on_item_expanded)
+        self.quick_access_model = QuickAccessModel(file_manager.directory_watcher, self)
+        self.setModel(self.quick_access_model)
+        self.expanded.connect(self.quick_access_model.expanded)
+        self.collapsed.connect(self.quick_access_model.collapsed)
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self.show_context_menu)
-        self.itemClicked.connect(self.quick_access_clicked)
-        self.update_style()
-
-    def update_style(self):
-        settings = QSettings("MyFileManager", "Settings")
-        qa_font_size = settings.value("quick_access_font_size", "9", type=str)
-        qa_row_height = settings.value("quick_access_row_height", "22", type=str)
-        qa_bg_color = settings.value("quick_access_bg_color", "#2E2E2E", type=str)
-        qa_alt_bg_color = settings.value("quick_access_alt_bg_color", "#353535", type=str)
-        self.setStyleSheet(f"""
-            QTreeWidget {{
-                background-color: {qa_bg_color};
-                color: #FFFFFF;
-                border: none;
-                font-size: {qa_font_size}pt;
-            }}
-            QTreeWidget::item {{
-                padding: 2px 5px;  /* Уменьшенный отступ для текста */
-                min-height: {qa_row_height}px;
-            }}
-            QTreeWidget::item:selected {{
-                background-color: #4A4A4A;
-            }}
-        """)
-        # Подгоняем ширину столбца под содержимое
+        self.clicked.connect(self.quick_access_clicked)
+        # Стиль задаёт общая таблица стилей программы (theme.py), чередование строк - сам вид
+        self.setObjectName(QUICK_ACCESS_LIST)
         self.adjust_column_width()
-        # Применяем чередующиеся цвета
-        self.apply_alternating_colors(qa_bg_color, qa_alt_bg_color)
 
     def adjust_column_width(self):
-        """Подгоняем ширину столбца под содержимое, но не больше ширины виджета."""
-        self.resizeColumnToContents(0)
-        max_width = self.width() - 15  # Уменьшенный отступ для иконок и границ
-        current_width = self.columnWidth(0)
-        if current_width > max_width:
-            self.setColumnWidth(0, max_width)
-        elif current_width < max_width:
-            self.setColumnWidth(0, max_width)
+        """Столбец занимает всю ширину виджета."""
+        self.setColumnWidth(0, max(0, self.width() - 15))  # Уменьшенный отступ для иконок и границ
 
     def resizeEvent(self, event):
         """Обновляем ширину столбца при изменении размера виджета."""
         super().resizeEvent(event)
         self.adjust_column_width()
 
-    def apply_alternating_colors(self, bg_color, alt_bg_color):
-        """Применяем чередующиеся цвета для всех элементов в порядке их следования."""
-        def traverse_and_color(item, depth=0):
-            nonlocal index
-            # Применяем цвет в зависимости от глобального индекса
-            item.setBackground(0, QBrush(QColor(bg_color if index % 2 == 0 else alt_bg_color)))
-            index += 1
-            # Рекурсивно обходим дочерние элементы
-            for i in range(item.childCount()):
-                child = item.child(i)
-                if child.text(0) != "":  # Пропускаем пустые (dummy) элементы
-                    traverse_and_color(child, depth + 1)
-
-        index = 0  # Глобальный индекс для чередования цветов
-        for i in range(self.topLevelItemCount()):
-            item = self.topLevelItem(i)
-            traverse_and_color(item)
-
-    def on_item_expanded(self, item):
-        """Обновляем содержимое папки при разворачивании."""
-        if item.childCount() == 1 and item.child(0).text(0) == "":
-            item.removeChild(item.child(0))
-            path = item.data(0, Qt.ItemDataRole.UserRole)
-            if os.path.isdir(path):
-                self.load_folder_contents(item, path)
-        self.update_style()
-
-    def load_folder_contents(self, parent_item, path):
-        """Загружаем содержимое папки как дочерние элементы с сортировкой."""
-        try:
-            # Собираем все элементы в список
-            entries = []
-            for entry in os.scandir(path):
-                entries.append({
-                    'name': entry.name,
-                    'path': entry.path,
-                    'is_dir': entry.is_dir()
-                })
-
-            # Сортируем: сначала папки, затем файлы, внутри каждого типа — по имени (A-Z)
-            entries.sort(key=lambda x: (not x['is_dir'], x['name'].lower()))
-
-            # Добавляем отсортированные элементы в дерево
-            for entry in entries:
-                item = QTreeWidgetItem(parent_item)
-                item.setText(0, entry['name'])
-                item.setData(0, Qt.ItemDataRole.UserRole, entry['path'])
-                item.setData(0, Qt.ItemDataRole.UserRole + 1, False)  # Не фиксирован
-                item.setData(0, Qt.ItemDataRole.UserRole + 2, entry['is_dir'])  # Флаг директории
-                if entry['is_dir']:
-                    item.setIcon(0, QIcon.fromTheme("folder"))
-                    dummy = QTreeWidgetItem(item)
-                    dummy.setText(0, "")
-                else:
-                    item.setIcon(0, QIcon.fromTheme("text-x-generic"))
-            self.update_style()
-        except PermissionError as e:
-            logging.error(f"No access to {path}: {e}")
-            QMessageBox.warning(self.file_manager, "Ошибка", f"Нет доступа к {path}: {e}")
-        except OSError as e:
-            logging.error(f"Failed to read {path}: {e}")
-            QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось прочитать {path}: {e}")
+    def selected_index(self):
+        indexes = self.selectedIndexes()
+        return indexes[0] if indexes else QModelIndex()
+
+    def add_root_path(self, path):
+        if self.quick_access_model.root_index(path).isValid():
+            QMessageBox.warning(self.file_manager, "Ошибка", "Этот путь уже есть в быстром доступе")
+            return False
+        self.quick_access_model.add_root(path)
+        self.file_manager.quick_access_panel.save_state()
+        return True
 
     def dropEvent(self, event):
         if event.mimeData().hasUrls():
             for url in event.mimeData().urls():
                 path = url.toLocalFile()
                 if os.path.isdir(path):
-                    for i in range(self.topLevelItemCount()):
-                        item = self.topLevelItem(i)
-                        if item.data(0, Qt.ItemDataRole.UserRole) == path:
-                            QMessageBox.warning(self.file_manager, "Ошибка", "Этот путь уже есть в быстром доступе")
-                            event.ignore()
-                            return
-                    item = QTreeWidgetItem(self)
-                    item.setText(0, os.path.basename(path) or "Root")
-                    item.setData(0, Qt.ItemDataRole.UserRole, path)
-                    item.setData(0, Qt.ItemDataRole.UserRole + 1, False)
-                    item.setData(0, Qt.ItemDataRole.UserRole + 2, True)  # Директория
-                    item.setIcon(0, QIcon.fromTheme("folder"))
-                    dummy = QTreeWidgetItem(item)
-                    dummy.setText(0, "")
-                    self.file_manager.quick_access_panel.save_state()
+                    if not self.add_root_path(path):
+                        event.ignore()
+                        return
                 else:
                     QMessageBox.warning(self.file_manager, "Ошибка", "Можно добавлять только директории")
             event.acceptProposedAction()
         else:
-            source_item = self.currentItem()
-            if source_item and source_item.data(0, Qt.ItemDataRole.UserRole + 1):
+            # Перетаскивание внутри панели меняет порядок закреплённых путей
+            source = self.currentIndex()
+            target = self.indexAt(event.position().toPoint())
+            while target.parent().isValid():
+                target = target.parent()
+            if source.isValid() and source.data(FIXED_ROLE):
                 QMessageBox.warning(self.file_manager, "Ошибка", "Нельзя перемещать зафиксированный путь")
                 event.ignore()
-            elif source_item and source_item.data(0, Qt.ItemDataRole.UserRole + 2):
-                super().dropEvent(event)
+            elif source.isValid() and not source.parent().isValid():
+                target_row = target.row() if target.isValid() else self.quick_access_model.rowCount() - 1
+                self.quick_access_model.move_root(source.row(), target_row)
                 self.file_manager.quick_access_panel.save_state()
-        self.update_style()
+                event.setDropAction(Qt.DropAction.IgnoreAction)
+                event.accept()
+            else:
+                event.ignore()
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
@@ -175,6 +449,8 @@ class CustomQuickAccessList(QTreeWidget):
     def dragMoveEvent(self, event):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
+        else:
+            super().dragMoveEvent(event)
 
     def keyPressEvent(self, event):
         key = event.key()
@@ -182,68 +458,40 @@ class CustomQuickAccessList(QTreeWidget):
         file_view = self.file_manager.current_file_view()
 
         if key == Qt.Key.Key_Delete:
-            selected_items = self.selectedItems()
-            if selected_items:
-                item = selected_items[0]
-                if item.data(0, Qt.ItemDataRole.UserRole + 1):
+            index = self.selected_index()
+            if index.isValid():
+                if index.data(FIXED_ROLE):
                     QMessageBox.warning(self.file_manager, "Ошибка", "Нельзя удалить зафиксированный путь")
                     return
-                if item.parent() is None:
+                if not index.parent().isValid():
                     reply = QMessageBox.question(self.file_manager, "Удаление",
-                                               f"Вы уверены, что хотите удалить путь '{item.text(0)}' из быстрого доступа?",
+                                               f"Вы уверены, что хотите удалить путь '{index.data()}' из быстрого доступа?",
                                                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
                     if reply == QMessageBox.StandardButton.Yes:
-                        parent = item.parent() or self.invisibleRootItem()
-                        parent.removeChild(item)
+                        self.quick_access_model.remove_root(index.row())
                         self.file_manager.quick_access_panel.save_state()
-                        self.update_style()
 
         elif modifiers == Qt.KeyboardModifier.ControlModifier and key == Qt.Key.Key_C:
-            selected_items = self.selectedItems()
-            if selected_items:
-                item = selected_items[0]
-                path = item.data(0, Qt.ItemDataRole.UserRole)
-                self.file_manager.clipboard = [path]
+            index = self.selected_index()
+            if index.isValid():
+                self.file_manager.clipboard = [index.data(PATH_ROLE)]
                 self.file_manager.clipboard_is_cut = False
 
         elif modifiers == Qt.KeyboardModifier.ControlModifier and key == Qt.Key.Key_X:
-            selected_items = self.selectedItems()
-            if selected_items:
-                item = selected_items[0]
-                path = item.data(0, Qt.ItemDataRole.UserRole)
-                self.file_manager.clipboard = [path]
+            index = self.selected_index()
+            if index.isValid():
+                self.file_manager.clipboard = [index.data(PATH_ROLE)]
                 self.file_manager.clipboard_is_cut = True
 
         elif modifiers == Qt.KeyboardModifier.ControlModifier and key == Qt.Key.Key_V:
             if self.file_manager.clipboard and file_view:
                 current_path = file_view.history[-1] if file_view.history else self.file_manager.QDir.homePath()
-                for src_path in self.file_manager.clipboard:
-                    if not os.path.exists(src_path):
-                        continue
-                    base_name = os.path.basename(src_path)
-                    dest_path = os.path.join(current_path, base_name)
-                    if os.path.exists(dest_path):
-                        dest_path = os.path.join(current_path, f"Копия - {base_name}")
-                    try:
-                        if os.path.isdir(src_path):
-                            shutil.copytree(src_path, dest_path, dirs_exist_ok=True)
-                        else:
-                            shutil.copy2(src_path, dest_path)
-                        if self.file_manager.clipboard_is_cut and os.path.exists(src_path):
-                            try:
-                                shutil.rmtree(src_path) if os.path.isdir(src_path) else os.remove(src_path)
-                            except PermissionError as e:
-                                QMessageBox.warning(self.file_manager, "Ошибка", f"Нет прав на удаление: {e}")
-                            except OSError as e:
-                                QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось удалить исходный файл: {e}")
-                    except PermissionError as e:
-                        QMessageBox.warning(self.file_manager, "Ошибка", f"Нет прав на операцию: {e}")
-                    except OSError as e:
-                        QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось выполнить операцию: {e}")
+                operation = "move" if self.file_manager.clipboard_is_cut else "copy"
+                # Копирование выполняется в фоне тем же движком, что и вставка в рабочей зоне
+                self.file_manager.perform_file_operation(list(self.file_manager.clipboard), current_path, operation)
                 if self.file_manager.clipboard_is_cut:
                     self.file_manager.clipboard = []
                     self.file_manager.clipboard_is_cut = False
-                self.file_manager.refresh_view(file_view)
 
         elif modifiers == Qt.KeyboardModifier.ControlModifier and key == Qt.Key.Key_A:
             self.selectAll()
@@ -253,82 +501,52 @@ class CustomQuickAccessList(QTreeWidget):
                 self.file_manager.navigate_to(file_view, QDir.homePath())
 
         elif (modifiers == Qt.KeyboardModifier.ControlModifier and key == Qt.Key.Key_R) or key == Qt.Key.Key_F5:
-            self.file_manager.quick_access_panel.load_state()
+            self.file_manager.quick_access_panel.refresh()
 
         elif modifiers == Qt.KeyboardModifier.ControlModifier and key == Qt.Key.Key_N:
             folder_path, ok = QInputDialog.getText(self.file_manager, "Добавить папку", "Введите путь к папке:")
             if ok and folder_path and os.path.isdir(folder_path):
-                for i in range(self.topLevelItemCount()):
-                    item = self.topLevelItem(i)
-                    if item.data(0, Qt.ItemDataRole.UserRole) == folder_path:
-                        QMessageBox.warning(self.file_manager, "Ошибка", "Этот путь уже есть в быстром доступе")
-                        return
-                item = QTreeWidgetItem(self)
-                item.setText(0, os.path.basename(folder_path) or "Root")
-                item.setData(0, Qt.ItemDataRole.UserRole, folder_path)
-                item.setData(0, Qt.ItemDataRole.UserRole + 1, False)
-                item.setData(0, Qt.ItemDataRole.UserRole + 2, True)
-                item.setIcon(0, QIcon.fromTheme("folder"))
-                dummy = QTreeWidgetItem(item)
-                dummy.setText(0, "")
-                self.file_manager.quick_access_panel.save_state()
-                self.update_style()
+                self.add_root_path(folder_path)
             elif ok and folder_path:
                 QMessageBox.warning(self.file_manager, "Ошибка", "Указанный путь не является папкой или не существует")
 
         elif modifiers == (Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier) and key == Qt.Key.Key_N:
             path, ok = QInputDialog.getText(self.file_manager, "Добавить путь", "Введите путь:")
             if ok and path and os.path.exists(path) and os.path.isdir(path):
-                for i in range(self.topLevelItemCount()):
-                    item = self.topLevelItem(i)
-                    if item.data(0, Qt.ItemDataRole.UserRole) == path:
-                        QMessageBox.warning(self.file_manager, "Ошибка", "Этот путь уже есть в быстром доступе")
-                        return
-                item = QTreeWidgetItem(self)
-                item.setText(0, os.path.basename(path) or "Root")
-                item.setData(0, Qt.ItemDataRole.UserRole, path)
-                item.setData(0, Qt.ItemDataRole.UserRole + 1, False)
-                item.setData(0, Qt.ItemDataRole.UserRole + 2, True)
-                item.setIcon(0, QIcon.fromTheme("folder"))
-                dummy = QTreeWidgetItem(item)
-                dummy.setText(0, "")
-                self.file_manager.quick_access_panel.save_state()
-                self.update_style()
+                self.add_root_path(path)
             elif ok and path:
                 QMessageBox.warning(self.file_manager, "Ошибка", "Указанный путь не является папкой или не существует")
 
         elif key == Qt.Key.Key_F2:
-            selected_items = self.selectedItems()
-            if selected_items:
-                item = selected_items[0]
-                old_name = item.text(0)
+            index = self.selected_index()
+            if index.isValid():
+                old_name = index.data()
                 new_name, ok = QInputDialog.getText(self.file_manager, "Переименовать", "Введите новое имя:", text=old_name)
                 if ok and new_name:
-                    item.setText(0, new_name)
+                    self.quick_access_model.setData(index, new_name)
                     self.file_manager.quick_access_panel.save_state()
-                    self.update_style()
 
         super().keyPressEvent(event)
 
     def show_context_menu(self, position):
-        item = self.itemAt(position)
-        if not item:
+        index = self.indexAt(position)
+        if not index.isValid():
             return
         menu = QMenu()
-        if item.parent() is None:
+        if not index.parent().isValid():
             detach_action = QAction("Открепить путь", self)
-            fix_action = QAction("Зафиксировать путь", self) if not item.data(0, Qt.ItemDataRole.UserRole + 1) else QAction("Снять фиксацию", self)
-            detach_action.triggered.connect(lambda: self.detach_path(item))
-            fix_action.triggered.connect(lambda: self.toggle_fix_path(item))
+            fix_action = QAction("Зафиксировать путь", self) if not index.data(FIXED_ROLE) else QAction("Снять фиксацию", self)
+            detach_action.triggered.connect(lambda: self.detach_path(index))
+            fix_action.triggered.connect(lambda: self.toggle_fix_path(index))
             menu.addAction(detach_action)
             menu.addAction(fix_action)
         else:
             open_action = QAction("Открыть", self)
             copy_action = QAction("Копировать", self)
             cut_action = QAction("Вырезать", self)
-            open_action.triggered.connect(lambda: self.open_item(item))
-            copy_action.triggered.connect(lambda: self.copy_item(item))
-            cut_action.triggered.connect(lambda: self.cut_item(item))
+            open_action.triggered.connect(lambda: self.open_item(index))
+            copy_action.triggered.connect(lambda: self.copy_item(index))
+            cut_action.triggered.connect(lambda: self.cut_item(index))
             menu.addAction(open_action)
             menu.addAction(copy_action)
             menu.addAction(cut_action)
@@ -336,23 +554,19 @@ class CustomQuickAccessList(QTreeWidget):
         global_pos = self.viewport().mapToGlobal(position)
         menu.exec(global_pos)
 
-    def detach_path(self, item):
-        if item.data(0, Qt.ItemDataRole.UserRole + 1):
+    def detach_path(self, index):
+        if index.data(FIXED_ROLE):
             QMessageBox.warning(self.file_manager, "Ошибка", "Сначала снимите фиксацию с пути")
             return
-        parent = item.parent() or self.invisibleRootItem()
-        parent.removeChild(item)
+        self.quick_access_model.remove_root(index.row())
         self.file_manager.quick_access_panel.save_state()
-        self.update_style()
 
-    def toggle_fix_path(self, item):
-        current_state = item.data(0, Qt.ItemDataRole.UserRole + 1)
-        item.setData(0, Qt.ItemDataRole.UserRole + 1, not current_state)
+    def toggle_fix_path(self, index):
+        self.quick_access_model.set_fixed(index, not index.data(FIXED_ROLE))
         self.file_manager.quick_access_panel.save_state()
-        self.update_style()
 
-    def open_item(self, item):
-        path = item.data(0, Qt.ItemDataRole.UserRole)
+    def open_item(self, index):
+        path = index.data(PATH_ROLE)
         if os.path.exists(path):
             file_view = self.file_manager.current_file_view()
             if file_view:
@@ -360,24 +574,25 @@ class CustomQuickAccessList(QTreeWidget):
         else:
             QMessageBox.warning(self.file_manager, "Ошибка", f"Путь больше не существует: {path}")
 
-    def copy_item(self, item):
-        path = item.data(0, Qt.ItemDataRole.UserRole)
-        self.file_manager.clipboard = [path]
+    def copy_item(self, index):
+        self.file_manager.clipboard = [index.data(PATH_ROLE)]
         self.file_manager.clipboard_is_cut = False
 
-    def cut_item(self, item):
-        path = item.data(0, Qt.ItemDataRole.UserRole)
-        self.file_manager.clipboard = [path]
+    def cut_item(self, index):
+        self.file_manager.clipboard = [index.data(PATH_ROLE)]
         self.file_manager.clipboard_is_cut = True
 
-    def quick_access_clicked(self, item, column):
+    def quick_access_clicked(self, index):
         # Получаем позицию клика относительно области просмотра
         pos = self.mapFromGlobal(self.cursor().pos())
-        self.file_manager.quick_access_panel.show_zone_selection_menu(item, self.viewport().mapToGlobal(pos))
+        self.file_manager.quick_access_panel.show_zone_selection_menu(index, self.viewport().mapToGlobal(pos))
 
 class QuickAccessPanel:
     def __init__(self, file_manager):
         self.file_manager = file_manager
+        self.trash_dialog = None
+        self.probes = []
+        self.expand_on_probe = set()
         self.widget = QWidget()
         self.layout = QVBoxLayout(self.widget)
 
@@ -409,7 +624,7 @@ class QuickAccessPanel:
         # Подключаем сигнал изменения размера виджета
         self.widget.resizeEvent = self.on_resize
 
-        self.update_style()
+        self.widget.setObjectName(QUICK_ACCESS_PANEL)
         self.load_icons()
         self.load_state()
 
@@ -418,44 +633,6 @@ class QuickAccessPanel:
         self.quick_access.adjust_column_width()
         event.accept()
 
-    def update_style(self):
-        settings = QSettings("MyFileManager", "Settings")
-        bg_color = settings.value("quick_access_bg_color", "#2E2E2E", type=str)
-
-        self.widget.setStyleSheet(f"""
-            QWidget {{
-                background-color: {bg_color};
-            }}
-        """)
-        self.settings_button.setStyleSheet("""
-            QPushButton {
-                background: transparent;
-                border: none;
-            }
-            QPushButton:hover {
-                background-color: #4A4A4A;
-            }
-        """)
-        self.zone_toggle_button.setStyleSheet("""
-            QPushButton {
-                background: transparent;
-                border: none;
-            }
-            QPushButton:hover {
-                background-color: #4A4A4A;
-            }
-        """)
-        self.trash_button.setStyleSheet("""
-            QPushButton {
-                background: transparent;
-                border: none;
-            }
-            QPushButton:hover {
-                background-color: #4A4A4A;
-            }
-        """)
-        self.quick_access.update_style()
-
     def load_icons(self):
         settings = QSettings("MyFileManager", "Settings")
         settings_icon_path = settings.value("icon_settings", "img/settings.svg", type=str)
@@ -492,12 +669,12 @@ class QuickAccessPanel:
             self.trash_button.setIcon(self.widget.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
 
     def open_trash(self):
-        trash_path = os.path.expanduser("~/.local/share/Trash/files")
-        os.makedirs(trash_path, exist_ok=True)
-        nav_bar = self.file_manager.navigation_bar1 if self.file_manager.active_zone == 1 else self.file_manager.navigation_bar2
-        if nav_bar:
-            nav_bar.add_new_tab(trash_path)
-        logging.info(f"Opened trash at {trash_path}")
+        # Корзина открывается как отдельное окно поверх индекса, а не как папка files.
+        # Модуль окна загружается только при первом открытии, чтобы не замедлять запуск
+        from trash_view import TrashDialog
+        self.trash_dialog = TrashDialog(self.file_manager)
+        self.trash_dialog.show()
+        logging.info("Opened trash view")
 
     def show_trash_context_menu(self, position):
         menu = QMenu(self.trash_button)
@@ -513,21 +690,23 @@ class QuickAccessPanel:
                                     "Вы уверены, что хотите безвозвратно очистить корзину?",
                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            if self.file_manager.undo_manager.clear_trash():
-                QMessageBox.information(self.file_manager, "Корзина очищена",
-                                        "Корзина успешно очищена.")
-                for i in range(self.file_manager.navigation_bar1.tab_widget.count()):
-                    file_view = self.file_manager.navigation_bar1.tab_widget.widget(i).findChild(CustomTreeViewWithDrag)
-                    if file_view and self.file_manager.current_path(file_view) == os.path.expanduser("~/.local/share/Trash/files"):
-                        self.file_manager.refresh_view(file_view)
-                if self.file_manager.second_zone_active and self.file_manager.navigation_bar2:
-                    for i in range(self.file_manager.navigation_bar2.tab_widget.count()):
-                        file_view = self.file_manager.navigation_bar2.tab_widget.widget(i).findChild(CustomTreeViewWithDrag)
-                        if file_view and self.file_manager.current_path(file_view) == os.path.expanduser("~/.local/share/Trash/files"):
-                            self.file_manager.refresh_view(file_view)
-            else:
+            # Содержимое сразу переименовывается в сторону, удаление идёт в фоне
+            purge_dirs = self.file_manager.undo_manager.clear_trash()
+            if purge_dirs is None:
                 QMessageBox.warning(self.file_manager, "Ошибка",
                                     "Не удалось очистить корзину.")
+                return
+            self.refresh_trash_views()
+            thread = TrashEmptyThread(self.file_manager.undo_manager.trash, purge_dirs)
+            thread.finished.connect(self.refresh_trash_views)
+            self.file_manager.start_background_job(thread, "Очистка корзины...")
+
+    def refresh_trash_views(self):
+        trash_files = os.path.join(self.file_manager.undo_manager.trash.home_trash, "files")
+        for file_view in self.file_manager.view_registry.views_at(trash_files):
+            self.file_manager.refresh_view(file_view)
+        if self.trash_dialog and self.trash_dialog.isVisible():
+            self.trash_dialog.populate()
 
     def show_zone_selection_menu(self, item, position):
         menu = QMenu()
@@ -549,7 +728,7 @@ class QuickAccessPanel:
             return
         self.file_manager.set_active_zone(zone)
         file_view = self.file_manager.get_file_view(zone)
-        path = item.data(0, Qt.ItemDataRole.UserRole)
+        path = item.data(PATH_ROLE)
         if os.path.exists(path):
             if file_view:
                 self.file_manager.navigate_to(file_view, path)
@@ -561,10 +740,10 @@ class QuickAccessPanel:
             QMessageBox.warning(self.file_manager, "Ошибка", f"Путь больше не существует: {path}")
 
     def open_settings(self):
+        # Панель настроек нужна редко, её модуль загружается при первом открытии
+        from settings_panel import SettingsPanel
         settings_dialog = SettingsPanel(self.file_manager, self)
         settings_dialog.exec()
-        self.quick_access.update_style()
-        self.update_style()
         self.load_icons()
 
     def toggle_second_zone(self):
@@ -574,11 +753,12 @@ class QuickAccessPanel:
     def save_state(self):
         settings = QSettings("MyFileManager", "Settings")
         quick_access_items = []
-        for i in range(self.quick_access.topLevelItemCount()):
-            item = self.quick_access.topLevelItem(i)
-            path = item.data(0, Qt.ItemDataRole.UserRole)
-            is_fixed = item.data(0, Qt.ItemDataRole.UserRole + 1)
-            is_expanded = item.isExpanded()
+        model = self.quick_access.quick_access_model
+        for row in range(model.rowCount()):
+            index = model.index(row, 0)
+            path = index.data(PATH_ROLE)
+            is_fixed = index.data(FIXED_ROLE)
+            is_expanded = self.quick_access.isExpanded(index)
             quick_access_items.append((path, is_fixed, is_expanded))
         settings.setValue("quickAccessItems", quick_access_items)
         settings.sync()
@@ -589,27 +769,63 @@ class QuickAccessPanel:
         if quick_access_items is None:
             quick_access_items = []
 
-        self.quick_access.clear()
+        model = self.quick_access.quick_access_model
+        model.clear_roots()
+        self.expand_on_probe = set()
 
+        # Пути показываются сразу из настроек; доступность проверяется в фоне, чтобы мёртвый
+        # сетевой том не блокировал запуск
         for item_data in quick_access_items:
             try:
                 path, is_fixed, is_expanded = item_data
-                if os.path.exists(path) and os.path.isdir(path):
-                    item = QTreeWidgetItem(self.quick_access)
-                    item.setText(0, os.path.basename(path) or "Root")
-                    item.setData(0, Qt.ItemDataRole.UserRole, path)
-                    item.setData(0, Qt.ItemDataRole.UserRole + 1, is_fixed)
-                    item.setData(0, Qt.ItemDataRole.UserRole + 2, True)
-                    item.setIcon(0, QIcon.fromTheme("folder"))
-                    dummy = QTreeWidgetItem(item)
-                    dummy.setText(0, "")
-                    if is_expanded:
-                        item.setExpanded(True)
+                model.add_root(path, is_fixed in (True, "true"), available=False)
+                if is_expanded in (True, "true"):
+                    self.expand_on_probe.add(path)
             except (ValueError, TypeError):
                 continue
+        self.probe_roots()
 
         self.load_icons()
-        self.quick_access.update_style()
+
+    def probe_roots(self):
+        model = self.quick_access.quick_access_model
+        probe = PathProbeThread([node.path for node in model.roots])
+        probe.probed.connect(self.on_root_probed)
+        probe.finished.connect(lambda: self.probes.remove(probe))
+        self.probes.append(probe)
+        probe.start()
+
+    def on_root_probed(self, path, status):
+        model = self.quick_access.quick_access_model
+        available = status == PATH_AVAILABLE
+        model.set_available(path, available)
+        if available and path in self.expand_on_probe:
+            self.expand_on_probe.discard(path)
+            self.quick_access.expand(model.root_index(path))
+
+    def shutdown(self):
+        """Останавливаем фоновые проверки и чтение папок перед закрытием окна."""
+        model = self.quick_access.quick_access_model
+        for probe in self.probes[:]:
+            probe.cancel()
+            probe.wait()
+        loaders = list(model.finishing_loaders)
+        stack = list(model.roots)
+        while stack:
+            node = stack.pop()
+            if node.loader is not None:
+                node.loader.cancel()
+                loaders.append(node.loader)
+            stack.extend(node.children or [])
+        for loader in loaders:
+            # Поток, застрявший на недоступном томе, не должен задерживать выход, но и уничтожать
+            # работающий QThread нельзя: ссылка на него держится до его завершения
+            keep_until_finished(loader)
+
+    def refresh(self):
+        """Ctrl+R / F5: перепроверяем закреплённые пути и перечитываем развёрнутые папки."""
+        self.probe_roots()
+        self.quick_access.quick_access_model.refresh()
 
     def get_widget(self):
         return self.widget
@@ -1,61 +1,11 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit,
                              QSpinBox, QCheckBox, QFileDialog, QColorDialog, QFormLayout,
-                             QTabWidget, QWidget, QHeaderView)
+                             QTabWidget, QWidget, QHeaderView, QComboBox)
 from PyQt6.QtGui import QColor, QIcon
-from PyQt6.QtCore import QSettings, Qt  # Added Qt import
-from PyQt6.QtSvg import QSvgRenderer
-from PyQt6.QtGui import QImage, QPainter, QPixmap, QIconEngine
+from PyQt6.QtCore import QSettings
 import os
-from treeview import CustomTreeViewWithDrag
-import logging
-
-# Настройка логирования
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# Класс для кастомного движка иконок (перемещаем сюда из quick_access.py для использования в предпросмотре)
-class ColoredSvgIconEngine(QIconEngine):
-    def __init__(self, svg_path, color):
-        super().__init__()
-        self.svg_path = svg_path
-        self.color = QColor(color)
-
-    def pixmap(self, size, mode, state):
-        # Создаем пустое изображение
-        image = QImage(size, QImage.Format.Format_ARGB32)
-        image.fill(Qt.GlobalColor.transparent)
-
-        # Рендерим SVG
-        renderer = QSvgRenderer(self.svg_path)
-        if not renderer.isValid():
-            logging.error(f"Invalid SVG file: {self.svg_path}")
-            return QPixmap()  # Возвращаем пустой QPixmap в случае ошибки
-
-        painter = QPainter(image)
-        renderer.render(painter)
-
-        # Применяем цвет
-        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
-        painter.fillRect(image.rect(), self.color)
-        painter.end()
-
-        # Преобразуем QImage в QPixmap
-        pixmap = QPixmap.fromImage(image)
-        return pixmap
-
-# Функция для создания иконки с заданным цветом
-def create_colored_icon(icon_path, color):
-    if not os.path.exists(icon_path):
-        logging.error(f"Icon file does not exist: {icon_path}")
-        return QIcon()
-
-    # Проверяем, является ли файл SVG
-    if icon_path.lower().endswith('.svg'):
-        engine = ColoredSvgIconEngine(icon_path, color)
-        icon = QIcon(engine)
-        return icon
-    else:
-        logging.warning(f"Cannot change color of non-SVG icon: {icon_path}. Using original icon.")
-        return QIcon(icon_path)
+from icons import create_colored_icon, clear_icon_cache
+from theme import theme
 
 class SettingsPanel(QDialog):
     def __init__(self, file_manager, quick_access_panel, parent=None):
@@ -107,6 +57,38 @@ class SettingsPanel(QDialog):
         self.hide_hidden_files = QCheckBox("Скрывать скрытые файлы")
         layout.addRow(self.hide_hidden_files)
 
+        # Проверка копий по контрольной сумме
+        self.verify_after_copy = QCheckBox("Проверять копии после копирования (BLAKE2)")
+        layout.addRow(self.verify_after_copy)
+
+        # Подгружать восстановленные вкладки в фоне, а не только при открытии
+        self.prefetch_tabs = QCheckBox("Подгружать фоновые вкладки после запуска")
+        layout.addRow(self.prefetch_tabs)
+
+        # Рекурсивный размер папок в колонке "Size", считается в фоне
+        self.folder_sizes = QCheckBox("Подсчитывать размер папок в фоне")
+        layout.addRow(self.folder_sizes)
+
+        # Сколько памяти могут занимать списки всех вкладок; давно не открывавшиеся выгружаются
+        self.listing_memory_budget = QSpinBox()
+        self.listing_memory_budget.setRange(0, 16384)
+        self.listing_memory_budget.setSuffix(" МБ")
+        self.listing_memory_budget.setSpecialValueText("Без ограничения")
+        layout.addRow("Память под списки вкладок:", self.listing_memory_budget)
+
+        # Ограничение скорости фоновых копирований (0 — без ограничения)
+        self.transfer_rate_limit = QSpinBox()
+        self.transfer_rate_limit.setRange(0, 10000)
+        self.transfer_rate_limit.setSuffix(" МБ/с")
+        self.transfer_rate_limit.setSpecialValueText("Без ограничения")
+        layout.addRow("Лимит скорости копирования:", self.transfer_rate_limit)
+
+        # Класс приоритета ввода-вывода для фоновых копирований
+        self.transfer_io_priority = QComboBox()
+        self.transfer_io_priority.addItem("Обычный", "best-effort")
+        self.transfer_io_priority.addItem("Фоновый (idle)", "idle")
+        layout.addRow("Приоритет ввода-вывода:", self.transfer_io_priority)
+
         return widget
 
     def create_customization_tab(self):
@@ -261,6 +243,13 @@ class SettingsPanel(QDialog):
     def load_settings(self):
         # Загрузка настроек для вкладки "Общее"
         self.hide_hidden_files.setChecked(self.settings.value("hide_hidden_files", False, type=bool))
+        self.verify_after_copy.setChecked(self.settings.value("verify_after_copy", False, type=bool))
+        self.prefetch_tabs.setChecked(self.settings.value("prefetch_tabs", False, type=bool))
+        self.folder_sizes.setChecked(self.settings.value("folder_sizes", False, type=bool))
+        self.listing_memory_budget.setValue(self.settings.value("listing_memory_budget_mb", 64, type=int))
+        self.transfer_rate_limit.setValue(self.settings.value("transfer_rate_limit_mb", 0, type=int))
+        io_priority_index = self.transfer_io_priority.findData(self.settings.value("transfer_io_priority", "best-effort", type=str))
+        self.transfer_io_priority.setCurrentIndex(max(0, io_priority_index))
 
         # Загрузка настроек для вкладки "Кастомизация"
         self.app_icon_path.setText(self.settings.value("icon_appicon", "", type=str))
@@ -292,6 +281,12 @@ class SettingsPanel(QDialog):
     def save_settings(self):
         # Сохранение настроек для вкладки "Общее"
         self.settings.setValue("hide_hidden_files", self.hide_hidden_files.isChecked())
+        self.settings.setValue("verify_after_copy", self.verify_after_copy.isChecked())
+        self.settings.setValue("prefetch_tabs", self.prefetch_tabs.isChecked())
+        self.settings.setValue("folder_sizes", self.folder_sizes.isChecked())
+        self.settings.setValue("listing_memory_budget_mb", self.listing_memory_budget.value())
+        self.settings.setValue("transfer_rate_limit_mb", self.transfer_rate_limit.value())
+        self.settings.setValue("transfer_io_priority", self.transfer_io_priority.currentData())
 
         # Сохранение настроек для вкладки "Кастомизация"
         self.settings.setValue("icon_appicon", self.app_icon_path.text())
@@ -317,21 +312,25 @@ class SettingsPanel(QDialog):
 
         self.settings.sync()
 
-        # Обновление стилей
-        self.file_manager.update_work_zones_style()
-        self.quick_access_panel.update_style()
+        # Пути и цвета иконок могли измениться, а файлы - быть перезаписаны на месте
+        clear_icon_cache()
+
+        # Обновление стилей: одна таблица стилей на всё приложение
+        theme.apply()
 
         # Обновление иконки приложения
         self.file_manager.load_icon_settings()
 
-        # Обновление представлений
-        for nav_bar in [self.file_manager.navigation_bar1, self.file_manager.navigation_bar2]:
-            if nav_bar:
-                nav_bar.update_style()  # Добавляем метод update_style для обновления стиля вкладок
-                for i in range(nav_bar.tab_widget.count()):
-                    file_view = nav_bar.tab_widget.widget(i).findChild(CustomTreeViewWithDrag)
-                    if file_view:
-                        self.file_manager.refresh_view(file_view)
+        # Скрытые файлы прячет прокси-модель каждого вида: папки не перечитываются
+        hide_hidden_files = self.hide_hidden_files.isChecked()
+        for file_view in self.file_manager.view_registry.views():
+            file_view.proxy_model.set_hide_hidden(hide_hidden_files)
+
+        # Подсчёт размеров папок: запускаем для открытых каталогов или останавливаем
+        if self.folder_sizes.isChecked():
+            self.file_manager.measure_all_folder_sizes()
+        else:
+            self.file_manager.stop_folder_size_jobs()
 
         self.accept()
 
@@ -0,0 +1,123 @@
+import sys
+import time
+import builtins
+import logging
+from contextlib import contextmanager
+from app_paths import app_data_path
+
+PROFILE_FLAG = "--profile-startup"
+
+
+class StartupProfiler:
+    """Timeline of startup: module imports, widget construction, load_state, first listing, first paint.
+
+    Enabled with --profile-startup; otherwise every method returns immediately. Imports are timed
+    by wrapping builtins.__import__, so the numbers are cumulative (a module includes what it
+    imports), like `python -X importtime`. The report is logged at first paint and a one-line
+    summary is appended to startup-profile.log so runs can be compared.
+    """
+
+    MIN_IMPORT_MS = 1.0  # faster imports are left out of the report
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.events = []  # (start ms, duration ms or None, depth, label)
+        self._seen = set()
+        self._depth = 0
+        self._original_import = None
+        self._paint_filter = None
+
+    def _now(self):
+        return (time.perf_counter() - self.origin) * 1000
+
+    def mark(self, label, once=False):
+        if not self.enabled or (once and label in self._seen):
+            return
+        self._seen.add(label)
+        self.events.append((self._now(), None, self._depth, label))
+
+    @contextmanager
+    def span(self, label, once=False):
+        if not self.enabled or (once and label in self._seen):
+            yield
+            return
+        self._seen.add(label)
+        start = self._now()
+        event = [start, None, self._depth, label]
+        self.events.append(event)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            event[1] = self._now() - start
+
+    def install_import_hook(self):
+        if not self.enabled or self._original_import:
+            return
+        original = self._original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            with self.span(f"import {name}"):
+                return original(name, globals, locals, fromlist, level)
+
+        builtins.__import__ = timed_import
+
+    def remove_import_hook(self):
+        if self._original_import:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def watch_first_paint(self, window):
+        """Report once `window` has painted for the first time."""
+        if not self.enabled:
+            return
+        from PyQt6.QtCore import QObject, QEvent, QTimer
+
+        profiler = self
+
+        class FirstPaintFilter(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Type.Paint:
+                    window.removeEventFilter(self)
+                    profiler.mark("first paint")
+                    # Report after the paint itself has finished
+                    QTimer.singleShot(0, profiler.finish)
+                return False
+
+        self._paint_filter = FirstPaintFilter(window)
+        window.installEventFilter(self._paint_filter)
+
+    def report(self):
+        lines = [f"Startup profile ({PROFILE_FLAG}):", "   start ms   duration ms   event"]
+        for start, duration, depth, label in self.events:
+            if duration is not None and duration < self.MIN_IMPORT_MS and label.startswith("import "):
+                continue
+            duration_text = f"{duration:11.1f}" if duration is not None else " " * 11
+            lines.append(f"{start:11.1f}   {duration_text}   {'  ' * depth}{label}")
+        return "\n".join(lines)
+
+    def finish(self):
+        if not self.enabled:
+            return
+        self.remove_import_hook()
+        logging.info(self.report())
+        imports_ms = sum(duration for _, duration, depth, label in self.events
+                         if depth == 0 and duration is not None and label.startswith("import "))
+        durations = {label: duration or 0 for _, duration, _, label in self.events}
+        first_paint = next((start for start, _, _, label in self.events if label == "first paint"), 0)
+        summary = (f"{time.strftime('%Y-%m-%d %H:%M:%S')} first_paint_ms={first_paint:.1f} "
+                   f"imports_ms={imports_ms:.1f} load_state_ms={durations.get('load_state', 0):.1f}")
+        try:
+            with open(app_data_path("startup-profile.log"), 'a', encoding='utf-8') as f:
+                f.write(summary + "\n")
+        except OSError as e:
+            logging.warning(f"Cannot write startup profile summary: {e}")
+        self.enabled = False
+
+
+profiler = StartupProfiler(PROFILE_FLAG in sys.argv)
+profiler.install_import_hook()
@@ -0,0 +1,155 @@
+from PyQt6.QtCore import QSettings
+from PyQt6.QtWidgets import QApplication
+import logging
+
+# Имена объектов, по которым таблица стилей находит виджеты
+WORK_ZONES = "workZones"
+NAVIGATION_BAR = "navigationBar"
+FILE_VIEW = "fileView"
+QUICK_ACCESS_PANEL = "quickAccessPanel"
+QUICK_ACCESS_LIST = "quickAccessList"
+
+# Ключ настройки -> значение по умолчанию
+DEFAULTS = {
+    "work_zones_bg_color": "#2E2E2E",
+    "active_tab_color": "#00d158",
+    "treeview_font_size": "10",
+    "treeview_row_height": "24",
+    "treeview_bg_color": "#2E2E2E",
+    "treeview_alt_bg_color": "#353535",
+    "quick_access_font_size": "9",
+    "quick_access_row_height": "22",
+    "quick_access_bg_color": "#2E2E2E",
+    "quick_access_alt_bg_color": "#353535",
+}
+
+
+class Theme:
+    """Единая таблица стилей программы.
+
+    Собирается из QSettings один раз при запуске и после сохранения настроек и ставится
+    на QApplication, поэтому новые вкладки, зоны и навигация не пересчитывают и не
+    переустанавливают стили. Виджеты находятся по objectName (константы выше).
+
+    В одной таблице, в отличие от таблиц отдельных виджетов, правило предка не уступает
+    правилу потомка само по себе: побеждает более специфичный селектор, а при равной
+    специфичности - более поздний. Поэтому фон контейнеров задаётся без селектора
+    потомков ("#id QWidget" перебил бы "QTreeView#id"), а правила одинаковой
+    специфичности идут от общих к частным.
+    """
+
+    def __init__(self):
+        self.values = dict(DEFAULTS)
+        self.stylesheet = ""
+
+    def value(self, key):
+        return self.values[key]
+
+    def compile(self):
+        settings = QSettings("MyFileManager", "Settings")
+        self.values = {key: settings.value(key, default, type=str) for key, default in DEFAULTS.items()}
+        v = self.values
+        self.stylesheet = f"""
+            QMainWindow {{
+                background-color: #2E2E2E;
+            }}
+
+            /* Рабочие зоны: только сам контейнер, вложенные виджеты прозрачны и его фон просвечивает */
+            QWidget#{WORK_ZONES} {{
+                background-color: {v['work_zones_bg_color']};
+            }}
+            #{NAVIGATION_BAR}, #{NAVIGATION_BAR} QWidget {{
+                background: transparent;  /* Avoid setting a background that overrides QTreeView */
+            }}
+            #{NAVIGATION_BAR} QTabWidget::pane {{
+                background: transparent;
+                border: none;
+            }}
+            #{NAVIGATION_BAR} QTabBar::tab {{
+                background-color: #3A3A3A;
+                color: #FFFFFF;
+                padding: 6px;
+                margin-right: 4px;
+                border-top-left-radius: 8px;
+                border-top-right-radius: 8px;
+            }}
+            #{NAVIGATION_BAR} QTabBar::tab:selected {{
+                background-color: {v['active_tab_color']};
+            }}
+            #{NAVIGATION_BAR} QLineEdit {{
+                background-color: #3A3A3A;
+                color: #FFFFFF;
+                border: 1px solid #4A4A4A;
+                padding: 2px;
+            }}
+            #{NAVIGATION_BAR} QPushButton {{
+                background-color: #3A3A3A;
+                border: none;
+                padding: 2px;
+            }}
+            #{NAVIGATION_BAR} QPushButton:hover {{
+                background-color: #4A4A4A;
+            }}
+
+            /* Списки файлов; чередование строк выполняет сам вид */
+            QTreeView#{FILE_VIEW} {{
+                background: {v['treeview_bg_color']};
+                alternate-background-color: {v['treeview_alt_bg_color']};
+                color: #FFFFFF;
+                border: none;
+                font-size: {v['treeview_font_size']}pt;
+            }}
+            QTreeView#{FILE_VIEW}::item {{
+                padding: 2px;
+                min-height: {v['treeview_row_height']}px;
+            }}
+            QTreeView#{FILE_VIEW}::item:selected {{
+                background-color: #4A4A4A;
+            }}
+            QTreeView#{FILE_VIEW} QHeaderView::section {{
+                background-color: #3A3A3A;
+                color: #FFFFFF;
+                padding: 2px;
+                border: none;
+                height: 20px;
+                font-size: 9pt;
+            }}
+
+            /* Панель быстрого доступа: как и рабочие зоны, цвет задаётся только контейнеру */
+            QWidget#{QUICK_ACCESS_PANEL} {{
+                background-color: {v['quick_access_bg_color']};
+            }}
+            #{QUICK_ACCESS_PANEL} QPushButton {{
+                background: transparent;
+                border: none;
+            }}
+            #{QUICK_ACCESS_PANEL} QPushButton:hover {{
+                background-color: #4A4A4A;
+            }}
+            QTreeView#{QUICK_ACCESS_LIST} {{
+                background-color: {v['quick_access_bg_color']};
+                alternate-background-color: {v['quick_access_alt_bg_color']};
+                color: #FFFFFF;
+                border: none;
+                font-size: {v['quick_access_font_size']}pt;
+            }}
+            QTreeView#{QUICK_ACCESS_LIST}::item {{
+                padding: 2px 5px;  /* Уменьшенный отступ для текста */
+                min-height: {v['quick_access_row_height']}px;
+            }}
+            QTreeView#{QUICK_ACCESS_LIST}::item:selected {{
+                background-color: #4A4A4A;
+            }}
+        """
+        return self.stylesheet
+
+    def apply(self):
+        """Пересобираем таблицу стилей из настроек и ставим её на всё приложение."""
+        app = QApplication.instance()
+        if app is None:
+            return
+        app.setStyleSheet(self.compile())
+        logging.debug("Applied application stylesheet")
+
+
+theme = Theme()
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import uuid
+import logging
+from app_paths import app_data_path
+
+
+class TransferJournal:
+    """Append-only record of a file operation, used to resume it after a crash or an interrupted shutdown.
+
+    Every line is one JSON record:
+        job   - header with the operation, sources, destination and verify flag
+        item  - a top-level source and the destination name chosen for it
+        file  - a file that was copied completely (size and, with verification, its source hash)
+        part  - bytes of a file already written to the destination
+        done  - a top-level source that is finished
+    The file is removed when the job completes or is cancelled by the user.
+    """
+
+    FSYNC_EVERY = 64  # completed files between fsyncs
+    PARTIAL_EVERY = 64 * 1024 * 1024  # bytes of a single file between offset records
+
+    def __init__(self, path):
+        self.path = path
+        self.job_id = os.path.splitext(os.path.basename(path))[0]
+        self.operation = "copy"
+        self.src_paths = []
+        self.dest_path = ""
+        self.verify = False
+        self.created = 0.0
+        self.items = {}
+        self.completed = {}
+        self.partial = {}
+        self.done_items = set()
+        self._file = None
+        self._unsynced = 0
+
+    @staticmethod
+    def journal_dir():
+        return app_data_path("transfers", "")
+
+    @classmethod
+    def create(cls, operation, src_paths, dest_path, verify=False):
+        path = os.path.join(cls.journal_dir(), f"{uuid.uuid4().hex}.journal")
+        journal = cls(path)
+        journal.operation = operation
+        journal.src_paths = list(src_paths)
+        journal.dest_path = dest_path
+        journal.verify = verify
+        journal.created = time.time()
+        journal._append({'t': 'job', 'op': operation, 'src': journal.src_paths, 'dest': dest_path,
+                         'verify': verify, 'time': journal.created})
+        journal.sync()
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        journal = cls(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line after a crash; everything before it is valid
+                    logging.warning(f"Ignoring damaged record in transfer journal {path}")
+                    break
+                journal._apply(record)
+        return journal
+
+    @classmethod
+    def pending(cls):
+        """Journals left behind by jobs that did not finish."""
+        journals = []
+        directory = cls.journal_dir()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".journal"):
+                continue
+            try:
+                journal = cls.load(os.path.join(directory, name))
+            except OSError as e:
+                logging.error(f"Failed to read transfer journal {name}: {e}")
+                continue
+            if journal.src_paths:
+                journals.append(journal)
+        return sorted(journals, key=lambda j: j.created)
+
+    def _apply(self, record):
+        kind = record.get('t')
+        if kind == 'job':
+            self.operation = record['op']
+            self.src_paths = record['src']
+            self.dest_path = record['dest']
+            self.verify = record.get('verify', False)
+            self.created = record.get('time', 0.0)
+        elif kind == 'item':
+            self.items[record['src']] = record['dest']
+        elif kind == 'file':
+            self.completed[record['src']] = (record['size'], record.get('hash'))
+            self.partial.pop(record['src'], None)
+        elif kind == 'part':
+            self.partial[record['src']] = record['off']
+        elif kind == 'done':
+            self.done_items.add(record['src'])
+
+    def _append(self, record):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+        # Flushed to the kernel immediately so an application crash loses nothing;
+        # fsync (power loss) is batched below.
+        self._file.flush()
+        self._apply(record)
+
+    def sync(self):
+        if self._file:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def record_item(self, src, dest):
+        self._append({'t': 'item', 'src': src, 'dest': dest})
+        self.sync()
+
+    def record_file(self, src, size, digest=None):
+        record = {'t': 'file', 'src': src, 'size': size}
+        if digest:
+            record['hash'] = digest
+        self._append(record)
+        self._unsynced += 1
+        if self._unsynced >= self.FSYNC_EVERY:
+            self.sync()
+
+    def record_partial(self, src, offset):
+        self._append({'t': 'part', 'src': src, 'off': offset})
+
+    def record_done(self, src):
+        self._append({'t': 'done', 'src': src})
+
+    def close(self, complete):
+        """Finish the journal: delete it if the job completed, otherwise make it durable for a later resume."""
+        if self._file:
+            if not complete:
+                self.sync()
+            self._file.close()
+            self._file = None
+        if complete:
+            self.discard()
+
+    def discard(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+            logging.debug(f"Removed transfer journal {self.path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Failed to remove transfer journal {self.path}: {e}")
@@ -0,0 +1,600 @@
+import os
+import stat
+import errno
+import shutil
+import logging
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from PyQt6.QtCore import QThread, pyqtSignal
+from file_operations import BackgroundJob, OperationCancelled, remove_tree_at, tree_size
+
+
+def _parse_trashinfo(info_path):
+    path = deletion_date = None
+    with open(info_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            key, sep, value = line.rstrip("\n").partition("=")
+            if not sep:
+                continue
+            if key == "Path":
+                path = urllib.parse.unquote(value)
+            elif key == "DeletionDate":
+                deletion_date = value
+    return path, deletion_date
+
+
+class TrashEntry:
+    __slots__ = ('trash_dir', 'name', 'original_path', 'deletion_date', 'size', 'is_dir')
+
+    def __init__(self, trash_dir, name, original_path, deletion_date, size, is_dir):
+        self.trash_dir = trash_dir
+        self.name = name
+        self.original_path = original_path
+        self.deletion_date = deletion_date
+        self.size = size  # None for a directory whose size is not known yet
+        self.is_dir = is_dir
+
+    @property
+    def trash_file_path(self):
+        return os.path.join(self.trash_dir, "files", self.name)
+
+    @property
+    def info_path(self):
+        return os.path.join(self.trash_dir, "info", f"{self.name}.trashinfo")
+
+
+class TrashIndex:
+    """In-memory view of the trash built once from the .trashinfo files and kept current by TrashService.
+
+    Gives O(1) free-name allocation (used names per trash directory plus the next counter
+    per stem), exact lookups for restore and a running total size. Directory sizes are
+    cached in the spec's `directorysizes` file so they are computed only once.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}  # trash_dir -> {name: TrashEntry}
+        self._used_names = {}  # trash_dir -> names present in files/ or info/
+        self._next_suffix = {}  # (trash_dir, stem, ext) -> next counter to try
+        self._dir_sizes = {}  # trash_dir -> {name: (size, info mtime)}
+        self.total_size = 0
+
+    def ensure_loaded(self, trash_dir, topdir=None):
+        with self._lock:
+            if trash_dir in self._entries:
+                return
+            entries = {}
+            used = set()
+            self._dir_sizes[trash_dir] = self._read_directorysizes(trash_dir)
+            files_dir = os.path.join(trash_dir, "files")
+            info_dir = os.path.join(trash_dir, "info")
+            # files/ and info/ are read separately: either may be missing while the other is not
+            try:
+                used.update(os.listdir(files_dir))
+            except FileNotFoundError:
+                pass
+            try:
+                info_names = os.listdir(info_dir)
+            except FileNotFoundError:
+                info_names = []
+            for info_name in info_names:
+                if not info_name.endswith(".trashinfo"):
+                    continue
+                name = info_name[:-len(".trashinfo")]
+                used.add(name)
+                try:
+                    original_path, deletion_date = _parse_trashinfo(os.path.join(info_dir, info_name))
+                    st = os.lstat(os.path.join(files_dir, name))
+                except OSError:
+                    continue
+                if original_path is None:
+                    continue
+                if topdir and not os.path.isabs(original_path):
+                    original_path = os.path.join(topdir, original_path)
+                is_dir = stat.S_ISDIR(st.st_mode)
+                size = st.st_size if not is_dir else self._cached_dir_size(trash_dir, name)
+                entries[name] = TrashEntry(trash_dir, name, original_path, deletion_date, size, is_dir)
+                self.total_size += size or 0
+            self._entries[trash_dir] = entries
+            self._used_names[trash_dir] = used
+            logging.info(f"Indexed {len(entries)} trash entries in {trash_dir}")
+
+    @staticmethod
+    def _read_directorysizes(trash_dir):
+        sizes = {}
+        try:
+            with open(os.path.join(trash_dir, "directorysizes"), 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split(" ", 2)
+                    if len(parts) == 3:
+                        sizes[urllib.parse.unquote(parts[2].rstrip("\n"))] = (int(parts[0]), int(parts[1]))
+        except (OSError, ValueError):
+            pass
+        return sizes
+
+    def _cached_dir_size(self, trash_dir, name):
+        cached = self._dir_sizes.get(trash_dir, {}).get(name)
+        if not cached:
+            return None
+        try:
+            info_mtime = int(os.stat(os.path.join(trash_dir, "info", f"{name}.trashinfo")).st_mtime)
+        except OSError:
+            return None
+        return cached[0] if cached[1] == info_mtime else None
+
+    def allocate_name(self, trash_dir, path):
+        """Pick a free name in the trash directory without probing the filesystem."""
+        with self._lock:
+            used = self._used_names.setdefault(trash_dir, set())
+            stem, ext = os.path.splitext(os.path.basename(path.rstrip(os.sep)))
+            name = stem + ext
+            if name in used:
+                key = (trash_dir, stem, ext)
+                counter = self._next_suffix.get(key, 1)
+                while f"{stem}_{counter}{ext}" in used:
+                    counter += 1
+                name = f"{stem}_{counter}{ext}"
+                self._next_suffix[key] = counter + 1
+            used.add(name)
+            return name
+
+    def release_name(self, trash_dir, name):
+        with self._lock:
+            self._used_names.get(trash_dir, set()).discard(name)
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.setdefault(entry.trash_dir, {})[entry.name] = entry
+            self._used_names.setdefault(entry.trash_dir, set()).add(entry.name)
+            self.total_size += entry.size or 0
+
+    def remove(self, trash_dir, name):
+        with self._lock:
+            entry = self._entries.get(trash_dir, {}).pop(name, None)
+            self.release_name(trash_dir, name)
+            if entry:
+                self.total_size -= entry.size or 0
+            return entry
+
+    def lookup(self, trash_file_path):
+        trash_dir = os.path.dirname(os.path.dirname(trash_file_path))
+        with self._lock:
+            return self._entries.get(trash_dir, {}).get(os.path.basename(trash_file_path))
+
+    def find_by_original(self, original_path):
+        """Most recently deleted entry that came from `original_path`."""
+        with self._lock:
+            matches = [entry for entries in self._entries.values() for entry in entries.values()
+                       if entry.original_path == original_path]
+        return max(matches, key=lambda entry: entry.deletion_date or "") if matches else None
+
+    def entries(self):
+        with self._lock:
+            return [entry for entries in self._entries.values() for entry in entries.values()]
+
+    def set_dir_size(self, entry, size):
+        """Record a computed directory size and append it to the trash's directorysizes cache."""
+        with self._lock:
+            if entry.size is not None:
+                return
+            entry.size = size
+            self.total_size += size
+        try:
+            info_mtime = int(os.stat(entry.info_path).st_mtime)
+            with open(os.path.join(entry.trash_dir, "directorysizes"), 'a', encoding='utf-8') as f:
+                f.write(f"{size} {info_mtime} {urllib.parse.quote(entry.name)}\n")
+        except OSError as e:
+            logging.warning(f"Failed to cache size of {entry.trash_file_path}: {e}")
+
+    def clear(self, trash_dir):
+        with self._lock:
+            for entry in self._entries.pop(trash_dir, {}).values():
+                self.total_size -= entry.size or 0
+            self._used_names.pop(trash_dir, None)
+            self._dir_sizes.pop(trash_dir, None)
+            for key in [key for key in self._next_suffix if key[0] == trash_dir]:
+                del self._next_suffix[key]
+
+
+class TrashService:
+    """Freedesktop.org trash with per-volume trash directories.
+
+    Files on the home volume go to $XDG_DATA_HOME/Trash. Files on any other mount go to
+    $topdir/.Trash/$uid (when the administrator provided a sticky .Trash) or $topdir/.Trash-$uid,
+    so trashing is always a rename on the same device instead of a copy.
+    """
+
+    PURGE_PREFIX = ".purge-"
+
+    def __init__(self):
+        self.uid = os.getuid()
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        self.home_trash = os.path.join(data_home, "Trash")
+        self._trash_by_device = {}
+        self.index = TrashIndex()
+
+    def _home_device(self):
+        probe = self.home_trash
+        while not os.path.exists(probe):
+            probe = os.path.dirname(probe)
+        return os.stat(probe).st_dev
+
+    @staticmethod
+    def _mount_point(path, device):
+        path = os.path.abspath(path)
+        while True:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return path
+            try:
+                if os.lstat(parent).st_dev != device:
+                    return path
+            except OSError:
+                return path
+            path = parent
+
+    def _ensure_trash(self, trash_dir):
+        os.makedirs(os.path.join(trash_dir, "files"), mode=0o700, exist_ok=True)
+        os.makedirs(os.path.join(trash_dir, "info"), mode=0o700, exist_ok=True)
+        return trash_dir
+
+    def _volume_trash(self, topdir):
+        admin_trash = os.path.join(topdir, ".Trash")
+        try:
+            st = os.lstat(admin_trash)
+            # The shared .Trash is only usable if it is a real directory with the sticky bit set
+            if stat.S_ISDIR(st.st_mode) and st.st_mode & stat.S_ISVTX:
+                return self._ensure_trash(os.path.join(admin_trash, str(self.uid)))
+            logging.warning(f"Ignoring insecure {admin_trash}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Cannot use {admin_trash}: {e}")
+        return self._ensure_trash(os.path.join(topdir, f".Trash-{self.uid}"))
+
+    def trash_dir_for(self, path):
+        """Trash directory (containing files/ and info/) on the same device as `path`."""
+        device = os.lstat(path).st_dev
+        trash_dir = self._trash_by_device.get(device)
+        if trash_dir:
+            return trash_dir
+        if device == self._home_device():
+            trash_dir = self._ensure_trash(self.home_trash)
+        else:
+            try:
+                trash_dir = self._volume_trash(self._mount_point(path, device))
+            except OSError as e:
+                # Read-only or foreign volume: fall back to the home trash (a cross-device move)
+                logging.warning(f"No trash directory on the volume of {path}, using home trash: {e}")
+                trash_dir = self._ensure_trash(self.home_trash)
+        self._trash_by_device[device] = trash_dir
+        return trash_dir
+
+    def discover_volume_trashes(self):
+        """Register trash directories that already exist on mounted volumes (may block on slow mounts)."""
+        try:
+            with open("/proc/self/mounts", 'r', encoding='utf-8') as f:
+                mounts = [line.split()[1].replace("\\040", " ") for line in f if len(line.split()) > 2
+                          and line.split()[2] not in ("proc", "sysfs", "devpts", "cgroup", "cgroup2", "securityfs",
+                                                      "debugfs", "tracefs", "mqueue", "pstore", "bpf", "autofs")]
+        except OSError:
+            return
+        for topdir in mounts:
+            for candidate in (os.path.join(topdir, ".Trash", str(self.uid)), os.path.join(topdir, f".Trash-{self.uid}")):
+                try:
+                    if os.path.isdir(os.path.join(candidate, "info")):
+                        self._trash_by_device.setdefault(os.stat(candidate).st_dev, candidate)
+                        break
+                except OSError:
+                    continue
+
+    def trash_dirs(self):
+        """All trash directories known so far (the home trash is always first)."""
+        dirs = [self.home_trash]
+        dirs.extend(d for d in self._trash_by_device.values() if d not in dirs)
+        return dirs
+
+    def _topdir(self, trash_dir):
+        """Volume root a volume trash belongs to (None for the home trash)."""
+        if trash_dir == self.home_trash:
+            return None
+        parent = os.path.dirname(trash_dir)
+        return os.path.dirname(parent) if os.path.basename(parent) == ".Trash" else parent
+
+    def index_dir(self, trash_dir):
+        self.index.ensure_loaded(trash_dir, self._topdir(trash_dir))
+
+    def load_index(self):
+        """Index every known trash directory; returns the index."""
+        for trash_dir in self.trash_dirs():
+            self.index_dir(trash_dir)
+        return self.index
+
+    def _info_path_value(self, path, trash_dir):
+        topdir = self._topdir(trash_dir)
+        if topdir is None:
+            return urllib.parse.quote(os.path.abspath(path))
+        # Volume trashes store paths relative to the volume root, as the specification recommends
+        return urllib.parse.quote(os.path.relpath(os.path.abspath(path), topdir))
+
+    def _reserve_name(self, trash_dir, path, info_content):
+        """Create the .trashinfo exclusively; its existence reserves the name in files/."""
+        while True:
+            name = self.index.allocate_name(trash_dir, path)
+            info_path = os.path.join(trash_dir, "info", f"{name}.trashinfo")
+            try:
+                fd = os.open(info_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                # Another program trashed under this name since the index was built
+                continue
+            if os.path.lexists(os.path.join(trash_dir, "files", name)):
+                # A stray file without .trashinfo (or one added after indexing); the name stays used
+                os.close(fd)
+                os.remove(info_path)
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(info_content)
+            return name, info_path
+
+    def trash(self, path):
+        """Move one path to the trash of its volume. Returns the path of the item inside files/."""
+        trash_dir = self.trash_dir_for(path)
+        self.index_dir(trash_dir)
+        st = os.lstat(path)
+        deletion_time = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        info_content = (
+            "[Trash Info]\n"
+            f"Path={self._info_path_value(path, trash_dir)}\n"
+            f"DeletionDate={deletion_time}\n"
+        )
+        name, info_path = self._reserve_name(trash_dir, path, info_content)
+        trash_file_path = os.path.join(trash_dir, "files", name)
+        try:
+            os.rename(path, trash_file_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                os.remove(info_path)
+                self.index.release_name(trash_dir, name)
+                raise
+            try:
+                shutil.move(path, trash_file_path)
+            except OSError:
+                os.remove(info_path)
+                self.index.release_name(trash_dir, name)
+                raise
+        is_dir = stat.S_ISDIR(st.st_mode)
+        self.index.add(TrashEntry(trash_dir, name, os.path.abspath(path), deletion_time,
+                                  None if is_dir else st.st_size, is_dir))
+        logging.info(f"Moved to trash: {path} -> {trash_file_path}")
+        return trash_file_path
+
+    def restore(self, trash_file_path, original_path):
+        if not os.path.lexists(trash_file_path):
+            raise FileNotFoundError(errno.ENOENT, "Not found in trash", trash_file_path)
+        if os.path.lexists(original_path):
+            raise FileExistsError(errno.EEXIST, "Restore target already exists", original_path)
+        os.makedirs(os.path.dirname(original_path), exist_ok=True)
+        try:
+            os.rename(trash_file_path, original_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(trash_file_path, original_path)
+        trash_dir = os.path.dirname(os.path.dirname(trash_file_path))
+        info_path = os.path.join(trash_dir, "info", f"{os.path.basename(trash_file_path)}.trashinfo")
+        if os.path.exists(info_path):
+            os.remove(info_path)
+        self.index.remove(trash_dir, os.path.basename(trash_file_path))
+        logging.info(f"Restored {original_path} from {trash_file_path}")
+
+    def detach_contents(self, trash_dirs=None):
+        """Rename files/ and info/ of each trash aside and recreate them empty, so the trash is empty at once.
+
+        Returns the renamed directories (plus any left over from an earlier interrupted emptying)
+        for TrashEmptyThread to delete.
+        """
+        purge_dirs = []
+        for trash_dir in trash_dirs if trash_dirs is not None else self.trash_dirs():
+            if not os.path.isdir(trash_dir):
+                continue
+            stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+            for sub in ("files", "info"):
+                sub_dir = os.path.join(trash_dir, sub)
+                if os.path.isdir(sub_dir):
+                    os.rename(sub_dir, os.path.join(trash_dir, f"{self.PURGE_PREFIX}{sub}-{stamp}"))
+            self._ensure_trash(trash_dir)
+            if os.path.exists(os.path.join(trash_dir, "directorysizes")):
+                os.remove(os.path.join(trash_dir, "directorysizes"))
+            self.index.clear(trash_dir)
+            purge_dirs.extend(os.path.join(trash_dir, name) for name in sorted(os.listdir(trash_dir))
+                              if name.startswith(self.PURGE_PREFIX))
+        return purge_dirs
+
+    @staticmethod
+    def sync_dirs(trash_dirs):
+        """Make a batch of renames and .trashinfo writes durable with one fsync per directory."""
+        for trash_dir in trash_dirs:
+            for sub in ("info", "files"):
+                try:
+                    fd = os.open(os.path.join(trash_dir, sub), os.O_RDONLY | os.O_DIRECTORY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                except OSError as e:
+                    logging.warning(f"Failed to sync {trash_dir}/{sub}: {e}")
+
+
+class TrashThread(BackgroundJob):
+    """Moves a selection to the trash in the background, syncing trash directories once per batch."""
+
+    trashed = pyqtSignal(list)
+
+    BATCH_SIZE = 256
+
+    def __init__(self, trash_service, paths):
+        super().__init__()
+        self.trash_service = trash_service
+        self.paths = paths
+
+    def run(self):
+        total = len(self.paths)
+        moved = []
+        dirty_dirs = set()
+        for i, path in enumerate(self.paths):
+            if self._cancelled:
+                logging.info(f"Trashing cancelled after {i} of {total} items")
+                break
+            if not os.path.lexists(path):
+                logging.warning(f"Path does not exist for deletion: {path}")
+                continue
+            try:
+                trash_file_path = self.trash_service.trash(path)
+                moved.append((path, trash_file_path))
+                dirty_dirs.add(os.path.dirname(os.path.dirname(trash_file_path)))
+            except PermissionError as e:
+                self.error.emit(f"Нет прав на удаление: {path}")
+                logging.error(f"No permission to move {path} to trash: {e}")
+            except OSError as e:
+                self.error.emit(f"Не удалось переместить {path} в корзину: {e}")
+                logging.error(f"Error moving {path} to trash: {e}")
+            if (i + 1) % self.BATCH_SIZE == 0:
+                TrashService.sync_dirs(dirty_dirs)
+                dirty_dirs.clear()
+            self.progress.emit(int((i + 1) * 100 / total))
+        TrashService.sync_dirs(dirty_dirs)
+        self.trashed.emit(moved)
+        self.finished.emit()
+
+
+class TrashRestoreThread(BackgroundJob):
+    """Restores (trash file path, original path) pairs in the background; restores can be cross-device copies."""
+
+    restored = pyqtSignal(list)  # trash file paths that were restored
+
+    def __init__(self, trash_service, items):
+        super().__init__()
+        self.trash_service = trash_service
+        self.items = items
+
+    def run(self):
+        total = len(self.items)
+        restored = []
+        for i, (trash_file_path, original_path) in enumerate(self.items):
+            if self._cancelled:
+                logging.info(f"Restoring cancelled after {i} of {total} items")
+                break
+            try:
+                self.trash_service.restore(trash_file_path, original_path)
+                restored.append(trash_file_path)
+            except FileExistsError:
+                self.error.emit(f"Путь уже существует: {original_path}")
+            except OSError as e:
+                self.error.emit(f"Не удалось восстановить {original_path}: {e}")
+                logging.error(f"Failed to restore {original_path}: {e}")
+            self.progress.emit(int((i + 1) * 100 / total))
+        self.restored.emit(restored)
+        self.finished.emit()
+
+
+class TrashIndexThread(QThread):
+    """Builds the trash index off the GUI thread, then fills in unknown directory sizes."""
+
+    loaded = pyqtSignal()
+    sizes_updated = pyqtSignal()
+
+    def __init__(self, trash_service):
+        super().__init__()
+        self.trash_service = trash_service
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        self.trash_service.discover_volume_trashes()
+        index = self.trash_service.load_index()
+        self.loaded.emit()
+        pending = [entry for entry in index.entries() if entry.size is None]
+        for i, entry in enumerate(pending):
+            if self._cancelled:
+                return
+            index.set_dir_size(entry, tree_size(entry.trash_file_path))
+            if (i + 1) % 16 == 0:
+                self.sizes_updated.emit()
+        if pending:
+            self.sizes_updated.emit()
+
+
+class TrashEmptyThread(BackgroundJob):
+    """Deletes trash contents detached by TrashService.detach_contents, top-level entries in parallel.
+
+    Cancelling leaves the rest in the renamed directories; the next emptying picks them up.
+    """
+
+    MAX_WORKERS = 8
+
+    def __init__(self, trash_service, purge_dirs):
+        super().__init__()
+        self.trash_service = trash_service
+        self.purge_dirs = list(purge_dirs)
+
+    def _should_stop(self):
+        return self._cancelled
+
+    def run(self):
+        # Trash directories on volumes nobody has opened in this session are only found now
+        known = set(self.trash_service.trash_dirs())
+        self.trash_service.discover_volume_trashes()
+        try:
+            self.purge_dirs.extend(self.trash_service.detach_contents(
+                [d for d in self.trash_service.trash_dirs() if d not in known]))
+        except OSError as e:
+            logging.error(f"Failed to detach trash contents: {e}")
+
+        jobs = []
+        dir_fds = []
+        removed = 0
+        failed = False
+        try:
+            for purge_dir in self.purge_dirs:
+                try:
+                    fd = os.open(purge_dir, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+                except FileNotFoundError:
+                    continue
+                dir_fds.append((purge_dir, fd))
+                jobs.extend((fd, name) for name in os.listdir(fd))
+            total = len(jobs)
+            workers = min(self.MAX_WORKERS, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(remove_tree_at, fd, name, self._should_stop) for fd, name in jobs]
+                for i, future in enumerate(futures):
+                    if self._cancelled:
+                        # Queued entries stay in the purge directories; running ones stop at their next check
+                        for pending in futures[i:]:
+                            pending.cancel()
+                        break
+                    try:
+                        removed += future.result()
+                    except OperationCancelled:
+                        continue
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        failed = True
+                        logging.error(f"Failed to delete {jobs[i][1]} from trash: {e}")
+                    self.progress.emit(int((i + 1) * 100 / total))
+        finally:
+            for purge_dir, fd in dir_fds:
+                os.close(fd)
+                if not self._cancelled:
+                    try:
+                        os.rmdir(purge_dir)
+                    except OSError as e:
+                        logging.warning(f"Could not remove {purge_dir}: {e}")
+        if failed:
+            self.error.emit("Некоторые элементы корзины не удалось удалить")
+        logging.info(f"Emptied trash: {removed} entries removed" + (" (cancelled)" if self._cancelled else ""))
+        self.finished.emit()
@@ -0,0 +1,142 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTreeView, QPushButton, QLabel,
+                             QAbstractItemView, QMessageBox, QHeaderView)
+from PyQt6.QtCore import Qt, QSortFilterProxyModel
+from PyQt6.QtGui import QStandardItemModel, QStandardItem, QIcon
+from trash import TrashIndexThread, TrashRestoreThread
+from directory_watch import keep_until_finished
+import os
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024:
+            return f"{size:.2f} {unit}"
+        size /= 1024
+    return f"{size:.2f} PB"
+
+
+class TrashDialog(QDialog):
+    """Содержимое корзины из индекса: сортировка по дате удаления и исходному расположению, восстановление."""
+
+    def __init__(self, file_manager, parent=None):
+        super().__init__(parent or file_manager)
+        self.file_manager = file_manager
+        self.trash_service = file_manager.undo_manager.trash
+        self.setWindowTitle("Корзина")
+        self.resize(760, 480)
+
+        self.layout = QVBoxLayout(self)
+        self.model = QStandardItemModel(0, 4, self)
+        self.model.setHorizontalHeaderLabels(["Имя", "Исходное расположение", "Дата удаления", "Размер"])
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setSortRole(Qt.ItemDataRole.UserRole + 1)
+
+        self.view = QTreeView()
+        self.view.setRootIsDecorated(False)
+        self.view.setModel(self.proxy_model)
+        self.view.setSortingEnabled(True)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.header().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.view.sortByColumn(2, Qt.SortOrder.DescendingOrder)
+        self.layout.addWidget(self.view)
+
+        bottom_layout = QHBoxLayout()
+        self.total_label = QLabel("Загрузка...")
+        bottom_layout.addWidget(self.total_label)
+        bottom_layout.addStretch()
+        self.restore_button = QPushButton("Восстановить")
+        self.restore_button.clicked.connect(self.restore_selected)
+        self.open_folder_button = QPushButton("Открыть папку корзины")
+        self.open_folder_button.clicked.connect(self.open_trash_folder)
+        self.close_button = QPushButton("Закрыть")
+        self.close_button.clicked.connect(self.close)
+        bottom_layout.addWidget(self.restore_button)
+        bottom_layout.addWidget(self.open_folder_button)
+        bottom_layout.addWidget(self.close_button)
+        self.layout.addLayout(bottom_layout)
+
+        # Индекс строится в фоне; размеры папок досчитываются после первой отрисовки
+        self.index_thread = TrashIndexThread(self.trash_service)
+        self.index_thread.loaded.connect(self.populate)
+        self.index_thread.sizes_updated.connect(self.update_sizes)
+        self.index_thread.start()
+
+    def populate(self):
+        self.model.removeRows(0, self.model.rowCount())
+        for entry in self.trash_service.index.entries():
+            name_item = QStandardItem(entry.name)
+            name_item.setData(entry.trash_file_path, Qt.ItemDataRole.UserRole)
+            name_item.setData(entry.name.lower(), Qt.ItemDataRole.UserRole + 1)
+            name_item.setIcon(QIcon.fromTheme("folder" if entry.is_dir else "text-x-generic"))
+            location_item = QStandardItem(os.path.dirname(entry.original_path))
+            location_item.setData(entry.original_path.lower(), Qt.ItemDataRole.UserRole + 1)
+            date_text = (entry.deletion_date or "").replace("T", " ")
+            date_item = QStandardItem(date_text)
+            date_item.setData(entry.deletion_date or "", Qt.ItemDataRole.UserRole + 1)
+            size_item = QStandardItem()
+            self._set_size(size_item, entry.size)
+            self.model.appendRow([name_item, location_item, date_item, size_item])
+        self.update_total()
+
+    def _set_size(self, size_item, size):
+        size_item.setText(format_size(size) if size is not None else "…")
+        size_item.setData(size if size is not None else -1, Qt.ItemDataRole.UserRole + 1)
+
+    def update_sizes(self):
+        index = self.trash_service.index
+        for row in range(self.model.rowCount()):
+            size_item = self.model.item(row, 3)
+            if size_item.data(Qt.ItemDataRole.UserRole + 1) != -1:
+                continue
+            entry = index.lookup(self.model.item(row, 0).data(Qt.ItemDataRole.UserRole))
+            if entry and entry.size is not None:
+                self._set_size(size_item, entry.size)
+        self.update_total()
+
+    def update_total(self):
+        index = self.trash_service.index
+        self.total_label.setText(f"Элементов: {len(index.entries())}, занято: {format_size(index.total_size)}")
+
+    def restore_selected(self):
+        rows = {self.proxy_model.mapToSource(index).row() for index in self.view.selectionModel().selectedRows()}
+        if not rows:
+            QMessageBox.warning(self, "Ошибка", "Выберите элементы для восстановления")
+            return
+        items = []
+        for row in sorted(rows):
+            trash_file_path = self.model.item(row, 0).data(Qt.ItemDataRole.UserRole)
+            entry = self.trash_service.index.lookup(trash_file_path)
+            if entry:
+                items.append((trash_file_path, entry.original_path))
+        if not items:
+            return
+        # Восстановление между томами - это копирование, поэтому оно идёт в фоне, как и удаление в корзину
+        thread = TrashRestoreThread(self.trash_service, items)
+        thread.restored.connect(self.on_restored)
+        self.file_manager.start_background_job(thread, "Восстановление из корзины...")
+
+    def on_restored(self, trash_file_paths):
+        restored = set(trash_file_paths)
+        for row in reversed(range(self.model.rowCount())):
+            if self.model.item(row, 0).data(Qt.ItemDataRole.UserRole) in restored:
+                self.model.removeRow(row)
+        self.update_total()
+
+    def open_trash_folder(self):
+        trash_path = os.path.join(self.trash_service.home_trash, "files")
+        os.makedirs(trash_path, exist_ok=True)
+        nav_bar = self.file_manager.navigation_bar1 if self.file_manager.active_zone == 1 else self.file_manager.navigation_bar2
+        if nav_bar:
+            nav_bar.add_new_tab(trash_path)
+
+    def done(self, result):
+        # Сюда приходят и Esc (reject), и закрытие окна: QDialog.closeEvent тоже вызывает reject()
+        if self.index_thread.isRunning():
+            self.index_thread.loaded.disconnect()
+            self.index_thread.sizes_updated.disconnect()
+            self.index_thread.cancel()
+            # Размер большой папки в корзине считается долго, поэтому поток не ждём, а держим до завершения
+            keep_until_finished(self.index_thread)
+        super().done(result)
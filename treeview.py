@@ -1,18 +1,47 @@
-from PyQt6.QtWidgets import (QTreeView, QAbstractItemView, QMessageBox, QMenu, QProgressDialog, QApplication, QHeaderView)
-from PyQt6.QtCore import Qt, QMimeData, QUrl, QSettings, QDir, QSortFilterProxyModel
-from PyQt6.QtGui import QAction, QMouseEvent, QDrag, QIcon, QStandardItemModel, QStandardItem, QBrush, QColor
+from PyQt6.QtWidgets import (QTreeView, QAbstractItemView, QMessageBox, QMenu, QApplication, QHeaderView)
+from PyQt6.QtCore import Qt, QMimeData, QUrl, QDir, QSettings, QSortFilterProxyModel
+from PyQt6.QtGui import QAction, QMouseEvent, QDrag, QIcon, QStandardItemModel, QStandardItem
 import os
 import shutil
 from datetime import datetime
 import logging
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from theme import FILE_VIEW
 
 class CustomSortFilterProxyModel(QSortFilterProxyModel):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._current_sort_order = Qt.SortOrder.AscendingOrder
+        # Filters without touching the disk: hidden files and the quick filter on a name substring.
+        # Lowercase names come from name_keys of the shared directory model (ListingModel)
+        self._name_keys = None
+        self._hide_hidden = False
+        self._filter_text = ""
+
+    def setSourceModel(self, model):
+        self._name_keys = getattr(model, 'name_keys', None)
+        super().setSourceModel(model)
+
+    def set_hide_hidden(self, hide):
+        if hide != self._hide_hidden:
+            self._hide_hidden = hide
+            self.invalidateFilter()
+
+    def set_filter_text(self, text):
+        text = text.lower()
+        if text != self._filter_text:
+            self._filter_text = text
+            self.invalidateFilter()
+
+    def filter_text(self):
+        return self._filter_text
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self._name_keys is None:
+            return True  # search results and other models are not filtered
+        name = self._name_keys[source_row]
+        if self._hide_hidden and name.startswith('.'):
+            return False
+        return self._filter_text in name
 
     def lessThan(self, left, right):
         left_row = left.row()
@@ -107,6 +136,12 @@ class CustomTreeViewWithDrag(CustomTreeView):
     def __init__(self, file_manager, parent=None):
         super().__init__(parent)
         self.file_manager = file_manager
+        # Path of a tab restored from settings while its reachability is checked in the background
+        self.pending_path = None
+        # Saved column state of such a tab, applied on the first load
+        self.saved_column_state = None
+        # ListingSnapshot the current model was built from
+        self.listing = None
         self.setDragEnabled(True)
         self.setAcceptDrops(True)
         self.setDragDropMode(QAbstractItemView.DragDropMode.DragDrop)
@@ -132,8 +167,11 @@ class CustomTreeViewWithDrag(CustomTreeView):
 
         self.proxy_model = CustomSortFilterProxyModel(self)
         self.proxy_model.setDynamicSortFilter(True)
+        self.proxy_model.set_hide_hidden(QSettings("MyFileManager", "Settings").value("hide_hidden_files", False, type=bool))
 
-        self.update_style()
+        # Styled by the application stylesheet (theme.py); the view itself alternates row colours
+        self.setObjectName(FILE_VIEW)
+        self.setAlternatingRowColors(True)
         logging.info("Initialized CustomTreeViewWithDrag")
 
     def focusInEvent(self, event):
@@ -141,62 +179,14 @@ class CustomTreeViewWithDrag(CustomTreeView):
         self.file_manager.update_active_zone(self)
         logging.debug("Tree view gained focus")
 
-    def update_style(self):
-        settings = QSettings("MyFileManager", "Settings")
-        tree_font_size = settings.value("treeview_font_size", "10", type=str)
-        tree_row_height = settings.value("treeview_row_height", "24", type=str)
-        tree_bg_color = settings.value("treeview_bg_color", "#2E2E2E", type=str)
-        tree_alt_bg_color = settings.value("treeview_alt_bg_color", "#353535", type=str)
-
-        self.setStyleSheet(f"""
-            QTreeView {{
-                background: {tree_bg_color};
-                color: #FFFFFF;
-                border: none;
-                font-size: {tree_font_size}pt;
-            }}
-            QTreeView::item {{
-                padding: 2px;
-                min-height: {tree_row_height}px;
-            }}
-            QTreeView::item:selected {{
-                background-color: #4A4A4A;
-            }}
-            QHeaderView::section {{
-                background-color: #3A3A3A;
-                color: #FFFFFF;
-                padding: 2px;
-                border: none;
-                height: 20px;
-                font-size: 9pt;
-            }}
-        """)
-        self.apply_alternating_colors()
-        logging.debug("Updated tree view style")
-
-    def apply_alternating_colors(self):
-        settings = QSettings("MyFileManager", "Settings")
-        tree_bg_color = settings.value("treeview_bg_color", "#2E2E2E", type=str)
-        tree_alt_bg_color = settings.value("treeview_alt_bg_color", "#353535", type=str)
-
-        source_model = self.proxy_model.sourceModel()
-        if not source_model:
-            return
-
-        for row in range(source_model.rowCount()):
-            for col in range(source_model.columnCount()):
-                item = source_model.item(row, col)
-                if item:
-                    if row % 2 == 0:
-                        item.setBackground(QBrush(QColor(tree_bg_color)))
-                    else:
-                        item.setBackground(QBrush(QColor(tree_alt_bg_color)))
-        logging.debug("Applied alternating colors")
-
     def setModel(self, model):
+        previous = self.proxy_model.sourceModel()
         self.proxy_model.setSourceModel(model)
         super().setModel(self.proxy_model)
-        self.apply_alternating_colors()
+        # Our previous model is freed explicitly instead of waiting for the collector; shared directory
+        # models belong to the listing store (their parent) and are deleted by it
+        if previous is not None and previous is not model and previous.parent() is None:
+            previous.deleteLater()
         logging.info(f"Set model and sorted by column {self._current_sort_column}, order: {'Ascending' if self._current_sort_order == Qt.SortOrder.AscendingOrder else 'Descending'}")
         self.proxy_model.setSortOrder(self._current_sort_order)
         self.proxy_model.sort(self._current_sort_column, self._current_sort_order)
@@ -226,14 +216,14 @@ class CustomTreeViewWithDrag(CustomTreeView):
 
             self.header().setSortIndicator(column, new_order)
 
-            self.apply_alternating_colors()
             self.viewport().update()
             self.update()
             self.file_manager.save_state()
         finally:
             self._sorting_in_progress = False
 
-    def format_size(self, size):
+    @staticmethod
+    def format_size(size):
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
             if size < 1024:
                 return f"{size:.2f} {unit}"
@@ -245,18 +235,6 @@ class CustomTreeViewWithDrag(CustomTreeView):
         if roles and Qt.ItemDataRole.EditRole in roles and topLeft.column() == 0:
             logging.info(f"Data changed due to editing at index: {topLeft.row()},{topLeft.column()}")
             self.file_manager.on_data_changed(self, topLeft)
-        self.apply_alternating_colors()
-        logging.debug("Data changed, reapplied alternating colors")
-
-    def rowsInserted(self, parent, start, end):
-        super().rowsInserted(parent, start, end)
-        self.apply_alternating_colors()
-        logging.debug(f"Rows inserted from {start} to {end}")
-
-    def rowsRemoved(self, parent, start, end):
-        super().rowsRemoved(parent, start, end)
-        self.apply_alternating_colors()
-        logging.debug(f"Rows removed from {start} to {end}")
 
     def mousePressEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -334,6 +312,7 @@ class CustomTreeViewWithDrag(CustomTreeView):
         delete_action = QAction("Переместить в корзину", self)
         new_folder_action = QAction("Создать папку", self)
         new_text_file_action = QAction("Создать текстовый документ", self)
+        duplicates_action = QAction("Найти дубликаты", self)
         refresh_action.triggered.connect(lambda: self.file_manager.refresh_view(self))
         copy_action.triggered.connect(lambda: self.file_manager.hotkey_manager.copy_files())
         cut_action.triggered.connect(lambda: self.file_manager.hotkey_manager.cut_files())
@@ -341,6 +320,9 @@ class CustomTreeViewWithDrag(CustomTreeView):
         delete_action.triggered.connect(self.delete_selected)
         new_folder_action.triggered.connect(self.create_new_folder)
         new_text_file_action.triggered.connect(self.create_new_text_file)
+        # Search within the selection, or the whole current folder if nothing is selected
+        duplicates_action.triggered.connect(
+            lambda: self.file_manager.open_duplicates(self.selected_paths() or [self.file_manager.current_path(self)]))
         menu.addAction(refresh_action)
         menu.addSeparator()
         menu.addAction(copy_action)
@@ -351,6 +333,8 @@ class CustomTreeViewWithDrag(CustomTreeView):
         menu.addAction(delete_action)
         menu.addAction(new_folder_action)
         menu.addAction(new_text_file_action)
+        menu.addSeparator()
+        menu.addAction(duplicates_action)
         menu.exec(self.mapToGlobal(position))
         logging.debug("Showed context menu")
 
@@ -360,44 +344,22 @@ class CustomTreeViewWithDrag(CustomTreeView):
             logging.info("No items selected for deletion")
             QMessageBox.warning(self.file_manager, "Ошибка", "Выберите файлы или папки для удаления")
             return
-        total_items = len(set(index.row() for index in selected))
         reply = QMessageBox.question(self.file_manager, "Удаление", "Переместить выбранные элементы в корзину?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply != QMessageBox.StandardButton.Yes:
             return
-        progress = QProgressDialog("Перемещение в корзину...", "Отмена", 0, total_items, self.file_manager)
-        progress.setWindowModality(Qt.WindowModality.WindowModal)
-        progress.setAutoClose(True)
-        deleted_paths = set()
-        for i, index in enumerate(selected):
-            if index.column() != 0 or index.row() in deleted_paths:
+        self.file_manager.trash_paths(self.selected_paths(), self)
+
+    def selected_paths(self):
+        paths = []
+        processed_rows = set()
+        for index in self.selectedIndexes():
+            if index.column() != 0 or index.row() in processed_rows:
                 continue
+            processed_rows.add(index.row())
             source_index = self.proxy_model.mapToSource(index)
-            path = self.proxy_model.sourceModel().item(source_index.row(), 0).data(Qt.ItemDataRole.UserRole)
-            progress.setValue(i)
-            progress.setLabelText(f"Перемещение: {os.path.basename(path)}")
-            if not os.path.exists(path):
-                logging.warning(f"Path does not exist for deletion: {path}")
-                continue
-            try:
-                if not os.access(path, os.W_OK):
-                    logging.error(f"No write permission for {path}")
-                    QMessageBox.warning(self.file_manager, "Ошибка", f"Нет прав на удаление: {path}")
-                    continue
-                if self.file_manager.undo_manager.move_to_trash(path):
-                    self.file_manager.undo_manager.add_action('DELETE', path=path)
-                    deleted_paths.add(index.row())
-                    logging.info(f"Moved to trash: {path}")
-                else:
-                    logging.error(f"Failed to move {path} to trash")
-                    QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось переместить {path} в корзину")
-            except Exception as e:
-                logging.error(f"Error moving {path} to trash: {e}")
-                QMessageBox.warning(self.file_manager, "Ошибка", f"Не удалось переместить {path} в корзину: {e}")
-            if progress.wasCanceled():
-                break
-        progress.setValue(total_items)
-        self.file_manager.refresh_view(self)
+            paths.append(self.proxy_model.sourceModel().item(source_index.row(), 0).data(Qt.ItemDataRole.UserRole))
+        return paths
 
     def create_new_folder(self):
         current_path = self.file_manager.current_path(self)
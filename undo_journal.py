@@ -0,0 +1,128 @@
+import os
+import json
+import logging
+import threading
+from app_paths import app_data_path
+
+
+class UndoJournal:
+    """Append-only log of undo/redo stack changes, replayed in memory at startup.
+
+    Every line is one JSON record:
+        push  - an entry (entry.to_record(), read back with undo_manager.entry_from_record) put
+                on the 'undo' or 'redo' stack, with a probe path and inode used to drop stale entries
+        pop   - the top entry of a stack was taken
+        clear - a stack was emptied
+    Loading never touches the files the entries refer to: UndoManager checks an entry's probe
+    only when it is about to be replayed, off the GUI thread.
+    When the log grows well past the number of live entries it is rewritten as a snapshot.
+    """
+
+    FSYNC_EVERY = 32  # records between fsyncs
+    COMPACT_MIN_RECORDS = 1024
+    COMPACT_RATIO = 4  # compact when records exceed live entries by this factor
+
+    def __init__(self, path=None):
+        self.path = path or app_data_path("undo.journal")
+        self._file = None
+        self._lock = threading.Lock()
+        self._records = 0
+        self._unsynced = 0
+
+    def load(self, max_size):
+        """Replay the log; returns (undo, redo) lists of (record, probe) from oldest to newest."""
+        stacks = {'undo': [], 'redo': []}
+        if not os.path.exists(self.path):
+            return [], []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line after a crash; everything before it is valid
+                    logging.warning(f"Ignoring damaged record in undo journal {self.path}")
+                    break
+                self._records += 1
+                stack = stacks.get(record.get('s'))
+                if stack is None:
+                    continue
+                op = record.get('op')
+                if op == 'push':
+                    stack.append((record['e'], record.get('p')))
+                    if len(stack) > max_size:
+                        del stack[0]
+                elif op == 'pop' and stack:
+                    stack.pop()
+                elif op == 'clear':
+                    stack.clear()
+        return stacks['undo'], stacks['redo']
+
+    @staticmethod
+    def is_valid(probe):
+        """Cheap staleness check: the probed path still exists and is the same inode."""
+        if not probe:
+            return True
+        path, inode = probe
+        try:
+            return inode is None or os.lstat(path).st_ino == inode
+        except OSError:
+            return False
+
+    @staticmethod
+    def make_probe(path):
+        if path is None:
+            return None
+        try:
+            return [path, os.lstat(path).st_ino]
+        except OSError:
+            return [path, None]
+
+    def _append(self, record):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+            self._file.flush()
+            self._records += 1
+            self._unsynced += 1
+            if self._unsynced >= self.FSYNC_EVERY:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def push(self, stack, record, probe):
+        self._append({'op': 'push', 's': stack, 'e': record, 'p': probe})
+
+    def pop(self, stack):
+        self._append({'op': 'pop', 's': stack})
+
+    def clear(self, stack):
+        self._append({'op': 'clear', 's': stack})
+
+    def needs_compaction(self, live_entries):
+        return self._records > max(self.COMPACT_MIN_RECORDS, self.COMPACT_RATIO * live_entries)
+
+    def compact(self, undo, redo):
+        """Rewrite the log as push records for the given (record, probe) lists."""
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for stack, entries in (('undo', undo), ('redo', redo)):
+                    for record, probe in entries:
+                        f.write(json.dumps({'op': 'push', 's': stack, 'e': record, 'p': probe},
+                                           ensure_ascii=False, separators=(',', ':')) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if self._file:
+                self._file.close()
+                self._file = None
+            os.replace(tmp_path, self.path)
+            self._records = len(undo) + len(redo)
+            self._unsynced = 0
+        logging.info(f"Compacted undo journal to {self._records} records")
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
@@ -1,24 +1,198 @@
 import os
+import errno
 import shutil
 import time
 import logging
-from PyQt6.QtWidgets import QMessageBox
-from datetime import datetime
-import urllib.parse
-
-# Configure logging for undo operations
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import threading
+from collections import deque
+from file_operations import OperationCancelled, remove_tree_at
+from trash import TrashService
+from undo_journal import UndoJournal
 
 class UndoAction:
     def __init__(self, action_type, **kwargs):
         self.action_type = action_type
         self.kwargs = kwargs
         self.timestamp = time.time()  # Store timestamp for unique action tracking
+        self.probe = None  # journal probe of the stack the action is on
+
+    def __len__(self):
+        return 1
+
+    def to_record(self):
+        return {'k': 'a', 'type': self.action_type, 'kw': self.kwargs, 'ts': self.timestamp}
+
+    @classmethod
+    def from_record(cls, record):
+        action = cls(record['type'], **record['kw'])
+        action.timestamp = record.get('ts', action.timestamp)
+        return action
+
+
+def _compact_paths(paths):
+    """Split paths into a shared directory and a list of names ("" and full paths if they differ)."""
+    directories = {os.path.dirname(path) for path in paths}
+    if len(directories) == 1:
+        return directories.pop(), [os.path.basename(path) for path in paths]
+    return "", list(paths)
+
+
+class UndoTransaction:
+    """All items of one bulk COPY, MOVE or DELETE, stored as shared directories plus name arrays.
+
+    Each item is a (src, dest) pair: COPY - source and copy, MOVE - old and new location,
+    DELETE - original path and its location in the trash.
+    """
+    __slots__ = ('action_type', 'src_dir', 'src_names', 'dest_dir', 'dest_names', 'timestamp', 'probe')
+
+    def __init__(self, action_type, pairs):
+        self.action_type = action_type
+        self.src_dir, self.src_names = _compact_paths([src for src, _ in pairs])
+        self.dest_dir, self.dest_names = _compact_paths([dest for _, dest in pairs])
+        self.timestamp = time.time()
+        self.probe = None  # journal probe of the stack the transaction is on
+
+    def __len__(self):
+        return len(self.dest_names)
+
+    def pairs(self):
+        return [(os.path.join(self.src_dir, src_name), os.path.join(self.dest_dir, dest_name))
+                for src_name, dest_name in zip(self.src_names, self.dest_names)]
+
+    def to_record(self):
+        return {'k': 't', 'type': self.action_type, 'sd': self.src_dir, 'sn': self.src_names,
+                'dd': self.dest_dir, 'dn': self.dest_names, 'ts': self.timestamp}
+
+    @classmethod
+    def from_record(cls, record):
+        transaction = cls.__new__(cls)
+        transaction.action_type = record['type']
+        transaction.src_dir, transaction.src_names = record['sd'], record['sn']
+        transaction.dest_dir, transaction.dest_names = record['dd'], record['dn']
+        transaction.timestamp = record.get('ts', 0.0)
+        transaction.probe = None
+        return transaction
+
+
+def entry_from_record(record):
+    return UndoTransaction.from_record(record) if record.get('k') == 't' else UndoAction.from_record(record)
+
 
 class UndoManager:
-    def __init__(self):
-        self.undo_stack = []
-        self.max_stack_size = 100  # Limit stack size to prevent memory issues
+    def __init__(self, journal=None):
+        self.max_stack_size = 100  # Limit stack size (in user operations) to prevent memory issues
+        self.undo_stack = deque(maxlen=self.max_stack_size)
+        self.redo_stack = deque(maxlen=self.max_stack_size)
+        self.trash = TrashService()
+        # Stack changes come from the GUI thread and from undo jobs; the journal must see them in order
+        self._lock = threading.RLock()
+        self.journal = journal or UndoJournal()
+        self._unverified = set()  # entries restored from the journal whose probe is not checked yet
+        self._restore_stacks()
+
+    def _stack(self, name):
+        return self.undo_stack if name == 'undo' else self.redo_stack
+
+    @staticmethod
+    def _probe_path(entry, stack_name):
+        """Path that must still exist for the entry to be applicable from the given stack."""
+        if isinstance(entry, UndoTransaction):
+            if not len(entry):
+                return None
+            src, dest = entry.pairs()[0]
+            return dest if stack_name == 'undo' else src
+        kwargs = entry.kwargs
+        if entry.action_type in ('CREATE_FOLDER', 'CREATE_FILE'):
+            return kwargs['path'] if stack_name == 'undo' else os.path.dirname(kwargs['path'])
+        if entry.action_type == 'RENAME':
+            return kwargs['new_path'] if stack_name == 'undo' else kwargs['old_path']
+        if entry.action_type == 'DELETE':
+            return kwargs.get('trash_path') if stack_name == 'undo' else kwargs['path']
+        if stack_name == 'undo':
+            return kwargs['dest_path']
+        return kwargs.get('src_path')
+
+    def _restore_stacks(self):
+        """Rebuild both stacks from the journal without touching the files they refer to.
+
+        This runs while the window is built, and one entry on a hung network mount would freeze
+        startup, so the probes are kept unchecked and _replay checks each one before use.
+        """
+        try:
+            undo, redo = self.journal.load(self.max_stack_size)
+        except OSError as e:
+            logging.error(f"Failed to read undo journal: {e}")
+            return
+        malformed = 0
+        for name, records in (('undo', undo), ('redo', redo)):
+            for record, probe in records:
+                try:
+                    entry = entry_from_record(record)
+                except (KeyError, TypeError) as e:
+                    malformed += 1
+                    logging.warning(f"Skipping malformed undo record: {e}")
+                    continue
+                entry.probe = probe
+                self._unverified.add(entry)
+                self._stack(name).append(entry)
+        logging.info(f"Restored {len(self.undo_stack)} undo and {len(self.redo_stack)} redo entries"
+                     f" ({malformed} malformed skipped)")
+        if malformed or self.journal.needs_compaction(len(self.undo_stack) + len(self.redo_stack)):
+            self._compact_journal()
+
+    def _compact_journal(self):
+        # Probes are reused as recorded, so compacting never stats the files
+        try:
+            self.journal.compact([(entry.to_record(), entry.probe) for entry in self.undo_stack],
+                                 [(entry.to_record(), entry.probe) for entry in self.redo_stack])
+        except OSError as e:
+            logging.error(f"Failed to compact undo journal: {e}")
+
+    def _check_restored(self, entry):
+        """Refuse an entry from an earlier session whose file is gone or was replaced (other inode)."""
+        with self._lock:
+            if entry not in self._unverified:
+                return
+            self._unverified.discard(entry)
+        if not UndoJournal.is_valid(entry.probe):
+            raise FileNotFoundError(errno.ENOENT, "Файлы действия изменились после его записи",
+                                    entry.probe[0] if entry.probe else None)
+
+    def _push(self, stack_name, entry):
+        # The deque drops the oldest entry once max_stack_size is reached; replay does the same
+        with self._lock:
+            self._stack(stack_name).append(entry)
+            entry.probe = UndoJournal.make_probe(self._probe_path(entry, stack_name))
+            try:
+                self.journal.push(stack_name, entry.to_record(), entry.probe)
+                if self.journal.needs_compaction(len(self.undo_stack) + len(self.redo_stack)):
+                    self._compact_journal()
+            except OSError as e:
+                logging.error(f"Failed to write undo journal: {e}")
+
+    def _pop(self, stack_name):
+        with self._lock:
+            stack = self._stack(stack_name)
+            if not stack:
+                logging.info(f"{stack_name.capitalize()} stack is empty")
+                return None
+            entry = stack.pop()
+            try:
+                self.journal.pop(stack_name)
+            except OSError as e:
+                logging.error(f"Failed to write undo journal: {e}")
+            return entry
+
+    def _start_new_operation(self):
+        """A new user operation invalidates everything that could be redone."""
+        with self._lock:
+            if self.redo_stack:
+                self._unverified.difference_update(self.redo_stack)
+                self.redo_stack.clear()
+                try:
+                    self.journal.clear('redo')
+                except OSError as e:
+                    logging.error(f"Failed to write undo journal: {e}")
 
     def add_action(self, action_type, **kwargs):
         """Add an action to the undo stack with validation."""
@@ -36,49 +210,183 @@ class UndoManager:
                     logging.error(f"Missing parameter {param} for action {action_type}")
                     return
         action = UndoAction(action_type, **kwargs)
-        self.undo_stack.append(action)
+        self._start_new_operation()
+        self._push('undo', action)
         logging.info(f"Added action: {action_type}, params: {kwargs}")
-        # Trim stack if it exceeds max size
-        if len(self.undo_stack) > self.max_stack_size:
-            self.undo_stack.pop(0)
-            logging.debug("Trimmed undo stack to maintain max size")
-
-    def undo(self):
-        """Undo the last action in the stack."""
-        if not self.undo_stack:
-            logging.info("Undo stack is empty")
+
+    def add_transaction(self, action_type, pairs):
+        """Record one user operation over many items (COPY, MOVE or DELETE) as a single undo step."""
+        if action_type not in ('COPY', 'MOVE', 'DELETE'):
+            logging.error(f"Action {action_type} cannot be grouped into a transaction")
             return
-        action = self.undo_stack.pop()
-        logging.info(f"Undoing action: {action.action_type}, params: {action.kwargs}")
+        if not pairs:
+            return
+        self._start_new_operation()
+        self._push('undo', UndoTransaction(action_type, pairs))
+        logging.info(f"Added transaction: {action_type}, {len(pairs)} items")
+
+    def pop_undo(self):
+        """Take the most recent entry (UndoAction or UndoTransaction) off the undo stack, or None."""
+        return self._pop('undo')
+
+    def pop_redo(self):
+        """Take the most recently undone entry off the redo stack, or None."""
+        return self._pop('redo')
+
+    def revert(self, entry, should_stop=None, progress=None):
+        """Revert an entry popped from the undo stack; what was reverted moves to the redo stack.
+
+        `should_stop` is polled between items and inside large directory removals, `progress`
+        receives a percentage. Whatever was not reverted (failure or cancellation) is pushed back
+        on the undo stack, except items whose files are gone (FileNotFoundError), which are dropped.
+        Raises OSError or OperationCancelled for a single action; for a transaction returns the
+        number of items that were not reverted.
+        """
+        return self._replay(entry, 'undo', should_stop, progress)
+
+    def reapply(self, entry, should_stop=None, progress=None):
+        """Redo an entry popped from the redo stack; the counterpart of revert()."""
+        return self._replay(entry, 'redo', should_stop, progress)
+
+    def _replay(self, entry, source, should_stop, progress):
+        target = 'redo' if source == 'undo' else 'undo'
         try:
-            if action.action_type == 'COPY':
-                self._undo_copy(action.kwargs['dest_path'])
-            elif action.action_type == 'MOVE':
-                self._undo_move(action.kwargs['src_path'], action.kwargs['dest_path'])
-            elif action.action_type == 'DELETE':
-                self._undo_delete(action.kwargs['path'])
-            elif action.action_type == 'CREATE_FOLDER':
-                self._undo_create_folder(action.kwargs['path'])
-            elif action.action_type == 'CREATE_FILE':
-                self._undo_create_file(action.kwargs['path'])
-            elif action.action_type == 'RENAME':
-                self._undo_rename(action.kwargs['old_path'], action.kwargs['new_path'])
-        except Exception as e:
-            logging.error(f"Failed to undo {action.action_type}: {e}")
-            # Re-add action to stack if undo fails
-            self.undo_stack.append(action)
+            self._check_restored(entry)
+        except FileNotFoundError as e:
+            # A stale entry is dropped: retrying would fail the same way or touch an unrelated file
+            logging.error(f"Dropping stale {source} entry {entry.action_type}: {e}")
             raise
+        if isinstance(entry, UndoAction):
+            logging.info(f"{source.capitalize()}ing action: {entry.action_type}, params: {entry.kwargs}")
+            try:
+                if source == 'undo':
+                    self._revert_action(entry, should_stop)
+                else:
+                    self._reapply_action(entry)
+            except FileNotFoundError as e:
+                # Nothing left to apply it to (e.g. the trash was emptied); retrying would fail the same way
+                logging.error(f"Failed to {source} {entry.action_type}: {e}")
+                raise
+            except (OSError, OperationCancelled) as e:
+                logging.error(f"Failed to {source} {entry.action_type}: {e!r}")
+                # Re-add action to stack if undo fails
+                self._push(source, entry)
+                raise
+            self._push(target, entry)
+            if progress:
+                progress(100)
+            return 0
+
+        logging.info(f"{source.capitalize()}ing transaction: {entry.action_type}, {len(entry)} items")
+        pairs = entry.pairs()
+        # Undo walks the items newest first, redo in the original order
+        order = range(len(pairs) - 1, -1, -1) if source == 'undo' else range(len(pairs))
+        done = {}
+        vanished = set()  # items whose files no longer exist
+        for step, i in enumerate(order):
+            if should_stop and should_stop():
+                break
+            src, dest = pairs[i]
+            try:
+                if source == 'undo':
+                    done[i] = self._revert_item(entry.action_type, src, dest, should_stop)
+                else:
+                    done[i] = self._reapply_item(entry.action_type, src, dest)
+            except OperationCancelled:
+                break
+            except FileNotFoundError as e:
+                # The item is gone for good; keeping it would leave the transaction stuck on the stack
+                logging.error(f"Dropping {entry.action_type} item {dest} from {source}: {e}")
+                vanished.add(i)
+            except OSError as e:
+                logging.error(f"Failed to {source} {entry.action_type} of {dest}: {e}")
+            if progress:
+                progress(int((step + 1) * 100 / len(pairs)))
+        remaining = [pair for i, pair in enumerate(pairs) if i not in done and i not in vanished]
+        if remaining:
+            self._push(source, UndoTransaction(entry.action_type, remaining))
+        if done:
+            self._push(target, UndoTransaction(entry.action_type, [done[i] for i in sorted(done)]))
+        logging.info(f"{source.capitalize()}ing {entry.action_type}: {len(done)} of {len(pairs)} items done,"
+                     f" {len(vanished)} dropped")
+        return len(remaining) + len(vanished)
+
+    def _revert_action(self, action, should_stop=None):
+        if action.action_type == 'COPY':
+            self._undo_copy(action.kwargs['dest_path'], should_stop)
+        elif action.action_type == 'MOVE':
+            self._undo_move(action.kwargs['src_path'], action.kwargs['dest_path'])
+        elif action.action_type == 'DELETE':
+            self._undo_delete(action.kwargs['path'], action.kwargs.get('trash_path'))
+        elif action.action_type == 'CREATE_FOLDER':
+            self._undo_create_folder(action.kwargs['path'])
+        elif action.action_type == 'CREATE_FILE':
+            self._undo_create_file(action.kwargs['path'])
+        elif action.action_type == 'RENAME':
+            self._undo_rename(action.kwargs['old_path'], action.kwargs['new_path'])
+
+    def _revert_item(self, action_type, src, dest, should_stop=None):
+        """Revert a single item of a transaction; returns the pair to keep for redo, raises OSError
+        (FileNotFoundError / FileExistsError included) when the item was not reverted."""
+        if action_type == 'COPY':
+            self._undo_copy(dest, should_stop)
+        elif action_type == 'MOVE':
+            self._undo_move(src, dest)
+        elif action_type == 'DELETE':
+            self.trash.restore(dest, src)
+        return src, dest
+
+    def _reapply_action(self, action):
+        kwargs = action.kwargs
+        if action.action_type == 'COPY':
+            if 'src_path' not in kwargs:
+                raise FileNotFoundError(errno.ENOENT, "Источник копирования не записан", kwargs['dest_path'])
+            self._reapply_item('COPY', kwargs['src_path'], kwargs['dest_path'])
+        elif action.action_type == 'MOVE':
+            self._reapply_item('MOVE', kwargs['src_path'], kwargs['dest_path'])
+        elif action.action_type == 'DELETE':
+            kwargs['trash_path'] = self._reapply_item('DELETE', kwargs['path'], None)[1]
+        elif action.action_type == 'CREATE_FOLDER':
+            os.mkdir(kwargs['path'])
+        elif action.action_type == 'CREATE_FILE':
+            open(kwargs['path'], 'x').close()
+        elif action.action_type == 'RENAME':
+            self._reapply_item('MOVE', kwargs['old_path'], kwargs['new_path'])
+        logging.info(f"Redid {action.action_type}: {kwargs}")
 
-    def _undo_copy(self, dest_path):
+    def _reapply_item(self, action_type, src, dest):
+        """Repeat a single item of an undone operation; returns its new (src, dest) pair."""
+        if action_type == 'DELETE':
+            if not os.path.lexists(src):
+                raise FileNotFoundError(errno.ENOENT, "Nothing to move to trash", src)
+            return src, self.trash.trash(src)
+        if os.path.lexists(dest):
+            raise FileExistsError(errno.EEXIST, "Destination already exists", dest)
+        if action_type == 'COPY':
+            if os.path.isdir(src) and not os.path.islink(src):
+                shutil.copytree(src, dest, symlinks=True)
+            else:
+                shutil.copy2(src, dest, follow_symlinks=False)
+        elif action_type == 'MOVE':
+            try:
+                os.rename(src, dest)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(src, dest)
+        return src, dest
+
+    def _undo_copy(self, dest_path, should_stop=None):
         """Undo a copy operation by removing the copied file."""
-        if not os.path.exists(dest_path):
+        if not os.path.lexists(dest_path):
             logging.warning(f"Cannot undo copy: {dest_path} does not exist")
-            return
+            raise FileNotFoundError(errno.ENOENT, "Copy no longer exists", dest_path)
         try:
-            if os.path.isdir(dest_path):
-                shutil.rmtree(dest_path)
-            else:
-                os.remove(dest_path)
+            parent_fd = os.open(os.path.dirname(dest_path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                remove_tree_at(parent_fd, os.path.basename(dest_path), should_stop)
+            finally:
+                os.close(parent_fd)
             logging.info(f"Undid copy: Removed {dest_path}")
         except PermissionError as e:
             logging.error(f"No permission to remove {dest_path}: {e}")
@@ -89,12 +397,12 @@ class UndoManager:
 
     def _undo_move(self, src_path, dest_path):
         """Undo a move operation by moving the file back."""
-        if not os.path.exists(dest_path):
+        if not os.path.lexists(dest_path):
             logging.warning(f"Cannot undo move: {dest_path} does not exist")
-            return
-        if os.path.exists(src_path):
+            raise FileNotFoundError(errno.ENOENT, "Moved item no longer exists", dest_path)
+        if os.path.lexists(src_path):
             logging.warning(f"Cannot undo move: {src_path} already exists")
-            return
+            raise FileExistsError(errno.EEXIST, "Original location is taken", src_path)
         try:
             shutil.move(dest_path, src_path)
             logging.info(f"Undid move: {dest_path} -> {src_path}")
@@ -105,28 +413,20 @@ class UndoManager:
             logging.error(f"Failed to move {dest_path} to {src_path}: {e}")
             raise
 
-    def _undo_delete(self, path):
+    def _undo_delete(self, path, trash_path=None):
         """Undo a delete operation by restoring from trash."""
-        trash_files_dir = os.path.expanduser("~/.local/share/Trash/files")
-        trash_info_dir = os.path.expanduser("~/.local/share/Trash/info")
-        base_name = os.path.basename(path)
-        trash_file_path = os.path.join(trash_files_dir, base_name)
-        trash_info_path = os.path.join(trash_info_dir, f"{base_name}.trashinfo")
-
-        if not os.path.exists(trash_file_path):
-            logging.warning(f"Cannot restore {path}: not found in trash at {trash_file_path}")
-            QMessageBox.warning(None, "Предупреждение", f"Файл {path} не найден в корзине.")
-            return
+        if trash_path is None:
+            # Actions recorded before per-volume trash support only know the original path
+            self.trash.index_dir(self.trash.home_trash)
+            entry = self.trash.index.find_by_original(os.path.abspath(path))
+            trash_path = entry.trash_file_path if entry else os.path.join(self.trash.home_trash, "files", os.path.basename(path))
+
+        if not os.path.lexists(trash_path):
+            logging.warning(f"Cannot restore {path}: not found in trash at {trash_path}")
+            raise FileNotFoundError(errno.ENOENT, f"Файл {path} не найден в корзине", trash_path)
 
         try:
-            # Ensure parent directory exists
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            # Restore the file
-            shutil.move(trash_file_path, path)
-            # Remove the trashinfo file
-            if os.path.exists(trash_info_path):
-                os.remove(trash_info_path)
-            logging.info(f"Restored {path} from trash")
+            self.trash.restore(trash_path, path)
         except PermissionError as e:
             logging.error(f"No permission to restore {path}: {e}")
             raise
@@ -166,12 +466,12 @@ class UndoManager:
 
     def _undo_rename(self, old_path, new_path):
         """Undo a rename operation by reverting to the old name."""
-        if not os.path.exists(new_path):
+        if not os.path.lexists(new_path):
             logging.warning(f"Cannot undo rename: {new_path} does not exist")
-            return
-        if os.path.exists(old_path):
+            raise FileNotFoundError(errno.ENOENT, "Renamed item no longer exists", new_path)
+        if os.path.lexists(old_path):
             logging.warning(f"Cannot undo rename: {old_path} already exists")
-            return
+            raise FileExistsError(errno.EEXIST, "Old name is taken", old_path)
         logging.info(f"Attempting to undo rename: {new_path} -> {old_path}")
         try:
             os.rename(new_path, old_path)
@@ -184,74 +484,43 @@ class UndoManager:
             raise
 
     def move_to_trash(self, path):
-        """Move a file or folder to the Linux trash directory."""
-        if not os.path.exists(path):
+        """Move a file or folder to the trash directory of its volume."""
+        if not os.path.lexists(path):
             logging.warning(f"Cannot move to trash: {path} does not exist")
-            return False
-
-        trash_files_dir = os.path.expanduser("~/.local/share/Trash/files")
-        trash_info_dir = os.path.expanduser("~/.local/share/Trash/info")
-        base_name = os.path.basename(path)
-        trash_file_path = os.path.join(trash_files_dir, base_name)
-        trash_info_path = os.path.join(trash_info_dir, f"{base_name}.trashinfo")
-
-        # Handle name conflicts
-        counter = 1
-        while os.path.exists(trash_file_path) or os.path.exists(trash_info_path):
-            base_name = f"{os.path.splitext(os.path.basename(path))[0]}_{counter}{os.path.splitext(path)[1]}"
-            trash_file_path = os.path.join(trash_files_dir, base_name)
-            trash_info_path = os.path.join(trash_info_dir, f"{base_name}.trashinfo")
-            counter += 1
-
+            return None
         try:
-            # Create trash directories if they don't exist
-            os.makedirs(trash_files_dir, exist_ok=True)
-            os.makedirs(trash_info_dir, exist_ok=True)
-
-            # Move the file to trash
-            shutil.move(path, trash_file_path)
-
-            # Create .trashinfo file
-            deletion_time = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-            trash_info_content = (
-                "[Trash Info]\n"
-                f"Path={urllib.parse.quote(path)}\n"
-                f"DeletionDate={deletion_time}\n"
-            )
-            with open(trash_info_path, 'w', encoding='utf-8') as f:
-                f.write(trash_info_content)
-
-            logging.info(f"Moved to trash: {path} -> {trash_file_path}")
-            return True
+            return self.trash.trash(path)
         except PermissionError as e:
             logging.error(f"No permission to move {path} to trash: {e}")
-            return False
+            return None
         except OSError as e:
             logging.error(f"Error moving {path} to trash: {e}")
-            return False
+            return None
 
     def clear_trash(self):
-        """Permanently delete all files in the trash."""
-        trash_files_dir = os.path.expanduser("~/.local/share/Trash/files")
-        trash_info_dir = os.path.expanduser("~/.local/share/Trash/info")
-
+        """Detach all trash contents for permanent deletion; returns the directories to delete or None."""
         try:
-            if os.path.exists(trash_files_dir):
-                shutil.rmtree(trash_files_dir)
-                os.makedirs(trash_files_dir, exist_ok=True)
-            if os.path.exists(trash_info_dir):
-                shutil.rmtree(trash_info_dir)
-                os.makedirs(trash_info_dir, exist_ok=True)
-            logging.info("Cleared trash directory")
-            return True
+            purge_dirs = self.trash.detach_contents()
+            logging.info("Detached trash contents for deletion")
+            return purge_dirs
         except PermissionError as e:
             logging.error(f"No permission to clear trash: {e}")
-            return False
+            return None
         except OSError as e:
             logging.error(f"Failed to clear trash: {e}")
-            return False
+            return None
 
     def clear_stack(self):
         """Clear the undo stack."""
-        self.undo_stack = []
+        with self._lock:
+            self._unverified.difference_update(self.undo_stack)
+            self.undo_stack.clear()
+            try:
+                self.journal.clear('undo')
+            except OSError as e:
+                logging.error(f"Failed to write undo journal: {e}")
         logging.info("Cleared undo stack")
+
+    def close(self):
+        """Flush the undo journal; called when the application exits."""
+        self.journal.close()
@@ -0,0 +1,97 @@
+import time
+
+
+class ViewRecord:
+    """Where a file view lives: its navigation bar (zone), its tab page, the path it shows and
+    when it was last activated (for evicting the least recently used models)."""
+    __slots__ = ('view', 'nav_bar', 'page', 'path', 'last_used')
+
+    def __init__(self, view, nav_bar, page, path=None):
+        self.view = view
+        self.nav_bar = nav_bar
+        self.page = page
+        self.path = path
+        self.last_used = time.monotonic()
+
+
+class ViewRegistry:
+    """Explicit index of the file views in the work zones.
+
+    Views are registered by NavigationBar when a tab is opened and dropped when it is closed
+    or its zone is removed, so finding a view's zone, its tab page or the views showing a path
+    is a dict lookup instead of a findChildren walk over the widget tree.
+    """
+
+    def __init__(self):
+        self._by_view = {}
+        self._by_page = {}
+        self._by_path = {}
+
+    def register(self, view, nav_bar, page, path=None):
+        record = ViewRecord(view, nav_bar, page)
+        self._by_view[view] = record
+        self._by_page[page] = record
+        self.set_path(view, path)
+        return record
+
+    def unregister(self, view):
+        record = self._by_view.pop(view, None)
+        if record is None:
+            return
+        self._by_page.pop(record.page, None)
+        self._discard_path(record)
+
+    def set_path(self, view, path):
+        """Called whenever a view starts showing `path`; keeps views_at() current."""
+        record = self._by_view.get(view)
+        if record is None or record.path == path:
+            return
+        self._discard_path(record)
+        record.path = path
+        if path is not None:
+            self._by_path.setdefault(path, []).append(view)
+
+    def _discard_path(self, record):
+        views = self._by_path.get(record.path)
+        if views is None:
+            return
+        views.remove(record.view)
+        if not views:
+            del self._by_path[record.path]
+
+    def touch(self, view):
+        record = self._by_view.get(view)
+        if record is not None:
+            record.last_used = time.monotonic()
+
+    def least_recently_used(self):
+        """All views, the longest unused first."""
+        return [record.view for record in sorted(self._by_view.values(), key=lambda record: record.last_used)]
+
+    def record(self, view):
+        return self._by_view.get(view)
+
+    def nav_bar_of(self, view):
+        record = self._by_view.get(view)
+        return record.nav_bar if record else None
+
+    def zone_of(self, view):
+        record = self._by_view.get(view)
+        return record.nav_bar.zone if record else None
+
+    def view_for_page(self, page):
+        record = self._by_page.get(page)
+        return record.view if record else None
+
+    def views(self, nav_bar=None):
+        """Views of one zone in tab order, or of every zone."""
+        if nav_bar is None:
+            return list(self._by_view)
+        tab_widget = nav_bar.tab_widget
+        return [view for view in (self.view_for_page(tab_widget.widget(i)) for i in range(tab_widget.count())) if view]
+
+    def views_at(self, path):
+        return list(self._by_path.get(path, ()))
+
+    def __len__(self):
+        return len(self._by_view)